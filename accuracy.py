@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# accuracy.py
+"""
+Prediction accuracy analytics – one definition for every consumer.
+
+Per resolved prediction (predicted p, actual a, price when it was made b –
+the log entry's "current"):
+
+    error %      |p - a| / a · 100          → MAPE
+    hit          error % <= TOL_PCT          → hit rate
+    bias %       (p - a) / a · 100           → mean signed error (+ = too high)
+    direction    sign(p - b) == sign(a - b)  → directional accuracy (needs b)
+
+score() computes these for whole arrays at once. As predictions resolve,
+analyze.py passes them to record(), which adds them to running sums per coin
+and hour bucket (of the prediction time) in accuracy.json and recomputes the
+per-coin summary for each rolling window in WINDOWS_H. Consumers (Telegram
+alert, rollups/dashboard, check_accuracy.py) just read that summary.
+Each forecast horizon is tracked in its own file: accuracy.json for the
+next-hour predictions, accuracy_<h>h.json for the others (see state_path).
+
+    python accuracy.py                # print the summary
+    python accuracy.py --horizon 24   # ... of the 24h forecasts
+    python accuracy.py --rebuild      # re-derive accuracy.json from prediction_log.json
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+ACCURACY_JSON = os.path.join(BASE_DIR, "accuracy.json")
+PRED_LOG_JSON = os.path.join(BASE_DIR, "prediction_log.json")
+TOL_PCT       = 4  # a prediction within this % of the actual price is a hit
+BUCKET_S      = 3600
+WINDOWS_H     = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}
+
+FIELDS = ("n", "abs_err", "hits", "bias", "dir_n", "dir_hits")
+
+def state_path(horizon=1, path=None):
+    """accuracy.json (or `path`) for 1h predictions, accuracy_<h>h.json beside it for other horizons."""
+    path = path or ACCURACY_JSON
+    if horizon == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{horizon}h{ext}"
+
+# ─── SCORING ────────────────────────────────────────────────────────────────
+def score(predicted, actual, base=None, tol=TOL_PCT):
+    """
+    Vectorised per-prediction metrics. Returns a DataFrame with ErrPct,
+    BiasPct, Hit (bool) and DirectionHit (NaN where `base` or the move is
+    unknown). Rows with a missing/zero actual get NaN throughout.
+    """
+    p = np.asarray(predicted, dtype="float64")
+    a = np.asarray(actual, dtype="float64")
+    b = np.full_like(p, np.nan) if base is None else np.asarray(base, dtype="float64")
+    a = np.where(a > 0, a, np.nan)
+
+    bias = (p - a) / a * 100
+    err  = np.abs(bias)
+    with np.errstate(invalid="ignore"):
+        move = np.sign(a - b)
+        dirn = np.where(np.isnan(move) | (move == 0), np.nan, (np.sign(p - b) == move).astype("float64"))
+    return pd.DataFrame({
+        "ErrPct":       err,
+        "BiasPct":      bias,
+        "Hit":          np.where(np.isnan(err), np.nan, (err <= tol).astype("float64")),
+        "DirectionHit": dirn,
+    })
+
+def summarize(sums):
+    """Additive sums → {n, mape, hit_rate, directional, bias} (None when there is nothing to average)."""
+    n, dn = sums["n"], sums["dir_n"]
+    return {
+        "n":           int(n),
+        "mape":        round(float(sums["abs_err"] / n), 4) if n else None,
+        "hit_rate":    round(float(sums["hits"] / n), 4) if n else None,
+        "bias":        round(float(sums["bias"] / n), 4) if n else None,
+        "directional": round(float(sums["dir_hits"] / dn), 4) if dn else None,
+        "dir_n":       int(dn),
+    }
+
+# ─── INCREMENTAL STATE ──────────────────────────────────────────────────────
+def _frame(resolved):
+    """Resolved predictions (dicts with coin, timestamp, predicted, actual[, base]) → scored frame."""
+    df = pd.DataFrame(list(resolved), columns=["coin", "timestamp", "predicted", "actual", "base"])
+    ts = pd.to_datetime(df["timestamp"], utc=True, errors="coerce", format="ISO8601")
+    df, ts = df[ts.notna()].reset_index(drop=True), ts[ts.notna()].reset_index(drop=True)
+    df["bucket"] = (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=BUCKET_S)
+    return pd.concat([df, score(df["predicted"], df["actual"], df["base"])], axis=1)
+
+def _add(state, scored):
+    if scored.empty:
+        return
+    per = scored.groupby(["coin", "bucket"]).agg(
+        n=("ErrPct", "count"), abs_err=("ErrPct", "sum"), hits=("Hit", "sum"), bias=("BiasPct", "sum"),
+        dir_n=("DirectionHit", "count"), dir_hits=("DirectionHit", "sum"),
+    )
+    for (coin, bucket), row in zip(per.index, per[list(FIELDS)].to_numpy()):
+        coin_state = state["coins"].setdefault(coin, {"buckets": {}, "total": [0.0] * len(FIELDS)})
+        cur = coin_state["buckets"].setdefault(str(int(bucket)), [0.0] * len(FIELDS))
+        coin_state["buckets"][str(int(bucket))] = [x + y for x, y in zip(cur, row.tolist())]
+        coin_state["total"] = [x + y for x, y in zip(coin_state["total"], row.tolist())]
+
+def _refresh_summary(state, now):
+    """Recompute every coin's window summaries from its buckets (≤ max window of them) and prune older ones."""
+    now_bucket = int(now.timestamp()) // BUCKET_S
+    keep_from  = now_bucket - max(WINDOWS_H.values()) + 1
+    summary    = {}
+    for coin, coin_state in state["coins"].items():
+        buckets = {b: v for b, v in coin_state["buckets"].items() if int(b) >= keep_from}
+        coin_state["buckets"] = buckets
+        keys = np.array([int(b) for b in buckets], dtype="int64")
+        vals = np.array(list(buckets.values()), dtype="float64").reshape(len(keys), len(FIELDS))
+        summary[coin] = {
+            name: summarize(dict(zip(FIELDS, vals[keys > now_bucket - hours].sum(axis=0))))
+            for name, hours in WINDOWS_H.items()
+        }
+        summary[coin]["all"] = summarize(dict(zip(FIELDS, coin_state["total"])))
+    state["summary"]   = summary
+    state["updated"]   = now.isoformat()
+    state["tol_pct"]   = TOL_PCT
+
+def record(resolved, path=ACCURACY_JSON, now=None):
+    """Fold newly resolved predictions into the running sums and refresh the summary; returns it."""
+    now = now or datetime.now(timezone.utc)
+    with storage.update_json(path, default={}, backup=True) as state:
+        state.setdefault("coins", {})
+        _add(state, _frame(resolved))
+        _refresh_summary(state, now)
+        return state["summary"]
+
+def flatten_log(log, horizon=1):
+    """prediction_log.json dict → resolved rows of one horizon for record() (entries without horizon_h are 1h)."""
+    return [
+        {"coin": coin, "timestamp": e["timestamp"], "predicted": e["predicted"],
+         "actual": e["actual"], "base": e.get("current")}
+        for coin, entries in log.items() for e in entries
+        if "actual" in e and "predicted" in e and e.get("horizon_h", 1) == horizon
+    ]
+
+def rebuild(log_path=PRED_LOG_JSON, path=ACCURACY_JSON, now=None, horizon=1):
+    """Re-derive the whole state from the prediction log (first run / after changing TOL_PCT)."""
+    now   = now or datetime.now(timezone.utc)
+    state = {"coins": {}}
+    _add(state, _frame(flatten_log(storage.read_json(log_path, default={}), horizon)))
+    _refresh_summary(state, now)
+    storage.write_json(state, path, backup=True)
+    return state["summary"]
+
+# ─── READ ───────────────────────────────────────────────────────────────────
+def load_summary(path=ACCURACY_JSON, log_path=PRED_LOG_JSON, horizon=1):
+    """{coin: {window: {n, mape, hit_rate, directional, bias, dir_n}}} as last recorded."""
+    if not os.path.exists(path) and os.path.exists(log_path):
+        return rebuild(log_path, path, horizon=horizon)
+    return storage.read_json(path, default={}).get("summary", {})
+
+def summary_frame(window="24h", path=ACCURACY_JSON, log_path=PRED_LOG_JSON, horizon=1):
+    """One row per coin for `window`: Coin, N, MAPE, HitRate, Directional, BiasPct."""
+    rows = [
+        {"Coin": coin, "N": m["n"], "MAPE": m["mape"], "HitRate": m["hit_rate"],
+         "Directional": m["directional"], "BiasPct": m["bias"]}
+        for coin, windows in load_summary(path, log_path, horizon).items() if (m := windows.get(window))
+    ]
+    df = pd.DataFrame(rows, columns=["Coin", "N", "MAPE", "HitRate", "Directional", "BiasPct"])
+    return df.astype({"MAPE": "float64", "HitRate": "float64", "Directional": "float64", "BiasPct": "float64"})
+
+def _fmt(x, pct=False):
+    return "–" if x is None else (f"{x:.0%}" if pct else f"{x:+.2f}%")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Prediction accuracy per coin over rolling windows")
+    ap.add_argument("--rebuild", action="store_true", help="re-derive the state from prediction_log.json")
+    ap.add_argument("--horizon", type=int, default=1, help="forecast horizon in hours")
+    args = ap.parse_args(argv)
+
+    path    = state_path(args.horizon)
+    summary = rebuild(path=path, horizon=args.horizon) if args.rebuild else load_summary(path, horizon=args.horizon)
+    for coin, windows in summary.items():
+        print(f"{coin}:")
+        for name in list(WINDOWS_H) + ["all"]:
+            m = windows.get(name, {})
+            if not m.get("n"):
+                print(f"  {name:>4}: –")
+                continue
+            print(f"  {name:>4}: n={m['n']:<4} hit {_fmt(m['hit_rate'], True):>4} (±{TOL_PCT}%)  "
+                  f"MAPE {m['mape']:.2f}%  bias {_fmt(m['bias'])}  direction {_fmt(m['directional'], True)}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,165 +2,401 @@
 # analyze.py
 
 import os
-import csv
-import json
-import subprocess
+import sys
+import time
+import asyncio
+import argparse
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
 
+import numpy as np
 import pandas as pd
 from dateutil import parser
 from dotenv import load_dotenv
 
-from reddit_fetch          import fetch_reddit_posts
-from rss_fetch             import fetch_rss_articles
 from analyze_sentiment     import analyze_sentiment
 from fetch_prices          import fetch_prices
-from train_price_predictor import predict_prices
+from train_price_predictor import predict_horizons, update_features
 from send_telegram         import send_telegram_message
 import auto_push
+import rollups
+import instrument
+import storage
+import coin_registry
+import history_store
+import records
+import sources
+import dedup
+import sentiment_agg
+import accuracy
+import shift_detect
 
 # ─── CONFIG ────────────────────────────────────────────────────────────────
 load_dotenv()
-COINS          = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
-OUT_CSV        = "sentiment_output.csv"
-HIST_CSV       = "sentiment_history.csv"
-PRED_LOG_JSON  = "prediction_log.json"
-ALERT_LOG_JSON = "alert_log.json"
-TOL_PCT        = 4  # ML accuracy threshold (%)
+COINS           = coin_registry.names()
+OUT_CSV         = "sentiment_output.csv"
+HIST_CSV        = "sentiment_history.csv"
+PRED_LOG_JSON   = "prediction_log.json"
+ALERT_LOG_JSON  = "alert_log.json"
+ACCURACY_JSON   = "accuracy.json"
+TOL_PCT         = accuracy.TOL_PCT  # ML accuracy threshold (%)
+POSTS_PER_COIN  = int(os.getenv("SAE_POSTS_PER_COIN", "5")) or None  # new docs per coin/source per run; 0 = no cap
+MICRO_BATCH     = 64  # documents scored per streaming micro-batch
+SIGNAL_WINDOW_H = 6  # hours of weighted, recency-decayed sentiment behind each prediction/alert
+SHARD_DIR       = os.path.join("output", "shards")  # per-shard segments, one dir per run id
+SHARD_WAIT_S    = int(os.getenv("SHARD_WAIT_S", "900"))  # how long --merge waits for stragglers
 
 # ─── HELPERS ────────────────────────────────────────────────────────────────
+# All shared files go through storage: atomic replace + advisory locks, so the
+# dashboards/monitors reading them concurrently never see a half-written file.
 def load_json(path):
-    if os.path.exists(path):
-        try:
-            return json.load(open(path, "r", encoding="utf-8"))
-        except json.JSONDecodeError:
-            return {}
-    return {}
+    return storage.read_json(path, default={})
 
 def save_json(obj, path):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2)
+    storage.write_json(obj, path, backup=True)
 
 def dedupe_csv(path, subset):
     if not os.path.exists(path):
         return
-    df    = pd.read_csv(path)
-    valid = [c for c in subset if c in df.columns]
-    if valid:
-        df.drop_duplicates(subset=valid, keep="last", inplace=True)
-        df.to_csv(path, index=False)
+    with storage.file_lock(path):
+        df    = pd.read_csv(path)
+        valid = [c for c in subset if c in df.columns]
+        if valid:
+            df.drop_duplicates(subset=valid, keep="last", inplace=True)
+            storage.write_csv(df, path)
 
 def ensure_pred_log():
-    if not os.path.exists(PRED_LOG_JSON):
-        save_json({c: [] for c in COINS}, PRED_LOG_JSON)
+    with storage.update_json(PRED_LOG_JSON, default={}) as log:
+        for c in COINS:
+            log.setdefault(c, [])
 
 def update_predictions_with_actuals():
-    log  = load_json(PRED_LOG_JSON)
-    hist = pd.read_csv(HIST_CSV)
-    hist["Timestamp"] = hist["Timestamp"].apply(parser.isoparse).apply(lambda dt: dt.replace(tzinfo=None))
-    now     = datetime.utcnow()
-    changed = False
-
-    for coin, entries in log.items():
-        for e in entries:
-            # skip if no predicted, or already filled
-            if "actual" in e or "predicted" not in e:
-                continue
-            t0 = parser.isoparse(e["timestamp"]).replace(tzinfo=None)
-            if now - t0 < timedelta(hours=1):
-                continue
-            sub = hist[(hist.Coin == coin) & (hist.Timestamp > t0)]
-            if not sub.empty:
-                actual      = float(sub.iloc[0].PriceUSD)
-                pct         = abs(e["predicted"] - actual) / actual * 100 if actual else None
-                e["actual"]   = round(actual, 2)
-                e["diff_pct"] = round(pct, 2) if pct is not None else None
-                e["accurate"] = (pct is not None and pct <= TOL_PCT)
-                changed = True
-
-    if changed:
-        save_json(log, PRED_LOG_JSON)
+    now = datetime.utcnow()
+    with storage.update_json(PRED_LOG_JSON, default={}) as log:
+        # only the history after the oldest prediction that is due but still open is needed
+        pending = [
+            due for entries in log.values() for e in entries
+            if "actual" not in e and "predicted" in e
+            and (due := parser.isoparse(e["timestamp"]).replace(tzinfo=None) + timedelta(hours=e.get("horizon_h", 1))) <= now
+        ]
+        if not pending:
+            return
+        hist     = history_store.load_history(HIST_CSV, start=min(pending), columns=["Timestamp", "Coin", "PriceUSD"])
+        resolved = _fill_actuals(log, hist, now)
+        # recorded while the log is still locked: if this fails the log isn't written
+        # and the entries stay open for the next run instead of resolved but never counted
+        for h in sorted({r["horizon_h"] for r in resolved}):
+            accuracy.record([r for r in resolved if r["horizon_h"] == h], accuracy.state_path(h, ACCURACY_JSON))
+
+def _fill_actuals(log, hist, now):
+    """
+    Resolve every open prediction whose horizon has passed to the first
+    price logged after timestamp + horizon_h (1h for entries without one) –
+    one merge_asof for all coins and horizons – and score it with
+    accuracy.score. Returns the newly resolved entries for accuracy.record.
+    """
+    open_ = [(coin, e) for coin, entries in log.items() for e in entries if "actual" not in e and "predicted" in e]
+    prices = hist.dropna(subset=["Timestamp", "Coin", "PriceUSD"])
+    if not open_ or prices.empty:
+        return []
+    horizon = pd.to_timedelta([e.get("horizon_h", 1) for _, e in open_], unit="h")
+    preds = pd.DataFrame({
+        "Coin":      [coin for coin, _ in open_],
+        "Timestamp": history_store.parse_timestamps(pd.Series([e["timestamp"] for _, e in open_])) + horizon,
+        "Entry":     range(len(open_)),
+    })
+    preds = preds[preds.Timestamp <= now]
+    preds = preds.assign(Coin=preds.Coin.astype(str), Timestamp=preds.Timestamp.astype("datetime64[ns]")).sort_values("Timestamp")
+    prices = (prices.assign(Coin=prices.Coin.astype(str), Timestamp=prices.Timestamp.astype("datetime64[ns]"))
+                    .sort_values("Timestamp")[["Timestamp", "Coin", "PriceUSD"]])
+    hits = pd.merge_asof(preds, prices, on="Timestamp", by="Coin", direction="forward",
+                         allow_exact_matches=False).dropna(subset=["PriceUSD"])
+
+    entries = [open_[i][1] for i in hits.Entry]
+    scored  = accuracy.score([e["predicted"] for e in entries], hits.PriceUSD, [e.get("current") for e in entries])
+    for (coin, e), actual, err, hit in zip((open_[i] for i in hits.Entry), hits.PriceUSD, scored.ErrPct, scored.Hit):
+        e["actual"]   = round(float(actual), 2)
+        e["diff_pct"] = None if pd.isna(err) else round(float(err), 2)
+        e["accurate"] = bool(hit == 1)
+    return [
+        {"coin": coin, "timestamp": e["timestamp"], "predicted": e["predicted"], "actual": e["actual"],
+         "base": e.get("current"), "horizon_h": e.get("horizon_h", 1)}
+        for coin, e in (open_[i] for i in hits.Entry)
+    ]
+
+# ─── STREAMING INGEST ───────────────────────────────────────────────────────
+# fetch → dedup → score → aggregate as chained async generators. Documents are
+# scored MICRO_BATCH at a time and each scored batch is handed to a sink and
+# dropped, so memory stays flat however many documents the sources return
+# (sources.stream bounds what is in flight, dedup.py bounds its index).
+async def _fresh(docs, quotas, deduper):
+    """dedup stage: (doc, coin codes) for documents some coin/source still wants, duplicates dropped."""
+    remaining = sum(1 for q in quotas.values() if q)
+    async for doc in docs:
+        wanted = [c for c in doc.coins if (c, doc.source) in quotas and quotas[(c, doc.source)] != 0]
+        if wanted:
+            with instrument.span("dedup"):
+                fresh  = deduper.check(doc.text, [records.coin_name(c) for c in wanted])
+            wanted = [records.coin_code(c) for c in fresh]
+        if not wanted:
+            continue
+        for c in wanted:
+            if quotas[(c, doc.source)] is not None:
+                quotas[(c, doc.source)] -= 1
+                remaining -= quotas[(c, doc.source)] == 0
+        yield doc, wanted
+        if quotas and not remaining and None not in quotas.values():
+            return
+
+async def _micro_batches(items, size):
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _score(items, ts_us):
+    """score stage: one SentimentBatch per micro-batch; each document is scored once, however many coins it mentions."""
+    rows = records.SentimentBatch()
+    with instrument.span("sentiment"):
+        for doc, wanted in items:
+            s = analyze_sentiment(doc.text)
+            w = sentiment_agg.weight(doc.source, doc.engagement)
+            for c in wanted:
+                rows.append(ts_us, c, doc.source, s, doc.text, doc.ts, w)
+            instrument.count(f"rows.{doc.source.label.lower()}", len(wanted))
+    return rows
+
+async def ingest(coins, ts_us, adapters=None, deduper=None, cap=POSTS_PER_COIN, sink=None, batch_size=MICRO_BATCH):
+    """
+    Stream every source adapter concurrently and score up to `cap` new
+    documents per coin and source (None = everything the sources return).
+    Documents already seen for a coin (exactly or nearly the same text, in
+    this run or recent ones – see dedup.py) are dropped before scoring and
+    don't use up the cap. With a cap, the stream is closed (stopping the
+    scrapers) as soon as every coin/source is full.
+
+    Each scored micro-batch goes to sink(batch); without a sink the batches
+    are collected and returned as one SentimentBatch. Returns the number of
+    rows scored otherwise.
+    """
+    adapters = adapters if adapters is not None else sources.default_adapters()
+    deduper  = deduper if deduper is not None else dedup.Deduper.load()
+    quotas   = {(records.coin_code(c), a.source): cap for c in coins for a in adapters}
+    rows     = records.SentimentBatch() if sink is None else None
+    sink     = sink or rows.extend
+    scored   = 0
+
+    async with aclosing(sources.stream(adapters, coins)) as docs, \
+               aclosing(_micro_batches(_fresh(docs, quotas, deduper), batch_size)) as batches:
+        async for items in batches:
+            batch   = _score(items, ts_us)
+            scored += len(batch)
+            sink(batch)
+
+    instrument.count("dedup.exact", deduper.stats["exact"])
+    instrument.count("dedup.near", deduper.stats["near"])
+    deduper.save()
+    return rows if rows is not None else scored
+
+def fold(sums, batch):
+    """aggregate stage: add a batch into running {(source, coin code): [Σw·s, Σw]}."""
+    if not len(batch):
+        return sums
+    w   = batch.codes("weight")
+    grp = (
+        pd.DataFrame({"source": batch.codes("source"), "coin": batch.codes("coin"), "ws": w * batch.codes("sentiment"), "w": w})
+          .groupby(["source", "coin"])[["ws", "w"]].sum()
+    )
+    for key, (ws, wt) in zip(grp.index, grp.to_numpy()):
+        acc = sums.setdefault(key, [0.0, 0.0])
+        acc[0] += ws
+        acc[1] += wt
+    return sums
+
+# ─── SHARD WORK ─────────────────────────────────────────────────────────────
+def run_shard(coins, ts_us, cap=POSTS_PER_COIN):
+    """
+    Stream, score and price one shard of coins. Scored rows are appended to
+    OUT_CSV batch by batch; returns a small JSON-serialisable segment
+    {"history", "agg", "prices", "scored"} for the coordinator to merge.
+    """
+    sums  = {}
+    delta = sentiment_agg.Aggregator()
+
+    def sink(batch):
+        with instrument.span("write.output_csv"):
+            storage.append_csv(batch.to_frame(), OUT_CSV)
+        delta.add_batch(batch)
+        fold(sums, batch)
+
+    with instrument.span("ingest"):
+        scored = asyncio.run(ingest(coins, ts_us, cap=cap, sink=sink))
+
+    with instrument.span("fetch.prices"):
+        prices = fetch_prices(coins).set_index("Coin")["PriceUSD"].to_dict()
+    return {"history": aggregate(sums, prices, ts_us).to_dict(), "agg": delta.to_dict(),
+            "prices": prices, "scored": scored}
+
+def _pool_shard(coins, ts_us, cap):
+    """ProcessPoolExecutor job: run_shard with the worker's spans/counters returned under "metrics"."""
+    instrument.start_run("analyze.pool_shard", profile=False)
+    try:
+        seg = run_shard(coins, ts_us, cap)
+    finally:
+        metrics = instrument.detach()
+    return {**seg, "metrics": metrics}
+
+def aggregate(sums, prices, ts_us):
+    """Weighted mean sentiment per source/coin (from fold()) → HistoryBatch with price and suggested action."""
+    hist = records.HistoryBatch()
+    for (src, code), (ws, w) in sorted(sums.items()):
+        if not w:
+            continue
+        avg   = ws / w
+        price = prices.get(records.coin_name(code)) or 0.0
+        hist.append(ts_us, code, src, avg, price, records.action_for(avg))
+    return hist
+
+def merge_segments(segments):
+    hist, agg, prices, scored = records.HistoryBatch(), sentiment_agg.Aggregator(), {}, 0
+    for seg in segments:
+        hist.extend(records.HistoryBatch.from_dict(seg["history"]))
+        agg.merge(sentiment_agg.Aggregator.from_dict(seg.get("agg")))
+        prices.update(seg["prices"])
+        scored += seg.get("scored", 0)
+    return {"history": hist, "agg": agg, "prices": prices, "scored": scored}
+
+def segment_path(run_id, index, count):
+    return os.path.join(SHARD_DIR, run_id, f"shard-{index}-of-{count}.json")
+
+def default_run_id(now=None):
+    """Workers on different machines agree on the run id: the current UTC hour."""
+    return (now or datetime.utcnow()).strftime("%Y%m%dT%H")
+
+def write_segment(run_id, index, count, cap=POSTS_PER_COIN):
+    """Worker mode: process shard `index` of `count` and leave its segment for the coordinator."""
+    coins = coin_registry.shard(COINS, index, count)
+    seg   = run_shard(coins, records.now_us(), cap)
+    path  = segment_path(run_id, index, count)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    storage.write_json(seg, path)
+    print(f"🧩 Shard {index}/{count} ({len(coins)} coins) → {path}")
+
+def collect_segments(run_id, count, wait_s=SHARD_WAIT_S):
+    """Coordinator: wait for all `count` segments of `run_id` (up to wait_s), then load them."""
+    deadline = time.monotonic() + wait_s
+    paths    = [segment_path(run_id, i, count) for i in range(count)]
+    while not all(os.path.exists(p) for p in paths) and time.monotonic() < deadline:
+        time.sleep(5)
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"⚠️ Merging without {len(missing)} missing shard(s): {missing}")
+    return [storage.read_json(p) for p in paths if os.path.exists(p)]
 
 # ─── MAIN ───────────────────────────────────────────────────────────────────
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Scrape, score, predict and alert for every registry coin")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("SAE_WORKERS", "1")),
+                    help="process pool size; coins are split into this many shards")
+    ap.add_argument("--shard", help="worker mode, e.g. 2/8: process one shard, write its segment, exit")
+    ap.add_argument("--merge", type=int, metavar="N",
+                    help="coordinator mode: merge the N shard segments of --run-id and finish the run")
+    ap.add_argument("--run-id", help="shared id for --shard/--merge (default: current UTC hour)")
+    ap.add_argument("--cap", type=int, default=POSTS_PER_COIN or 0,
+                    help="new documents scored per coin and source (0 = no cap)")
+    args = ap.parse_args(argv)
+    run_id = args.run_id or default_run_id()
+    cap    = args.cap or None
+
+    if args.shard:
+        index, count = coin_registry.parse_shard(args.shard)
+        with instrument.run(f"analyze.shard{index}of{count}"):
+            write_segment(run_id, index, count, cap)
+        return
+
+    # one JSON timing record per run in logs/run_metrics.jsonl
+    with instrument.run("analyze"):
+        if args.merge:
+            with instrument.span("shards.collect"):
+                segments = collect_segments(run_id, args.merge)
+            run_once(segments=segments)
+        else:
+            run_once(workers=args.workers, cap=cap)
+
+def run_once(workers=1, segments=None, cap=POSTS_PER_COIN):
     now    = datetime.utcnow().replace(tzinfo=timezone.utc)
     ts_iso = now.isoformat()
+    ts_us  = records.epoch_us(now)
+
+    # 1) Scrape & analyze – in-process, across a local process pool, or
+    #    already done by remote --shard workers (segments)
+    if segments is None:
+        if workers > 1:
+            shards = [coin_registry.shard(COINS, i, workers) for i in range(workers)]
+            shards = [s for s in shards if s]
+            with instrument.span("shards"), ProcessPoolExecutor(len(shards)) as pool:
+                segments = list(pool.map(_pool_shard, shards, [ts_us] * len(shards), [cap] * len(shards)))
+            for seg in segments:
+                instrument.merge(seg.pop("metrics"))
+        else:
+            segments = [run_shard(COINS, ts_us, cap)]
+    # scored rows are already in OUT_CSV (appended by the shards as they streamed)
+    merged = merge_segments(segments)
+    hist_rows, prices = merged["history"], merged["prices"]
+    instrument.count("rows.scored", merged["scored"])
+
+    # running weighted sums per coin/source/hour – every scored post counts
+    with instrument.span("aggregate"):
+        with sentiment_agg.update() as agg:
+            agg.merge(merged["agg"])
 
-    # 1) Scrape & analyze
-    rows = []
-    for coin in COINS:
-        # reddit
-        for post in fetch_reddit_posts([coin])[:5]:
-            text = post.get("Text", "")
-            s    = analyze_sentiment(text)
-            rows.append({
-                "Timestamp": ts_iso, "Coin": coin,
-                "Source":    "Reddit", "Text": text,
-                "Sentiment": s
-            })
-        # news
-        for art in fetch_rss_articles(coin)[:5]:
-            text = art.get("text", "")
-            s    = analyze_sentiment(text)
-            rows.append({
-                "Timestamp": ts_iso, "Coin": coin,
-                "Source":    "News",   "Text": text,
-                "Sentiment": s
-            })
-
-    header1 = not os.path.exists(OUT_CSV)
-    with open(OUT_CSV, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=rows[0].keys())
-        if header1: w.writeheader()
-        w.writerows(rows)
-    dedupe_csv(OUT_CSV, ["Timestamp", "Coin", "Source", "Text"])
+    # shift / volume / action-flip events go out as soon as they're seen, not with the hourly digest
+    signal = agg.means(SIGNAL_WINDOW_H, now=ts_us)  # O(1) per coin from the rollup
+    with instrument.span("shift_detect"):
+        events = shift_detect.update(agg, ts_us, signal)
+    instrument.count("shift.events", len(events))
+    if events:
+        with instrument.span("telegram"):
+            send_telegram_message(shift_detect.format_events(events))
 
     # 2) Append to history
-    prices    = fetch_prices(COINS).set_index("Coin")["PriceUSD"].to_dict()
-    hist_rows = []
-    df        = pd.DataFrame(rows)
-    for src in ("Reddit", "News"):
-        sub = df[df.Source == src]
-        for coin, avg in sub.groupby("Coin")["Sentiment"].mean().items():
-            price  = prices.get(coin, 0.0)
-            action = (
-                "📈 Buy"  if avg > 0.2 else
-                "📉 Sell" if avg < -0.2 else
-                "🤝 Hold"
-            )
-            hist_rows.append({
-                "Timestamp":       ts_iso,
-                "Coin":            coin,
-                "Source":          src,
-                "Sentiment":       round(avg, 4),
-                "PriceUSD":        round(price, 2),
-                "SuggestedAction": action
-            })
-
-    header2 = not os.path.exists(HIST_CSV)
-    with open(HIST_CSV, "a", newline="", encoding="utf-8") as f:
-        w2 = csv.DictWriter(f, fieldnames=hist_rows[0].keys())
-        if header2: w2.writeheader()
-        w2.writerows(hist_rows)
-    dedupe_csv(HIST_CSV, ["Timestamp", "Coin", "Source"])
-
-    # 3) Always log next-hour predictions
+    instrument.count("rows.history", len(hist_rows))
+    if len(hist_rows):
+        # appended, not rewritten: only this run's rows are parsed into the Arrow copy
+        with instrument.span("write.history"):
+            history_store.append(HIST_CSV, hist_rows.to_frame())
+
+    # 3) Always log predictions for every horizon
     ensure_pred_log()
-    full = pd.read_csv(HIST_CSV)
-    full["Timestamp"] = full["Timestamp"].apply(parser.isoparse)
-    cutoff   = now - timedelta(hours=1)
-    avg_sents = [
-        full[(full.Coin==coin)&(full.Timestamp>cutoff)]["Sentiment"].mean() or 0.0
-        for coin in COINS
-    ]
+    cutoff = (now - timedelta(hours=1)).replace(tzinfo=None)
+    with instrument.span("read.history"):
+        full = history_store.load_history(HIST_CSV, start=cutoff, columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"])
+    instrument.count("rows.history_recent", len(full))
+    # last hour of history only for coins the aggregator / price feed has nothing on yet
+    recent = full[full.Timestamp > cutoff].groupby("Coin", observed=True)["Sentiment"].mean()
+    last   = full.dropna(subset=["PriceUSD"]).groupby("Coin", observed=True)["PriceUSD"].last()
+    avg_sents = [float(signal.get(coin, recent.get(coin, 0.0))) for coin in COINS]
 
-    preds = predict_prices(pd.DataFrame({"AvgSentiment": avg_sents}))
-    log   = load_json(PRED_LOG_JSON)
-    for coin, p in zip(COINS, preds):
-        entry = {"timestamp": ts_iso, "predicted": round(float(p), 2)}
-        log[coin].insert(0, entry)
-    save_json(log, PRED_LOG_JSON)
-    print(f"📝 prediction_log.json updated with: {dict(zip(COINS, preds))}")
+    # features once per run (kept incrementally in feature_state.json), shared by every horizon's model
+    with instrument.span("predict"):
+        features  = update_features(avg_sents, {c: prices.get(c) or last.get(c) for c in COINS}, now)
+        forecasts = predict_horizons(features)
+    with storage.update_json(PRED_LOG_JSON, default={}) as log:
+        for h, hpreds in forecasts.items():
+            for coin, p in zip(COINS, hpreds):
+                if not np.isfinite(p):
+                    continue  # no price for this coin this run – nothing for a price/return model to go on
+                entry = {"timestamp": ts_iso, "horizon_h": h, "predicted": round(float(p), 2)}
+                if prices.get(coin):
+                    entry["current"] = round(float(prices[coin]), 2)  # price when predicted, for directional accuracy
+                log.setdefault(coin, []).insert(0, entry)
+    for h, hpreds in forecasts.items():
+        print(f"📝 prediction_log.json updated with {h}h: {dict(zip(COINS, np.round(hpreds, 2).tolist()))}")
 
     # 4) Hourly Telegram Alert
     alert = load_json(ALERT_LOG_JSON)
@@ -168,26 +404,38 @@ def main():
     send  = (last is None or (now - last >= timedelta(hours=1)))
 
     if send:
-        # 4a) Sentiment (last hr)
-        sent_lines = ["Sentiment (last hr)"]
+        # 4a) Sentiment (weighted, recency-decayed)
+        sent_lines = [f"Sentiment (last {SIGNAL_WINDOW_H}h, weighted)"]
         for coin, avg in zip(COINS, avg_sents):
             sent_lines.append(f"{coin}: {avg:+.2f}")
 
-        # 4b) 24h Prediction Accuracy
-        acc_lines = ["24h Prediction Acc"]
+        # 4b) 24h Prediction Accuracy (precomputed by accuracy.record)
+        acc_lines = [f"24h Prediction Acc (±{TOL_PCT}%)"]
+        acc_24h   = accuracy.load_summary(ACCURACY_JSON, PRED_LOG_JSON)
         for coin in COINS:
-            entries = log.get(coin, [])
-            acc = next((e.get("accurate", True) for e in entries if "accurate" in e), True)
-            acc_lines.append(f"{coin}: {int(acc)*100}%")
-
-        # 4c) Next Hour Forecast
-        next_lines = ["Next Hour Forecast"]
-        for coin, p in zip(COINS, preds):
-            t1     = (now + timedelta(hours=1)).strftime("%H:%M UTC")
-            curr   = prices.get(coin, 0.0)
-            change = (p - curr) / curr * 100 if curr else 0.0
-            arrow  = "↑" if change >= 0 else "↓"
-            next_lines.append(f"{coin} by {t1}: ${p:,.2f} ({arrow}{abs(change):.1f}%)")
+            m = acc_24h.get(coin, {}).get("24h", {})
+            if not m.get("n"):
+                acc_lines.append(f"{coin}: –")
+                continue
+            line = f"{coin}: {m['hit_rate']:.0%} of {m['n']}, MAPE {m['mape']:.1f}%"
+            if m.get("directional") is not None:
+                line += f", dir {m['directional']:.0%}"
+            acc_lines.append(line)
+
+        # 4c) Forecast per horizon
+        next_lines = [f"Forecast ({' / '.join(f'{h}h' for h in forecasts)})"]
+        for i, coin in enumerate(COINS):
+            curr  = prices.get(coin, 0.0)
+            parts = []
+            for h, hpreds in forecasts.items():
+                p = hpreds[i]
+                if not np.isfinite(p):
+                    parts.append(f"{h}h –")
+                    continue
+                change = (p - curr) / curr * 100 if curr else 0.0
+                arrow  = "↑" if change >= 0 else "↓"
+                parts.append(f"{h}h ${p:,.2f} ({arrow}{abs(change):.1f}%)")
+            next_lines.append(f"{coin}: " + " · ".join(parts))
 
         body = "\n\n".join([
             "⏰ Hourly Sentiment & Forecast",
@@ -195,25 +443,18 @@ def main():
             "\n".join(acc_lines),
             "\n".join(next_lines),
         ])
-        send_telegram_message(body)
+        with instrument.span("telegram"):
+            send_telegram_message(body)
         alert["last_alert"] = ts_iso
         save_json(alert, ALERT_LOG_JSON)
 
-    # 5) Update actuals & auto-push
-    update_predictions_with_actuals()
-    auto_push.auto_push()
-
-    # 6) Commit-diff helper
-    try:
-        files = subprocess.check_output(
-            ["git","diff-tree","--no-commit-id","--name-only","-r","HEAD"],
-            text=True
-        ).splitlines()
-        print("✅ Files updated in last commit:")
-        for f in files:
-            print(" -", f)
-    except Exception as e:
-        print("⚠️ Diff helper error:", e)
+    # 5) Update actuals, refresh dashboard rollups & queue a publish
+    with instrument.span("actuals"):
+        update_predictions_with_actuals()
+    with instrument.span("rollups"):
+        rollups.build_rollups()
+    # git commit/push happens in the background publisher (auto_push.run_forever)
+    auto_push.request_publish()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -6,6 +6,8 @@ from textblob import TextBlob
 from crypto_price_alerts import COINS
 from fetch_prices import fetch_prices
 from reddit_fetch import fetch_reddit_posts
+from records import HistoryBatch, SOURCE_LABELS, action_for, coin_code, coin_name, now_us
+import sentiment_agg
 
 # Load environment vars
 load_dotenv()
@@ -24,41 +26,29 @@ def analyze_sentiment(text: str) -> float:
 def get_latest_sentiment():
     """
     Fetch latest sentiment for each coin from Reddit posts.
-    Aggregates sentiment and attaches price and suggested action.
+    Aggregates sentiment (credibility-weighted, recency-decayed, see
+    sentiment_agg) and attaches price and suggested action.
 
     Returns:
-        List[Dict]: entries with Timestamp, Coin, Source, Sentiment,
-                     PriceUSD, SuggestedAction.
+        records.HistoryBatch: one row per coin/source (Timestamp, Coin,
+        Source, Sentiment, PriceUSD, SuggestedAction); .to_frame() for pandas.
     """
-    items = []
-    ts = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
-    for coin in COINS:
-        for post in fetch_reddit_posts('CryptoCurrency', coin, 5):
-            items.append({
-                'Timestamp': ts,
-                'Coin': coin,
-                'Source': 'Reddit',
-                'text': post['text'],
-            })
+    ts    = now_us()
+    posts = fetch_reddit_posts(COINS)
+
+    agg = sentiment_agg.Aggregator().add_many(
+        [p.ts for p in posts],
+        [coin_name(p.coin) for p in posts],
+        [p.source for p in posts],
+        [analyze_sentiment(p.text) for p in posts],
+        [sentiment_agg.weight(p.source) for p in posts],
+    )
 
     # fetch current prices once
     prices = fetch_prices(COINS).set_index('Coin')['PriceUSD'].to_dict()
-    out = []
-    for item in items:
-        sent = analyze_sentiment(item['text'])
-        price = prices.get(item['Coin'], 0.0) or 0.0
-        if sent >  0.2:
-            action = "BUY"
-        elif sent < -0.2:
-            action = "SELL"
-        else:
-            action = "HOLD"
-        out.append({
-            'Timestamp':       item['Timestamp'],
-            'Coin':            item['Coin'],
-            'Source':          item['Source'],
-            'Sentiment':       sent,
-            'PriceUSD':        round(price, 2),
-            'SuggestedAction': action,
-        })
+    out = HistoryBatch()
+    labels = {v: k for k, v in SOURCE_LABELS.items()}
+    for row in agg.summary(sentiment_agg.RETAIN_H, now=ts, by_source=True).itertuples():
+        price = prices.get(row.Coin, 0.0) or 0.0
+        out.append(ts, coin_code(row.Coin), labels[row.Source], row.Sentiment, price, action_for(row.Sentiment))
     return out
@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import uuid
-from PIL import Image
-from io import BytesIO
 from supabase import create_client, Client
 import os
+from contextlib import closing
+
+import data_cache
+import client_search
+import image_pipeline
+import client_export
+import client_sync
 
 # --- CONFIG ---
 url = "https://xxyfipfbnusrowhbtwkb.supabase.co"
@@ -15,21 +19,6 @@ st.set_page_config(page_title="MEGA Client Manager", layout="centered")
 MAX_MB = 5
 MAX_BYTES = MAX_MB * 1024 * 1024
 
-def crop_center_square(image_file):
-    img = Image.open(image_file)
-    width, height = img.size
-    min_dim = min(width, height)
-    left = (width - min_dim) / 2
-    top = (height - min_dim) / 2
-    right = (width + min_dim) / 2
-    bottom = (height + min_dim) / 2
-    return img.crop((left, top, right, bottom))
-
-def upload_image(bucket, file_obj, content_type):
-    path = f"{bucket}/{uuid.uuid4().hex}.jpg"
-    supabase.storage.from_(bucket).upload(path, file_obj, {"content-type": content_type})
-    return f"https://xxyfipfbnusrowhbtwkb.supabase.co/storage/v1/object/public/{path}", path
-
 # --- HEADER ---
 logo_path = "MEGA_logo.jpg"  # Ensure this is in your working directory!
 # Centering logo + headers using columns for best Streamlit appearance
@@ -45,38 +34,62 @@ with col2:
 st.markdown("---")
 
 # --- DATA ---
-@st.cache_data(ttl=60)
-def fetch_clients():
-    res = supabase.table("clients").select("*").execute()
-    return pd.DataFrame(res.data or [])
+# Shared across sessions; only refreshed when the table's version changes
+# (row count + newest last_update), checked at most every few seconds, and
+# then by an incremental pull into the client_sync SQLite mirror.
+CLIENTS_KEY = ("supabase", "clients")
+CLIENTS_INDEX_KEY = ("supabase", "clients", "search_index")
 
-df = fetch_clients()
-if "id" in df.columns:
-    df = df.drop(columns=["id"])
+def clients_version():
+    res = (supabase.table("clients").select("last_update", count="exact")
+           .order("last_update", desc=True).limit(1).execute())
+    return (res.count, res.data[0]["last_update"] if res.data else None)
+
+def fetch_clients():
+    """(clients frame, search index) – both rebuilt only when the data version changes."""
+    version = data_cache.probe(CLIENTS_KEY, clients_version)
+
+    def load():
+        # only rows changed since the mirror's watermark come over the wire
+        with closing(client_sync.open_mirror()) as conn:
+            client_sync.sync(supabase, conn, remote_count=version[0])
+            return client_sync.load_frame(conn)
+
+    clients = data_cache.get(CLIENTS_KEY, load, version=version)
+    index = data_cache.get(CLIENTS_INDEX_KEY, lambda: client_search.ClientIndex(clients), version=version)
+    return clients, index
+
+def refresh_clients():
+    data_cache.invalidate(CLIENTS_KEY, CLIENTS_INDEX_KEY)
+
+def match_client(query, row):
+    """Supabase filter for one client: by id when we have it, else by name."""
+    if "id" in row and pd.notna(row["id"]):
+        return query.eq("id", row["id"])
+    return query.eq("name", row["name"])
+
+def release_image(bucket, column, image_url):
+    """Delete an uploaded image (and its thumbnail) once no client row points at it any more."""
+    if pd.isna(image_url) or not image_url:
+        return
+    # content-hashed names: clients with the same logo/photo share one object
+    res = supabase.table("clients").select("name", count="exact").eq(column, image_url).limit(1).execute()
+    if not res.count:
+        image_pipeline.remove(supabase.storage, bucket, image_url)
+
+# Shared, read-only frame – never mutated in place here
+df, index = fetch_clients()
 
 selected_row = {}
 with st.expander("🔍 Find Client"):
-    col1, col2 = st.columns(2)
-    search_name = col1.text_input("Search by Name").strip().lower()
-    search_legal = col2.text_input("Search by Legal Name").strip().lower()
-
-    df["display"] = df.apply(
-        lambda x: f'{x["name"]} — {x["legal_name"]}' if pd.notna(x["legal_name"]) else x["name"], axis=1
-    )
-    selected_combo = st.selectbox("🔽 Or Select from Full List", df["display"].sort_values())
-
-    if selected_combo:
-        base_name = selected_combo.split(" — ")[0]
-        selected_df = df[df["name"] == base_name]
-    elif search_name:
-        selected_df = df[df["name"].str.lower().str.contains(search_name)]
-    elif search_legal:
-        selected_df = df[df["legal_name"].str.lower().str.contains(search_legal)]
-    else:
-        selected_df = pd.DataFrame()
+    query = st.text_input("Search by name, legal name, company or email").strip()
+    options = index.search(query) if query else index.sorted_ids
+    if query and not options:
+        st.info("No matching clients.")
 
-    if not selected_df.empty:
-        selected_row = selected_df.iloc[0].to_dict()
+    selected_id = st.selectbox("🔽 Select Client", options, format_func=index.label)
+    if selected_id is not None:
+        selected_row = index.row(selected_id)
 
 with st.expander("➕ Add or Edit Client"):
     mode = st.radio("Mode", ["Add New", "Edit Selected"], horizontal=True)
@@ -114,34 +127,27 @@ with st.expander("➕ Add or Edit Client"):
             old_photo_url = selected_row.get("photo_url", "")
 
             logo_file = st.file_uploader("📎 Upload Company Logo (Max 5MB, JPG/PNG)", type=["jpg", "jpeg", "png"])
-            logo_url = old_logo_url
-            if logo_file:
-                if logo_file.size > MAX_BYTES:
-                    st.error("Logo file too large (5MB max)")
-                else:
-                    cropped = crop_center_square(logo_file)
-                    buffer = BytesIO()
-                    cropped.save(buffer, format="JPEG")
-                    buffer.seek(0)
-                    logo_url, _ = upload_image("logos", buffer, "image/jpeg")
-                    st.success("✅ Logo uploaded!")
-            if logo_url:
-                st.image(logo_url, caption="Logo", width=150)
-
             photo_file = st.file_uploader("📷 Upload Headshot (Max 5MB, JPG/PNG)", type=["jpg", "jpeg", "png"])
-            photo_url = old_photo_url
-            if photo_file:
-                if photo_file.size > MAX_BYTES:
-                    st.error("Photo file too large (5MB max)")
-                else:
-                    cropped = crop_center_square(photo_file)
-                    buffer = BytesIO()
-                    cropped.save(buffer, format="JPEG")
-                    buffer.seek(0)
-                    photo_url, _ = upload_image("headshots", buffer, "image/jpeg")
-                    st.success("✅ Headshot uploaded!")
+
+            # Crop/resize + upload both images concurrently on the image worker pool
+            jobs = {}
+            for label, bucket, upload in (("Logo", "logos", logo_file), ("Headshot", "headshots", photo_file)):
+                if not upload:
+                    continue
+                if upload.size > MAX_BYTES:
+                    st.error(f"{label} file too large ({MAX_MB}MB max)")
+                    continue
+                jobs[label] = image_pipeline.submit(supabase.storage, url, bucket, upload.getvalue())
+
+            logo_url = jobs["Logo"].result() if "Logo" in jobs else old_logo_url
+            photo_url = jobs["Headshot"].result() if "Headshot" in jobs else old_photo_url
+            for label in jobs:
+                st.success(f"✅ {label} uploaded!")
+
+            if logo_url:
+                st.image(image_pipeline.thumb_url(logo_url), caption="Logo", width=image_pipeline.THUMB_PX)
             if photo_url:
-                st.image(photo_url, caption="Headshot", width=150)
+                st.image(image_pipeline.thumb_url(photo_url), caption="Headshot", width=image_pipeline.THUMB_PX)
 
             submitted = st.form_submit_button("💾 Save Client")
             if submitted:
@@ -158,36 +164,47 @@ with st.expander("➕ Add or Edit Client"):
                     supabase.table("clients").insert(data).execute()
                     st.success("✅ New client added.")
                 else:
-                    supabase.table("clients").update(data).eq("name", selected_row["name"]).execute()
-                    if logo_file and old_logo_url:
-                        supabase.storage.from_("logos").remove(old_logo_url.split("/")[-1])
-                    if photo_file and old_photo_url:
-                        supabase.storage.from_("headshots").remove(old_photo_url.split("/")[-1])
+                    match_client(supabase.table("clients").update(data), selected_row).execute()
+                    # re-uploading the same image yields the same URL, keep it
+                    if logo_url != old_logo_url:
+                        release_image("logos", "logo_url", old_logo_url)
+                    if photo_url != old_photo_url:
+                        release_image("headshots", "photo_url", old_photo_url)
                     st.success("✅ Client updated.")
 
-                st.cache_data.clear()
+                refresh_clients()
                 st.rerun()
     else:
         st.warning("⚠️ Select a client before editing.")
 
 # --- DELETE CLIENT ---
 with st.expander("🗑 Delete Client"):
-    delete_name = st.selectbox("Choose Client to Delete", df["name"].dropna().unique())
-    if st.button("❌ Confirm Delete"):
-        row = df[df["name"] == delete_name].iloc[0]
-        if row.get("photo_url"):
-            supabase.storage.from_("headshots").remove(row["photo_url"].split("/")[-1])
-        if row.get("logo_url"):
-            supabase.storage.from_("logos").remove(row["logo_url"].split("/")[-1])
-        supabase.table("clients").delete().eq("name", delete_name).execute()
-        st.success(f"✅ Deleted {delete_name}")
-        st.cache_data.clear()
+    delete_id = st.selectbox("Choose Client to Delete", index.sorted_ids, format_func=index.label)
+    if st.button("❌ Confirm Delete") and delete_id is not None:
+        row = index.row(delete_id)
+        match_client(supabase.table("clients").delete(), row).execute()
+        release_image("headshots", "photo_url", row.get("photo_url"))
+        release_image("logos", "logo_url", row.get("logo_url"))
+        st.success(f"✅ Deleted {row['name']}")
+        refresh_clients()
         st.rerun()
 
 # --- EXPORT CLIENTS ---
 st.subheader("⬇️ Export Clients")
 if not df.empty:
-    csv = df.drop(columns=["id"], errors="ignore").to_csv(index=False).encode("utf-8")
-    st.download_button("Download CSV", data=csv, file_name="clients.csv", mime="text/csv")
+    fmt = st.radio("Format", list(client_export.FORMATS), horizontal=True)
+    if st.button("📦 Prepare Export"):
+        # streamed from the mirror fetch_clients() keeps current, one chunk
+        # at a time into a temp file – never the whole roster in memory
+        try:
+            with closing(client_sync.open_mirror()) as conn:
+                path = client_export.export_to_file(client_export.iter_mirror_chunks(conn), fmt)
+        except ImportError as e:
+            st.error(f"{fmt.upper()} export needs an extra package: {e.name}")
+        else:
+            with open(path, "rb") as f:
+                st.download_button(f"Download {fmt.upper()}", data=f, file_name=f"clients.{fmt}",
+                                   mime=client_export.FORMATS[fmt])
+            os.remove(path)
 else:
     st.warning("Nothing to export.")
@@ -1,38 +1,187 @@
 # auto_push.py
-import subprocess
-from datetime import datetime
+"""
+Background publisher for pipeline output.
+
+analyze.main no longer runs git itself: it calls request_publish(), which
+only drops a marker file. A publisher loop (started by scheduler.py in a
+background thread, or `python auto_push.py --loop`) wakes up every
+PUBLISH_INTERVAL_MIN minutes and, if anything is pending:
+
+  1. exports compact files instead of whole growing CSVs:
+       published/history/<stamp>.csv   – only history rows appended since the last publish
+       rollup_*.csv                    – small per-coin tables the dashboard reads
+  2. commits them in one batch
+  3. pushes with retries/backoff, rebasing onto the remote on a
+     non-fast-forward rejection
+
+The history CSV is append-only, so the publish watermark is a byte offset
+into it (plus a digest of the bytes before it): rows appended later with an
+older timestamp – shard merges, late sources – are still published. If the
+file was rewritten instead (a backfill), the whole history is exported once.
+
+Failures leave the marker in place, so the next cycle retries; nothing
+here ever raises into the ingest loop, and the loop survives any error.
+"""
+
 import os
 import sys
+import time
+import subprocess
+import threading
+import traceback
+from datetime import datetime
 
-def auto_push():
-    # files you want to stage
-    files = [
-        "sentiment_output.csv",
-        "sentiment_history.csv",
-        "analyze.py",
-        "dashboard.py"
-    ]
+import pandas as pd
 
-    # make sure we're in the project folder
-    repo_dir = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(repo_dir)
+import history_store
+import rollups
+import storage
 
-    # git add
-    for f in files:
-        if os.path.exists(f):
-            subprocess.run(["git", "add", f], check=True)
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+REPO_DIR             = os.path.dirname(os.path.abspath(__file__))
+PENDING_MARKER       = os.path.join(REPO_DIR, ".publish_pending")
+STATE_JSON           = os.path.join(REPO_DIR, "publish_state.json")
+DELTA_DIR            = os.path.join(REPO_DIR, "published", "history")
+HIST_CSV             = rollups.HIST_CSV
+PUBLISH_INTERVAL_MIN = int(os.getenv("PUBLISH_INTERVAL_MIN", "180"))
+PUBLISH_REMOTE       = os.getenv("PUBLISH_REMOTE", "origin")
+PUBLISH_BRANCH       = os.getenv("PUBLISH_BRANCH", "main")
+PUSH_RETRIES         = 3
+RETRY_BACKOFF_S      = 10
+GIT_TIMEOUT_S        = 120
 
-    # commit
-    msg = f"chore: auto-update @ {datetime.utcnow().isoformat()}Z"
-    subprocess.run(["git", "commit", "-m", msg], check=True)
+SNAPSHOT_FILES = [rollups.HOURLY_CSV, rollups.DAILY_CSV, rollups.WEEKLY_CSV, rollups.LATEST_CSV]
 
-    # push
-    subprocess.run(["git", "push", "origin", "main"], check=True)
-    print("✅ Auto-push complete.")
+_lock = threading.Lock()
 
-if __name__ == "__main__":
+# ─── HELPERS ────────────────────────────────────────────────────────────────
+def _git(*args, check=True):
+    return subprocess.run(
+        ["git", *args], cwd=REPO_DIR, check=check,
+        capture_output=True, text=True, timeout=GIT_TIMEOUT_S,
+    )
+
+def _load_state():
+    return storage.read_json(STATE_JSON, default={})
+
+def _save_state(state):
+    storage.write_json(state, STATE_JSON, backup=True)  # a torn watermark would re-export or skip rows
+
+def request_publish():
+    """Cheap, non-blocking: mark that new output is waiting to be published."""
+    with open(PENDING_MARKER, "w", encoding="utf-8") as f:
+        f.write(datetime.utcnow().isoformat())
+
+# ─── EXPORT ─────────────────────────────────────────────────────────────────
+def export_history_delta(state, stamp):
+    """Write the history rows appended since the last publish; return the file (or None)."""
+    if not os.path.exists(HIST_CSV):
+        return None
+    offset = state.get("history_offset")
+    if offset is not None and not (
+        offset <= storage.complete_size(HIST_CSV) and state.get("history_tail") == history_store.tail_digest(HIST_CSV, offset)
+    ):
+        print(f"⚠️ {os.path.basename(HIST_CSV)} was rewritten since the last publish; exporting all of it")
+        offset = None
+
+    hist, end = storage.read_csv_range(HIST_CSV, offset or 0)
+    if offset is None and state.get("history_watermark"):
+        # state from the timestamp watermark: one last cut-over by time (>=, so nothing is dropped)
+        ts   = history_store.parse_timestamps(hist["Timestamp"])
+        hist = hist[ts >= pd.Timestamp(state["history_watermark"]).tz_localize(None)]
+
+    path = None
+    if not hist.empty:
+        os.makedirs(DELTA_DIR, exist_ok=True)
+        path = os.path.join(DELTA_DIR, f"{stamp}.csv")
+        n = 1
+        while os.path.exists(path):  # two publishes within a second must not overwrite a delta
+            path, n = os.path.join(DELTA_DIR, f"{stamp}-{n}.csv"), n + 1
+        storage.write_csv(hist, path)
+    state.pop("history_watermark", None)
+    state["history_offset"] = end
+    state["history_tail"]   = history_store.tail_digest(HIST_CSV, end)
+    return path
+
+def push_with_retry():
+    """Push, rebasing onto the remote after a non-fast-forward; True on success."""
+    for attempt in range(1, PUSH_RETRIES + 1):
+        res = _git("push", PUBLISH_REMOTE, f"HEAD:{PUBLISH_BRANCH}", check=False)
+        if res.returncode == 0:
+            return True
+        err = res.stderr.lower()
+        print(f"⚠️ Push attempt {attempt}/{PUSH_RETRIES} failed: {res.stderr.strip()}")
+        if "non-fast-forward" in err or "fetch first" in err or "rejected" in err:
+            rebase = _git("pull", "--rebase", "--autostash", PUBLISH_REMOTE, PUBLISH_BRANCH, check=False)
+            if rebase.returncode != 0:
+                _git("rebase", "--abort", check=False)
+        if attempt < PUSH_RETRIES:
+            time.sleep(RETRY_BACKOFF_S * 2 ** (attempt - 1))
+    return False
+
+# ─── PUBLISH ────────────────────────────────────────────────────────────────
+def auto_push(force=False):
+    """
+    Publish pending output: export delta + snapshots, commit, push.
+    Returns True if everything (including the push) succeeded.
+    """
+    if not force and not os.path.exists(PENDING_MARKER):
+        return True
+    if not _lock.acquire(blocking=False):
+        return False  # a publish is already running
     try:
-        auto_push()
-    except subprocess.CalledProcessError as e:
-        print("❌ Git failed:", e)
-        sys.exit(1)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        state = _load_state()
+        before = dict(state)
+        export_history_delta(state, stamp)
+        if state != before:
+            _save_state(state)  # the delta file now exists; a failed commit picks it up next cycle
+
+        # whole delta dir, so deltas left over from a failed cycle are committed too
+        files = [p for p in SNAPSHOT_FILES if os.path.exists(p)]
+        if os.path.isdir(DELTA_DIR):
+            files.append(DELTA_DIR)
+        for f in files:
+            _git("add", os.path.relpath(f, REPO_DIR))
+        if _git("diff", "--cached", "--quiet", check=False).returncode != 0:
+            _git("commit", "-m", f"chore: publish pipeline output @ {stamp}")
+            print("✅ Committed:", ", ".join(os.path.relpath(f, REPO_DIR) for f in files))
+
+        # anything committed locally but not yet on the remote (including earlier failures)
+        ahead = _git("rev-list", "--count", f"{PUBLISH_REMOTE}/{PUBLISH_BRANCH}..HEAD", check=False)
+        if ahead.returncode == 0 and ahead.stdout.strip() == "0":
+            pushed = True
+        else:
+            pushed = push_with_retry()
+
+        if pushed:
+            if os.path.exists(PENDING_MARKER):
+                os.remove(PENDING_MARKER)
+            print("✅ Auto-push complete.")
+        return pushed
+    except Exception as e:  # git, filesystem, pandas/pyarrow – anything; the next cycle retries
+        print("❌ Publish failed, will retry next cycle:", e)
+        traceback.print_exc()
+        return False
+    finally:
+        _lock.release()
+
+def run_forever(interval_min=PUBLISH_INTERVAL_MIN):
+    """Publisher loop: batch whatever accumulated every `interval_min` minutes."""
+    while True:
+        try:
+            auto_push()
+        except Exception:  # never let the daemon thread die – publishing would stop silently
+            print("❌ Publisher cycle crashed, retrying next cycle:")
+            traceback.print_exc()
+        time.sleep(interval_min * 60)
+
+def start_background(interval_min=PUBLISH_INTERVAL_MIN):
+    thread = threading.Thread(target=run_forever, args=(interval_min,), name="publisher", daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    if "--loop" in sys.argv:
+        run_forever()
+    sys.exit(0 if auto_push(force=True) else 1)
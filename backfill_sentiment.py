@@ -9,11 +9,15 @@ import pandas as pd
 from dateutil import parser as isoparser
 from dotenv import load_dotenv
 
+import coin_registry
+import history_store
+from records import HistoryBatch, Action, Source, coin_code, epoch_us
+
 # ─── Load .env for optional Reddit creds ────────────────────────────────────
 load_dotenv()
 
 # ─── CONFIG ────────────────────────────────────────────────────────────────
-COINS          = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
+COINS          = coin_registry.names()
 SUBREDDIT      = "CryptoCurrency"
 HIST_CSV       = "sentiment_history.csv"
 PUSHSHIFT_URL  = "https://api.pushshift.io/reddit/search/submission"
@@ -22,6 +26,7 @@ HEADERS        = {"User-Agent": "backfill-sentiment-script"}
 
 # ─── USER’S SENTIMENT FUNCTION ─────────────────────────────────────────────
 from analyze_sentiment import analyze_sentiment
+import storage
 
 # ─── PUSHSHIFT FETCH ───────────────────────────────────────────────────────
 def fetch_pushshift(coin: str, after: int, before: int) -> list[str]:
@@ -90,18 +95,13 @@ def backfill(start_iso: str, end_iso: str):
     start = parse_iso(start_iso).replace(minute=0, second=0, microsecond=0)
     end   = parse_iso(end_iso)
 
-    # load existing history
-    if os.path.exists(HIST_CSV):
-        hist_df = pd.read_csv(HIST_CSV)
-    else:
-        hist_df = pd.DataFrame(columns=["Timestamp","Coin","Sentiment","PriceUSD"])
-
-    records = []
+    batch = HistoryBatch()  # columnar: ~30 bytes/row even for multi-month backfills
+    codes = {coin: coin_code(coin) for coin in COINS}
     curr = start
     while curr < end:
         after  = int(curr.timestamp())
         before = int((curr + timedelta(hours=1)).timestamp())
-        iso_ts = curr.astimezone(timezone.utc).isoformat()
+        ts_us  = epoch_us(curr)
 
         for coin in COINS:
             texts = fetch_pushshift(coin, after, before)
@@ -111,20 +111,22 @@ def backfill(start_iso: str, end_iso: str):
             sents = [analyze_sentiment(t) for t in texts]
             avg   = round(sum(sents)/len(sents), 4) if sents else 0.0
 
-            records.append({
-                "Timestamp": iso_ts,
-                "Coin":      coin,
-                "Sentiment": avg,
-                "PriceUSD":  0.0
-            })
+            batch.append(ts_us, codes[coin], Source.PUSHSHIFT, avg, 0.0, Action.HOLD)
 
         curr += timedelta(hours=1)
 
-    # merge + dedupe + write
-    new_df   = pd.DataFrame(records)
-    combined = pd.concat([hist_df, new_df], ignore_index=True)
-    combined.drop_duplicates(subset=["Timestamp","Coin"], keep="last", inplace=True)
-    combined.to_csv(HIST_CSV, index=False)
+    # merge + dedupe + write – re-read under the lock so rows analyze.py
+    # appended during the (long) fetch loop are not lost
+    new_df = batch.to_frame(columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"])
+    with storage.file_lock(HIST_CSV):
+        if os.path.exists(HIST_CSV):
+            hist_df = pd.read_csv(HIST_CSV)
+        else:
+            hist_df = pd.DataFrame(columns=["Timestamp","Coin","Sentiment","PriceUSD"])
+        combined = pd.concat([hist_df, new_df], ignore_index=True)
+        combined.drop_duplicates(subset=["Timestamp","Coin"], keep="last", inplace=True)
+        storage.write_csv(combined, HIST_CSV)
+    history_store.rebuild(HIST_CSV)
     print(f"✅ Finished backfill from {start_iso} to {end_iso}")
 
 # ─── CLI ───────────────────────────────────────────────────────────────────
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# backtest.py
+"""
+Walk-forward backtests of the two trading signals the pipeline produces.
+
+  • actions – the Buy/Sell/Hold rule written to sentiment_history.csv:
+              long when hourly sentiment > buy, short (or flat with
+              --long-only) when < -sell, otherwise keep the last position.
+              The position taken at the end of hour t earns the price move
+              to the end of hour t+1; fees are charged per unit of turnover.
+  • model   – the logged next-hour predictions: long/short when the
+              predicted move (predicted vs. the price when it was made)
+              exceeds ±threshold, held for the hour it predicts, fee on
+              entry and exit.
+
+Every threshold/fee combination of the grid is evaluated at once as NumPy
+arrays (grid × coin × hour); the grid is split across a process pool for
+large sweeps. Coins are equally weighted. Reported per configuration:
+total return, max drawdown, hit rate, Sharpe (annualised), trades, exposure.
+
+    python backtest.py
+    python backtest.py --buy 0.02:0.5:0.02 --sell 0.02:0.5:0.02 --fees 0,0.001,0.0025 --workers 8
+    python backtest.py --signal model --thresholds 0:0.05:0.0025 --out backtest_model.csv
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import coin_registry
+import history_store
+import storage
+from records import ACTION_BAND
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR       = os.path.dirname(os.path.abspath(__file__))
+HIST_CSV       = os.path.join(BASE_DIR, "sentiment_history.csv")
+PRED_LOG_JSON  = os.path.join(BASE_DIR, "prediction_log.json")
+BAR            = "1h"
+HOURS_PER_YEAR = 24 * 365
+GRID_CHUNK     = 64        # buy thresholds per worker task
+
+DEFAULT_BUY    = np.round(np.arange(0.02, 0.51, 0.02), 4)
+DEFAULT_SELL   = DEFAULT_BUY
+DEFAULT_FEES   = np.array([0.0, 0.001, 0.0025])
+DEFAULT_THRESH = np.round(np.arange(0.0, 0.0501, 0.0025), 4)
+
+METRICS = ["TotalReturnPct", "MaxDrawdownPct", "HitRate", "Sharpe", "Trades", "Exposure"]
+
+# ─── DATA ───────────────────────────────────────────────────────────────────
+def load_bars(hist_path=HIST_CSV, coins=None, bar=BAR):
+    """
+    Aligned hourly matrices (coins × bars): mean sentiment (NaN = no data
+    that hour) and the forward return from this bar's last price to the next.
+    """
+    coins = coins or coin_registry.names()
+    df = history_store.load_history(hist_path, columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"], coins=coins)
+    df = df.assign(Coin=df["Coin"].astype(str), PriceUSD=df["PriceUSD"].where(df["PriceUSD"] > 0))
+    g  = df.groupby(["Coin", pd.Grouper(key="Timestamp", freq=bar)])
+    agg = pd.DataFrame({"Sentiment": g["Sentiment"].mean(), "PriceUSD": g["PriceUSD"].last()}).reset_index()
+
+    index = pd.date_range(agg["Timestamp"].min(), agg["Timestamp"].max(), freq=bar) if len(agg) else pd.DatetimeIndex([])
+    sent  = agg.pivot(index="Timestamp", columns="Coin", values="Sentiment").reindex(index=index, columns=coins)
+    price = agg.pivot(index="Timestamp", columns="Coin", values="PriceUSD").reindex(index=index, columns=coins).ffill()
+    fwd   = (price.shift(-1) / price - 1).fillna(0.0)
+    return {"index": index, "coins": coins, "sentiment": sent.to_numpy().T, "returns": fwd.to_numpy().T}
+
+def load_predictions(log_path=PRED_LOG_JSON):
+    """Resolved next-hour predictions that know their starting price: coin, hour, expected and realised move."""
+    log  = storage.read_json(log_path, default={})
+    rows = [
+        (coin, e["timestamp"], e["predicted"], e["current"], e["actual"])
+        for coin, entries in log.items() for e in entries
+        if e.get("current") and e.get("actual") and e.get("predicted") is not None and e.get("horizon_h", 1) == 1
+    ]
+    df = pd.DataFrame(rows, columns=["Coin", "Timestamp", "Predicted", "Current", "Actual"])
+    df["Timestamp"] = history_store.parse_timestamps(df["Timestamp"])
+    df = df.dropna().sort_values("Timestamp").reset_index(drop=True)
+    df["Expected"] = df["Predicted"] / df["Current"] - 1
+    df["Realised"] = df["Actual"] / df["Current"] - 1
+    return df
+
+# ─── VECTORISED CORE ────────────────────────────────────────────────────────
+def _ffill_last(raw):
+    """Forward-fill NaNs along the last axis (NaN before the first signal → 0 = flat)."""
+    t    = raw.shape[-1]
+    seen = ~np.isnan(raw)
+    idx  = np.where(seen, np.arange(t), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    out  = np.take_along_axis(raw, idx, axis=-1)
+    return np.where(np.isnan(out), 0.0, out)
+
+def action_positions(sentiment, buy, sell, long_only=False):
+    """Positions for every (buy, sell) pair: shape (len(buy), len(sell), coins, bars)."""
+    s     = sentiment[None, None]
+    short = 0.0 if long_only else -1.0
+    raw   = np.where(s > buy[:, None, None, None], 1.0,
+            np.where(s < -sell[None, :, None, None], short, np.nan))
+    return _ffill_last(raw)
+
+def _metrics(pnl, active, hits, trades):
+    """
+    pnl: (..., bars) equal-weight portfolio return per bar; active/hits/trades:
+    (...,) counts summed over coins. Returns a dict of (...,) arrays.
+    """
+    equity = np.cumprod(1.0 + pnl, axis=-1)
+    peak   = np.maximum.accumulate(equity, axis=-1)
+    std    = pnl.std(axis=-1)
+    return {
+        "TotalReturnPct": (equity[..., -1] - 1.0) * 100 if pnl.shape[-1] else np.zeros(pnl.shape[:-1]),
+        "MaxDrawdownPct": (1.0 - equity / peak).max(axis=-1, initial=0.0) * 100,
+        "HitRate":        np.divide(hits, active, out=np.full(hits.shape, np.nan), where=active > 0),
+        "Sharpe":         np.divide(pnl.mean(axis=-1), std, out=np.zeros(std.shape), where=std > 0) * np.sqrt(HOURS_PER_YEAR),
+        "Trades":         trades,
+        "Exposure":       active,
+    }
+
+def evaluate_actions(sentiment, returns, buy, sell, fees, long_only=False):
+    """Metrics for the full buy × sell × fee grid; each value has shape (buy, sell, fee)."""
+    pos      = action_positions(sentiment, buy, sell, long_only)              # (B, S, C, T)
+    prev     = np.concatenate([np.zeros(pos.shape[:-1] + (1,)), pos[..., :-1]], axis=-1)
+    turnover = np.abs(pos - prev)
+    gross    = pos * returns                                                  # (B, S, C, T)
+    coins    = max(sentiment.shape[0], 1)
+    pnl      = (gross.sum(axis=2)[:, :, None] - fees[None, None, :, None] * turnover.sum(axis=2)[:, :, None]) / coins
+    moved    = (pos != 0) & (returns != 0)
+    active   = moved.sum(axis=(2, 3))
+    hits     = (moved & (gross > 0)).sum(axis=(2, 3))
+    trades   = (turnover > 0).sum(axis=(2, 3))
+    shape    = pnl.shape[:-1]
+    return _metrics(pnl, *(np.broadcast_to(x[:, :, None], shape) for x in (active, hits, trades)))
+
+def evaluate_model(preds, thresholds, fees):
+    """Metrics for the threshold × fee grid over logged predictions; each value has shape (threshold, fee)."""
+    exp, real = preds["Expected"].to_numpy(), preds["Realised"].to_numpy()
+    pos   = np.where(np.abs(exp)[None] > thresholds[:, None], np.sign(exp)[None], 0.0)   # (E, N)
+    gross = pos * real
+    cost  = 2 * fees[None, :, None] * np.abs(pos)[:, None]                             # (E, F, N)
+    net   = gross[:, None] - cost
+
+    # equal-weight portfolio per hour: average the predictions that share an hour
+    hour  = preds["Timestamp"].dt.floor(BAR)
+    codes, uniq = pd.factorize(hour, sort=True)
+    share = np.zeros((len(codes), len(uniq)))
+    share[np.arange(len(codes)), codes] = 1.0
+    share /= np.maximum(share.sum(axis=0), 1.0)
+    pnl   = net @ share                                                        # (E, F, H)
+
+    moved  = (pos != 0) & (real != 0)
+    active = moved.sum(axis=-1)
+    hits   = (moved & (gross > 0)).sum(axis=-1)
+    trades = (pos != 0).sum(axis=-1)
+    shape  = pnl.shape[:-1]
+    return _metrics(pnl, *(np.broadcast_to(x[:, None], shape) for x in (active, hits, trades)))
+
+# ─── GRID / LEADERBOARD ─────────────────────────────────────────────────────
+def _action_chunk(args):
+    sentiment, returns, buy, sell, fees, long_only = args
+    return buy, evaluate_actions(sentiment, returns, buy, sell, fees, long_only)
+
+def _table(params, metrics):
+    """Flatten a grid of metrics into one row per configuration."""
+    grids = np.meshgrid(*params.values(), indexing="ij")
+    out   = {name: g.ravel() for name, g in zip(params, grids)}
+    out.update({m: np.asarray(metrics[m], dtype="float64").ravel() for m in METRICS})
+    return pd.DataFrame(out)
+
+def sweep_actions(bars, buy=DEFAULT_BUY, sell=DEFAULT_SELL, fees=DEFAULT_FEES, long_only=False, workers=1):
+    """Leaderboard for the action rule over buy × sell × fee (buy thresholds split across `workers` processes)."""
+    buy, sell, fees = (np.asarray(x, dtype="float64") for x in (buy, sell, fees))
+    size  = min(GRID_CHUNK, max(1, -(-len(buy) // (workers * 2))))  # ~2 chunks per worker keeps them all busy
+    tasks = [(bars["sentiment"], bars["returns"], buy[i:i + size], sell, fees, long_only) for i in range(0, len(buy), size)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            results = list(pool.map(_action_chunk, tasks))
+    else:
+        results = [_action_chunk(t) for t in tasks]
+    frames = [_table({"Buy": b, "Sell": sell, "Fee": fees}, m) for b, m in results]
+    return pd.concat(frames, ignore_index=True).sort_values("TotalReturnPct", ascending=False, ignore_index=True)
+
+def sweep_model(preds, thresholds=DEFAULT_THRESH, fees=DEFAULT_FEES):
+    thresholds, fees = (np.asarray(x, dtype="float64") for x in (thresholds, fees))
+    table = _table({"Threshold": thresholds, "Fee": fees}, evaluate_model(preds, thresholds, fees))
+    return table.sort_values("TotalReturnPct", ascending=False, ignore_index=True)
+
+# ─── CLI ────────────────────────────────────────────────────────────────────
+def _grid(text):
+    """"0.05,0.1" or "start:stop:step" (stop inclusive) → array."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 10)
+    return np.array([float(x) for x in text.split(",") if x])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Backtest the sentiment action rule and the model predictions")
+    ap.add_argument("--signal", choices=["actions", "model", "both"], default="both")
+    ap.add_argument("--buy", type=_grid, default=DEFAULT_BUY, help='buy thresholds, "a,b,c" or "start:stop:step"')
+    ap.add_argument("--sell", type=_grid, default=DEFAULT_SELL, help="sell thresholds (magnitude: sell below -x)")
+    ap.add_argument("--thresholds", type=_grid, default=DEFAULT_THRESH, help="model: minimum predicted move (fraction)")
+    ap.add_argument("--fees", type=_grid, default=DEFAULT_FEES, help="fee per unit traded (fraction, e.g. 0.001)")
+    ap.add_argument("--long-only", action="store_true", help="Sell goes flat instead of short")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--out", help="write the full leaderboard(s) to this CSV (suffixed per signal)")
+    args = ap.parse_args(argv)
+
+    boards = {}
+    if args.signal in ("actions", "both"):
+        bars = load_bars()
+        t0   = time.perf_counter()
+        board = sweep_actions(bars, args.buy, args.sell, args.fees, args.long_only, args.workers)
+        print(f"📈 Actions: {len(board):,} configurations × {len(bars['coins'])} coins × {len(bars['index']):,} bars "
+              f"in {time.perf_counter() - t0:.2f}s")
+        current = board[np.isclose(board.Buy, ACTION_BAND) & np.isclose(board.Sell, ACTION_BAND)]
+        if not current.empty:
+            print(f"   current ±{ACTION_BAND} rule:\n{current.to_string(index=False)}")
+        print(board.head(args.top).to_string(index=False))
+        boards["actions"] = board
+
+    if args.signal in ("model", "both"):
+        preds = load_predictions()
+        if preds.empty:
+            print("⚠️ No resolved predictions with a starting price yet – skipping the model backtest.")
+        else:
+            t0    = time.perf_counter()
+            board = sweep_model(preds, args.thresholds, args.fees)
+            print(f"🤖 Model: {len(board):,} configurations × {len(preds):,} predictions in {time.perf_counter() - t0:.2f}s")
+            print(board.head(args.top).to_string(index=False))
+            boards["model"] = board
+
+    if args.out:
+        stem, ext = os.path.splitext(args.out)
+        for name, board in boards.items():
+            path = f"{stem}_{name}{ext or '.csv'}" if len(boards) > 1 else args.out
+            storage.write_csv(board, path)
+            print(f"💾 {name} leaderboard → {path}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# benchmark.py
+"""
+Offline benchmark harness for the pipeline's hot paths.
+
+Recorded fixtures in fixtures/ (a Reddit listing, an RSS feed, a CoinGecko
+price response and wallet-explorer responses) are replayed through local
+stand-ins, so no benchmark touches the network. Each case runs at several
+synthetic data sizes (1x / 10x / 100x by default) inside a scratch
+directory and reports latency and throughput.
+
+    python benchmark.py --baseline base.json --save-baseline   # record this machine's numbers
+    python benchmark.py --baseline base.json                   # run everything, compare to them
+    python benchmark.py --baseline base.json --only ingest --scales 1,10
+
+Timings only compare on the same machine, so no baseline is committed:
+record one where the comparison will run (CI runner, your laptop) and
+pass it with --baseline every time. Comparison exits non-zero when any
+case is slower than the baseline by more than --tolerance. Cases whose
+optional dependencies (sklearn for the model cases, praw/textblob/
+feedparser for ingest and scoring) are not installed are skipped.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import tempfile
+import contextlib
+import statistics
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+FIXTURES      = os.path.join(BASE_DIR, "fixtures")
+COINS         = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
+SOURCES       = ["Reddit", "News"]
+BASE_HIST_ROWS = 2000   # history rows at scale 1x
+UNRESOLVED_HRS = 48     # predictions still waiting for an actual, per coin
+DEFAULT_SCALES = [1, 10, 100]
+
+BENCHMARKS = {}
+REQUIRES   = {}  # name → modules the case imports that may not be installed
+_patches   = []  # (obj, attr, original) undone after every case
+
+def benchmark(name, requires=()):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        REQUIRES[name]   = requires
+        return fn
+    return register
+
+def missing(name):
+    """Modules case `name` needs that are not installed here."""
+    return [m for m in REQUIRES[name] if importlib.util.find_spec(m) is None]
+
+# ─── FIXTURES & STAND-INS ───────────────────────────────────────────────────
+def patch(obj, attr, value):
+    """Swap in a stand-in for the duration of the current case."""
+    _patches.append((obj, attr, getattr(obj, attr)))
+    setattr(obj, attr, value)
+
+def _undo_patches():
+    while _patches:
+        obj, attr, original = _patches.pop()
+        setattr(obj, attr, original)
+
+def fixture(name, mode="r"):
+    path = os.path.join(FIXTURES, name)
+    if name.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload    = payload
+        self.status_code = status_code
+        self.text        = payload if isinstance(payload, str) else json.dumps(payload)
+
+    def json(self):
+        return self._payload if not isinstance(self._payload, str) else json.loads(self._payload)
+
+    def raise_for_status(self):
+        pass
+
+class FakeReddit:
+    """praw.Reddit stand-in: subreddit(...).new() yields the recorded (scaled) listing."""
+    def __init__(self, listing):
+        self._subs = [SimpleNamespace(**s) for s in listing]
+
+    def subreddit(self, name):
+        return self
+
+    def new(self, limit=None):
+        return iter(self._subs)  # whole scaled listing, regardless of the caller's limit
+
+def scaled_rss(scale):
+    xml = fixture("rss_feed.xml")
+    head, _, rest = xml.partition("<item>")
+    items, _, tail = ("<item>" + rest).rpartition("</item>")
+    return head + (items + "</item>\n") * scale + tail
+
+# ─── SYNTHETIC DATA ─────────────────────────────────────────────────────────
+def make_history(rows, seed=42):
+    """Hourly history in the same shape analyze.py writes (one row per coin × source × hour)."""
+    rng   = np.random.default_rng(seed)
+    hours = max(rows // (len(COINS) * len(SOURCES)), 2)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    base  = {"Bitcoin": 100000.0, "Ethereum": 2500.0, "Solana": 170.0, "Dogecoin": 0.22}
+    frames = []
+    for coin in COINS:
+        price = base[coin] * np.exp(np.cumsum(rng.normal(0, 0.004, hours)))
+        for src in SOURCES:
+            sent = np.clip(rng.normal(0.05, 0.12, hours), -1, 1).round(4)
+            frames.append(pd.DataFrame({
+                "Timestamp": [(start + timedelta(hours=h)).isoformat() for h in range(hours)],
+                "Coin": coin, "Source": src, "Sentiment": sent,
+                "PriceUSD": price.round(2),
+                "SuggestedAction": np.where(sent > 0.2, "📈 Buy", np.where(sent < -0.2, "📉 Sell", "🤝 Hold")),
+            }))
+    return pd.concat(frames, ignore_index=True).sort_values("Timestamp", kind="stable")
+
+def make_pred_log(hist, unresolved_hrs=UNRESOLVED_HRS):
+    """prediction_log.json content: resolved entries for old hours, unresolved for the last few."""
+    log = {}
+    for coin, sub in hist[hist.Source == "News"].groupby("Coin"):
+        entries = []
+        recs = sub[["Timestamp", "PriceUSD"]].to_numpy()
+        for i, (ts, price) in enumerate(recs[::-1]):
+            e = {"timestamp": ts, "predicted": round(float(price) * 1.01, 2)}
+            if i >= unresolved_hrs:
+                e.update(actual=round(float(price), 2), diff_pct=1.0, accurate=True)
+            entries.append(e)
+        log[coin] = entries
+    return log
+
+# ─── BENCHMARKS ─────────────────────────────────────────────────────────────
+# Each returns {"run": callable, "items": n, "setup": optional per-repeat callable}.
+
+@benchmark("ingest.reddit", requires=("praw", "textblob"))
+def bench_reddit(scale, workdir):
+    import reddit_fetch
+    listing = fixture("reddit_new.json") * scale
+    patch(reddit_fetch, "reddit", FakeReddit(listing))
+    return {"run": lambda: reddit_fetch.fetch_reddit_posts(COINS), "items": len(listing)}
+
+@benchmark("ingest.rss", requires=("feedparser",))
+def bench_rss(scale, workdir):
+    import feedparser
+    import rss_fetch
+    xml = scaled_rss(scale)
+    patch(rss_fetch, "feedparser", SimpleNamespace(parse=lambda url: feedparser.parse(xml)))
+    n = xml.count("<item>") * 5  # five feeds per call
+    return {"run": lambda: rss_fetch.fetch_rss_articles("Bitcoin", limit=n), "items": n}
+
+@benchmark("ingest.prices")
+def bench_prices(scale, workdir):
+    import fetch_prices
+    payload = fixture("coingecko_simple_price.json")
+    patch(fetch_prices, "requests", SimpleNamespace(get=lambda url, **kw: FakeResponse(payload)))
+    patch(fetch_prices, "CACHE_FILE", os.path.join(workdir, "latest_prices.csv"))
+    patch(fetch_prices, "CACHE_TIME", 0)  # always take the "fetch" path
+
+    def run():
+        for _ in range(scale):
+            fetch_prices.fetch_prices(COINS)
+    return {"run": run, "items": scale}
+
+@benchmark("score.sentiment", requires=("praw", "textblob"))
+def bench_sentiment(scale, workdir):
+    from analyze_sentiment import analyze_sentiment
+    texts = [f"{s['title']}\n\n{s['selftext']}" for s in fixture("reddit_new.json")] * scale
+    return {"run": lambda: [analyze_sentiment(t) for t in texts], "items": len(texts)}
+
+@benchmark("history.append")
+def bench_history_append(scale, workdir):
+    import history_store
+    hist_csv = os.path.join(workdir, "sentiment_history.csv")
+    hist = make_history(BASE_HIST_ROWS * scale)
+    new_rows = hist.tail(len(COINS) * len(SOURCES)).assign(Timestamp=datetime.now(timezone.utc).isoformat())
+
+    def setup():
+        hist.to_csv(hist_csv, index=False)
+        history_store.rebuild(hist_csv)
+
+    def run():
+        history_store.append(hist_csv, new_rows)
+    return {"run": run, "setup": setup, "items": len(hist)}
+
+@benchmark("history.fill_actuals", requires=("praw", "textblob"))
+def bench_fill_actuals(scale, workdir):
+    import accuracy
+    import analyze
+    patch(accuracy, "ACCURACY_JSON", os.path.join(workdir, "accuracy.json"))
+    hist = make_history(BASE_HIST_ROWS * scale)
+    log  = make_pred_log(hist)
+
+    def setup():
+        hist.to_csv(os.path.join(workdir, analyze.HIST_CSV), index=False)
+        with open(os.path.join(workdir, analyze.PRED_LOG_JSON), "w", encoding="utf-8") as f:
+            json.dump(log, f)
+    return {"run": analyze.update_predictions_with_actuals, "setup": setup, "items": len(hist)}
+
+@benchmark("model.train", requires=("sklearn", "joblib"))
+def bench_train(scale, workdir):
+    import train_price_predictor as tpp
+    patch(tpp, "HIST_CSV", os.path.join(workdir, "sentiment_history.csv"))
+    patch(tpp, "MODEL_PATH", os.path.join(workdir, "price_predictor.pkl"))
+    hist = make_history(BASE_HIST_ROWS * scale)
+    hist.to_csv(tpp.HIST_CSV, index=False)
+    return {"run": tpp.train_and_save, "items": len(hist)}
+
+@benchmark("model.predict", requires=("sklearn", "joblib"))
+def bench_predict(scale, workdir):
+    import train_price_predictor as tpp
+    patch(tpp, "HIST_CSV", os.path.join(workdir, "sentiment_history.csv"))
+    patch(tpp, "MODEL_PATH", os.path.join(workdir, "price_predictor.pkl"))
+    make_history(BASE_HIST_ROWS).to_csv(tpp.HIST_CSV, index=False)
+    tpp.train_and_save()
+    batch = pd.DataFrame({"AvgSentiment": np.linspace(-0.5, 0.5, len(COINS) * scale)})
+    return {"run": lambda: tpp.predict_prices(batch), "items": len(batch)}
+
+@benchmark("dashboard.rollups")
+def bench_rollups(scale, workdir):
+    import rollups
+    hist_csv = os.path.join(workdir, "sentiment_history.csv")
+    pred_log = os.path.join(workdir, "prediction_log.json")
+    hist = make_history(BASE_HIST_ROWS * scale)
+    hist.to_csv(hist_csv, index=False)
+    with open(pred_log, "w", encoding="utf-8") as f:
+        json.dump(make_pred_log(hist), f)
+    for attr in ("HOURLY_CSV", "DAILY_CSV", "WEEKLY_CSV", "LATEST_CSV"):
+        patch(rollups, attr, os.path.join(workdir, os.path.basename(getattr(rollups, attr))))
+    now = datetime(2025, 1, 1) + timedelta(hours=len(hist) // 8)
+    return {"run": lambda: rollups.build_rollups(now, hist_csv, pred_log), "items": len(hist)}
+
+@benchmark("wallets.check")
+def bench_wallets(scale, workdir):
+    import wallet_monitor
+    rec = fixture("wallet_explorers.json")
+
+    def get(url, **kw):
+        if "blockchain.info" in url:
+            return FakeResponse(rec["blockchain_info"])
+        if "ethplorer" in url:
+            return FakeResponse(rec["ethplorer"])
+        return FakeResponse(rec["dogechain"])
+
+    patch(wallet_monitor, "requests", SimpleNamespace(get=get, post=lambda url, **kw: FakeResponse(rec["solana_rpc"])))
+    patch(wallet_monitor, "send_telegram_message", lambda msg: None)
+    # distinct addresses, or check_wallets would poll each repeated one only once
+    patch(wallet_monitor, "wallets", {
+        c: [{**w, "address": f"{w['address']}-{i}"} for i in range(scale) for w in ws]
+        for c, ws in wallet_monitor.wallets.items()
+    })
+    n = sum(len(ws) for ws in wallet_monitor.wallets.values())
+    return {"run": lambda: wallet_monitor.check_wallets(force=True), "items": n}
+
+# ─── RUNNER ─────────────────────────────────────────────────────────────────
+def run_case(name, scale, repeat):
+    with tempfile.TemporaryDirectory(prefix="sae_bench_") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            # the code under test prints progress; keep it out of the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                case = BENCHMARKS[name](scale, workdir)
+                times = []
+                for _ in range(repeat):
+                    if case.get("setup"):
+                        case["setup"]()
+                    t0 = time.perf_counter()
+                    case["run"]()
+                    times.append(time.perf_counter() - t0)
+        finally:
+            os.chdir(cwd)
+            _undo_patches()
+    median = statistics.median(times)
+    return {
+        "median_s":   round(median, 6),
+        "min_s":      round(min(times), 6),
+        "items":      case["items"],
+        "items_per_s": round(case["items"] / median, 1) if median else None,
+    }
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table; return the list of regressed case keys."""
+    regressions = []
+    print(f"\n{'case':<32}{'median':>12}{'baseline':>12}{'ratio':>8}")
+    for key, res in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32}{res['median_s']:>11.4f}s{'–':>12}{'':>8}")
+            continue
+        ratio = res["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        flag  = "  ⚠️" if ratio > 1 + tolerance else ""
+        print(f"{key:<32}{res['median_s']:>11.4f}s{base['median_s']:>11.4f}s{ratio:>7.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the pipeline's hot paths against recorded fixtures")
+    p.add_argument("--only", default="", help="comma-separated name prefixes (e.g. ingest,model)")
+    p.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    p.add_argument("--baseline", required=True, help="baseline JSON to compare against (or write with --save-baseline)")
+    p.add_argument("--save-baseline", action="store_true", help="record these results into --baseline instead")
+    p.add_argument("--out", help="also write the results JSON here")
+    args = p.parse_args(argv)
+
+    prefixes = [s for s in args.only.split(",") if s]
+    names    = [n for n in BENCHMARKS if not prefixes or any(n.startswith(x) for x in prefixes)]
+    scales   = [int(s) for s in args.scales.split(",") if s]
+
+    results = {}
+    for name in names:
+        if missing(name):
+            print(f"⏭️  {name:<30} skipped – {', '.join(missing(name))} not installed")
+            continue
+        for scale in scales:
+            key = f"{name}@{scale}x"
+            res = run_case(name, scale, args.repeat)
+            results[key] = res
+            print(f"⏱️  {key:<30} {res['median_s']:.4f}s  ({res['items_per_s']} items/s)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline} – record one with --save-baseline first.")
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.path.insert(0, BASE_DIR)
+    sys.exit(main())
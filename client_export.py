@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# client_export.py
+"""
+Chunked export of the client roster.
+
+Rows are read a chunk at a time (from Supabase, the client_sync SQLite
+mirror, or an already-loaded DataFrame) and written straight to a file or
+yielded as bytes, so memory stays at one chunk regardless of roster size.
+
+Formats: csv (always), parquet (needs pyarrow), xlsx (needs openpyxl).
+"""
+
+import os
+import json
+import tempfile
+
+import pandas as pd
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+CHUNK_SIZE = 1000
+DROP_COLS  = ["id"]
+FORMATS    = {
+    "csv":     "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx":    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# ─── SOURCES ────────────────────────────────────────────────────────────────
+def iter_supabase_chunks(client, table="clients", chunk_size=CHUNK_SIZE, order="name"):
+    """Page through a Supabase/PostgREST table, one DataFrame per page."""
+    offset = 0
+    while True:
+        rows = (client.table(table).select("*").order(order)
+                .range(offset, offset + chunk_size - 1).execute().data or [])
+        if not rows:
+            return
+        yield pd.DataFrame(rows)
+        if len(rows) < chunk_size:
+            return
+        offset += chunk_size
+
+def iter_mirror_chunks(conn, chunk_size=CHUNK_SIZE):
+    """Stream the client_sync SQLite mirror, one DataFrame per chunk."""
+    cur = conn.execute("SELECT data FROM clients ORDER BY name")
+    while True:
+        batch = cur.fetchmany(chunk_size)
+        if not batch:
+            return
+        yield pd.DataFrame([json.loads(d) for (d,) in batch])
+
+def iter_frame_chunks(df, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+# ─── WRITERS ────────────────────────────────────────────────────────────────
+def _aligned(chunks):
+    """Drop internal columns and keep every chunk on the first chunk's column order."""
+    columns = None
+    for chunk in chunks:
+        chunk = chunk.drop(columns=DROP_COLS, errors="ignore")
+        if columns is None:
+            columns = list(chunk.columns)
+        yield chunk.reindex(columns=columns)
+
+def csv_stream(chunks):
+    """Yield UTF-8 CSV bytes chunk by chunk (header first) – usable as a download generator."""
+    for i, chunk in enumerate(_aligned(chunks)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+def write_csv(chunks, path):
+    with open(path, "wb") as f:
+        for blob in csv_stream(chunks):
+            f.write(blob)
+
+def write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in _aligned(chunks):
+            # roster columns are free text – store everything as strings so chunks share one schema
+            table = pa.Table.from_pandas(chunk.astype("string"), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("clients")
+    for i, chunk in enumerate(_aligned(chunks)):
+        if i == 0:
+            ws.append(list(chunk.columns))
+        for row in chunk.itertuples(index=False):
+            ws.append([None if pd.isna(v) else v for v in row])
+    wb.save(path)
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+def export_to_file(chunks, fmt="csv", path=None):
+    """Write `chunks` in `fmt` to `path` (a temp file if omitted) and return the path."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="clients_")
+        os.close(fd)
+    WRITERS[fmt](chunks, path)
+    return path
+
+# ─── CLI ───────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    import argparse
+    import client_sync
+
+    p = argparse.ArgumentParser(description="Export the client roster from the local mirror")
+    p.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    p.add_argument("--out", default=None, help="output path (default clients_export.<format>)")
+    args = p.parse_args()
+
+    out = export_to_file(iter_mirror_chunks(client_sync.open_mirror()), args.format,
+                         args.out or f"clients_export.{args.format}")
+    print(f"✅ Exported clients to {out}")
@@ -0,0 +1,121 @@
+# client_search.py
+"""
+Prebuilt search index for the MEGA Client Manager.
+
+Built once per client-data version (app.py caches it through data_cache
+next to the clients frame) instead of re-normalising the whole frame on
+every Streamlit rerun. Supports:
+
+  • fuzzy, ranked lookups over name / legal name / company / email
+    via a trigram inverted index
+  • fast prefix matches on any word via a sorted token list + bisect
+  • stable selection by client id (labels are only for display)
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+
+import pandas as pd
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+SEARCH_FIELDS = ["name", "legal_name", "company", "email"]
+MIN_SCORE     = 0.35  # fraction of query trigrams that must match
+MAX_RESULTS   = 50
+
+# ─── HELPERS ────────────────────────────────────────────────────────────────
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# ─── INDEX ──────────────────────────────────────────────────────────────────
+class ClientIndex:
+    """Read-only search index over a clients DataFrame."""
+
+    def __init__(self, df, key="id"):
+        df = df.reset_index(drop=True)
+        self.df  = df
+        self.key = key if key in df.columns else "name"
+        self.ids = df[self.key].tolist() if len(df) else []
+        self._pos = {k: i for i, k in enumerate(self.ids)}
+
+        # normalised lowercase copies of the searchable columns (vectorised)
+        fields = [f for f in SEARCH_FIELDS if f in df.columns]
+        norm = {
+            f: df[f].fillna("").astype(str).str.lower().str.split().str.join(" ")
+            for f in fields
+        }
+
+        # display labels: "Name — Legal Name" when a legal name is present
+        names = df["name"].fillna("").astype(str).str.strip() if "name" in df.columns else pd.Series([""] * len(df))
+        if "legal_name" in df.columns:
+            legal  = df["legal_name"].fillna("").astype(str).str.strip()
+            labels = names.where(legal == "", names + " — " + legal)
+        else:
+            labels = names
+        self.labels     = dict(zip(self.ids, labels))
+        self.sorted_ids = [self.ids[i] for i in labels.str.lower().argsort(kind="stable")]
+
+        self._grams  = defaultdict(set)
+        tokens = set()
+        for col in norm.values():
+            for i, text in enumerate(col):
+                if not text:
+                    continue
+                for g in trigrams(text):
+                    self._grams[g].add(i)
+                for tok in text.replace("@", " ").replace(".", " ").split():
+                    tokens.add((tok, i))
+                tokens.add((text, i))
+        self._tokens = sorted(tokens)
+        self._text   = [" | ".join(vals) for vals in zip(*norm.values())] if norm else [""] * len(df)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def label(self, client_id):
+        return self.labels.get(client_id, str(client_id))
+
+    def row(self, client_id):
+        """The client's row as a dict (empty if the id is unknown)."""
+        i = self._pos.get(client_id)
+        return {} if i is None else self.df.iloc[i].to_dict()
+
+    def prefix(self, query):
+        """Positions of clients with any word (or whole field) starting with `query`."""
+        hits = set()
+        j = bisect_left(self._tokens, (query,))
+        while j < len(self._tokens) and self._tokens[j][0].startswith(query):
+            hits.add(self._tokens[j][1])
+            j += 1
+        return hits
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Client ids ranked by match quality: prefix > substring > trigram similarity."""
+        q = normalize(query)
+        if not q:
+            return []
+
+        scores = defaultdict(float)
+        for i in self.prefix(q):
+            scores[i] += 2.0
+
+        qgrams = trigrams(q)
+        if len(q) >= 3:
+            counts = defaultdict(int)
+            for g in qgrams:
+                for i in self._grams.get(g, ()):
+                    counts[i] += 1
+            for i, c in counts.items():
+                sim = c / len(qgrams)
+                if sim >= MIN_SCORE:
+                    scores[i] += sim
+
+        for i in scores:
+            if q in self._text[i]:
+                scores[i] += 1.0
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], self.labels[self.ids[i]].lower()))
+        return [self.ids[i] for i in ranked[:limit]]
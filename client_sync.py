@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# client_sync.py
+"""
+Incremental sync between the Supabase `clients` table and a local SQLite mirror.
+
+pull()  – fetch only rows changed since the mirror's cursor, page by page in
+          (last_update, id) keyset order, and upsert them into the mirror.
+sync()  – pull(), falling back to a full resync when the row count says
+          something was deleted remotely (what the dashboards call).
+push()  – diff incoming rows against the mirror, skip the unchanged ones
+          and send the rest to Supabase as chunked bulk upserts.
+
+The mirror is keyed on the table's `id`, like the app's edits and deletes;
+`name` is only push()'s upsert conflict key (roster imports carry no ids).
+Both take any PostgREST-compatible client (supabase.Client or a local
+stub exposing the same .table().select()/.upsert() builder chain).
+Deletions are not visible to an incremental pull; run `full_resync` for that.
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+load_dotenv()
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+MIRROR_DB   = os.path.join(BASE_DIR, "clients_mirror.db")
+TABLE       = "clients"
+ID_COL      = "id"          # mirror key – what the app selects, updates and deletes by
+KEY_COL     = "name"        # push() conflict key, same one import_to_supabase.py has always used
+PAGE_SIZE   = 1000
+CHUNK_SIZE  = 500
+IGNORED     = {"id", "last_update"}  # never part of the "did this row change?" diff
+
+# ─── MIRROR ─────────────────────────────────────────────────────────────────
+def open_mirror(path=MIRROR_DB):
+    conn = sqlite3.connect(path)
+    cols = [c[1] for c in conn.execute(f"PRAGMA table_info({TABLE})")]
+    if cols and ID_COL not in cols:
+        # mirror from before it was keyed on id: drop it, the next pull refills it
+        conn.execute(f"DROP TABLE {TABLE}")
+        conn.execute("DROP TABLE IF EXISTS meta")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            {ID_COL}    TEXT PRIMARY KEY,
+            {KEY_COL}   TEXT,
+            last_update TEXT,
+            data        TEXT NOT NULL
+        )""")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{KEY_COL} ON {TABLE} ({KEY_COL})")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+def get_cursor(conn):
+    """(last_update, id) of the newest row pulled so far, or None."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'cursor'").fetchone()
+    return tuple(json.loads(row[0])) if row else None
+
+def _set_cursor(conn, cursor):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('cursor', ?)", (json.dumps(cursor),))
+
+def _mirror_rows(conn, rows):
+    """Upsert rows by id (rows without one are left for the next pull)."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLE} ({ID_COL}, {KEY_COL}, last_update, data) VALUES (?, ?, ?, ?)",
+        [(str(r[ID_COL]), r.get(KEY_COL), r.get("last_update"), json.dumps(r, default=str))
+         for r in rows if r.get(ID_COL) is not None],
+    )
+
+def mirrored(conn, names):
+    """{name: row} for the given names that already exist in the mirror."""
+    names = list(names)
+    out   = {}
+    for i in range(0, len(names), 500):  # stay under SQLite's bound-parameter limit
+        chunk = names[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        for (data,) in conn.execute(f"SELECT data FROM {TABLE} WHERE {KEY_COL} IN ({marks})", chunk):
+            row = json.loads(data)
+            out[row[KEY_COL]] = row
+    return out
+
+def count(conn):
+    return conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+def load_frame(conn):
+    """The mirror as a DataFrame, ordered by name."""
+    rows = [json.loads(d) for (d,) in conn.execute(f"SELECT data FROM {TABLE} ORDER BY {KEY_COL}, {ID_COL}")]
+    return pd.DataFrame(rows)
+
+# ─── PULL ───────────────────────────────────────────────────────────────────
+def _quote(value):
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+def pull(client, conn, page_size=PAGE_SIZE):
+    """
+    Copy rows changed since the cursor into the mirror. Returns the number pulled.
+
+    Pages are keyset-ordered on (last_update, id) – "after the last row seen",
+    not an offset – so rows sharing one last_update across a page boundary
+    (a push stamps a whole batch alike) or changing mid-pull are not skipped.
+    """
+    cursor = get_cursor(conn)
+    pulled = 0
+    while True:
+        q = client.table(TABLE).select("*").order("last_update").order(ID_COL)
+        if cursor:
+            ts, rid = (_quote(v) for v in cursor)
+            q = q.or_(f"last_update.gt.{ts},and(last_update.eq.{ts},{ID_COL}.gt.{rid})")
+        rows = q.limit(page_size).execute().data or []
+        if not rows:
+            break
+        _mirror_rows(conn, rows)
+        pulled += len(rows)
+        last = rows[-1]
+        if last.get("last_update") is None:
+            break  # unstamped rows sort last; they can't be resumed from
+        cursor = (last["last_update"], last[ID_COL])
+        _set_cursor(conn, cursor)
+        conn.commit()
+        if len(rows) < page_size:
+            break
+    conn.commit()
+    return pulled
+
+def full_resync(client, conn, page_size=PAGE_SIZE):
+    """Drop the mirror and pull everything again (picks up remote deletions)."""
+    conn.execute(f"DELETE FROM {TABLE}")
+    conn.execute("DELETE FROM meta WHERE key = 'cursor'")
+    conn.commit()
+    return pull(client, conn, page_size)
+
+def sync(client, conn, remote_count=None, page_size=PAGE_SIZE):
+    """
+    pull(), then full_resync() if the mirror still doesn't hold `remote_count`
+    rows – deletions never show up past the cursor. Returns rows pulled.
+    """
+    pulled = pull(client, conn, page_size)
+    if remote_count is not None and count(conn) != remote_count:
+        pulled = full_resync(client, conn, page_size)
+    return pulled
+
+# ─── PUSH ───────────────────────────────────────────────────────────────────
+def _same(v1, v2):
+    return str(v1).strip() == str(v2).strip()
+
+def changed_rows(conn, rows):
+    """Rows that are new or differ from the mirror in at least one provided field."""
+    current = mirrored(conn, (r[KEY_COL] for r in rows))
+    out = []
+    for r in rows:
+        old = current.get(r[KEY_COL])
+        if old is None or any(
+            k not in IGNORED and not _same(old.get(k), v) for k, v in r.items()
+        ):
+            out.append(r)
+    return out
+
+def push(client, conn, rows, chunk_size=CHUNK_SIZE):
+    """
+    Bulk-upsert `rows` (dicts keyed by column; missing keys are left untouched
+    remotely) and mirror them locally. Unchanged rows are skipped.
+    Returns (sent, skipped).
+    """
+    rows  = [r for r in rows if r.get(KEY_COL)]
+    todo  = changed_rows(conn, rows)
+    stamp = datetime.utcnow().isoformat()
+
+    # PostgREST bulk upserts need identical keys per request, so rows are
+    # grouped by the set of columns they actually carry.
+    groups = {}
+    for r in todo:
+        r = {**r, "last_update": stamp}
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+
+    current = mirrored(conn, (r[KEY_COL] for r in todo))
+    for batch_rows in groups.values():
+        for i in range(0, len(batch_rows), chunk_size):
+            chunk = batch_rows[i:i + chunk_size]
+            res   = client.table(TABLE).upsert(chunk, on_conflict=KEY_COL).execute()
+            # the returned rows carry their ids; anything without one arrives with the next pull
+            sent  = {r[KEY_COL]: r for r in (res.data or [])}
+            _mirror_rows(conn, [{**current.get(r[KEY_COL], {}), **r, **sent.get(r[KEY_COL], {})} for r in chunk])
+            conn.commit()
+    return len(todo), len(rows) - len(todo)
+
+def frame_to_rows(df):
+    """
+    DataFrame -> JSON-ready list of dicts, NaNs dropped per row so blank
+    cells never overwrite existing data remotely.
+    """
+    records = df.to_dict("records")
+    return [
+        {k: (v.item() if hasattr(v, "item") else v) for k, v in r.items() if not pd.isna(v)}
+        for r in records
+    ]
+
+# ─── CLI ───────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    import argparse
+    from supabase import create_client
+
+    p = argparse.ArgumentParser(description="Sync the Supabase clients table into a local SQLite mirror")
+    p.add_argument("--full", action="store_true", help="drop the mirror and pull everything")
+    args = p.parse_args()
+
+    client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    conn   = open_mirror()
+    n      = full_resync(client, conn) if args.full else pull(client, conn)
+    print(f"✅ Pulled {n} client rows (up to {get_cursor(conn)})")
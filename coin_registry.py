@@ -0,0 +1,105 @@
+# coin_registry.py
+"""
+Central list of tracked coins, read from coins.json (or $SAE_COINS_FILE):
+
+    {"coins": [{"name": "Bitcoin", "coingecko_id": "bitcoin", "symbol": "BTC",
+                "aliases": ["BTC"], "alerts": {"upper": 70000, "lower": 30000}}, ...]}
+
+Only "name" is required; "coingecko_id" defaults to the lower-cased name and
+"enabled": false drops a coin without deleting its entry.
+
+Sharding: shard(names, index, count) deals coins round-robin in registry
+order, so shards stay balanced and independent workers on different
+machines (sharing the same coins.json) agree on who owns which coin without
+talking to each other.
+"""
+
+import os
+import re
+import json
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_JSON = os.getenv("SAE_COINS_FILE", os.path.join(BASE_DIR, "coins.json"))
+
+_cache = {}  # path -> (mtime, entries)
+
+# ─── LOADING ────────────────────────────────────────────────────────────────
+def load(path=None):
+    """All enabled registry entries, in file order (reloaded when the file changes)."""
+    path  = path or REGISTRY_JSON
+    mtime = os.path.getmtime(path)
+    if path in _cache and _cache[path][0] == mtime:
+        return _cache[path][1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    entries = []
+    for e in raw.get("coins", []):
+        if not e.get("enabled", True):
+            continue
+        e = dict(e)
+        e.setdefault("coingecko_id", e["name"].lower())
+        e.setdefault("symbol", "")
+        e.setdefault("aliases", [])
+        entries.append(e)
+    _cache[path] = (mtime, entries)
+    return entries
+
+def names(path=None):
+    return [e["name"] for e in load(path)]
+
+def get(name, path=None):
+    for e in load(path):
+        if e["name"] == name:
+            return e
+    raise KeyError(f"Unknown coin: {name}")
+
+def coingecko_id(name, path=None):
+    return get(name, path)["coingecko_id"]
+
+def thresholds(path=None):
+    """{name: {"upper": .., "lower": ..}} for coins that define price alerts."""
+    return {e["name"]: e["alerts"] for e in load(path) if e.get("alerts")}
+
+# ─── ALIASES ────────────────────────────────────────────────────────────────
+def resolve(text, path=None):
+    """Canonical coin name for a name, CoinGecko id, symbol or alias (case-insensitive), else None."""
+    key = str(text).strip().lower()
+    for e in load(path):
+        keys = [e["name"], e["coingecko_id"], e["symbol"], *e["aliases"]]
+        if key in (k.lower() for k in keys if k):
+            return e["name"]
+    return None
+
+_patterns = {}
+
+def pattern(name, path=None):
+    """
+    Regex matching the coin's name anywhere (as the old substring check did)
+    or any alias as a whole word ("ETH"/"$ETH", but not "method").
+    """
+    e   = get(name, path)
+    key = (e["name"], tuple(e["aliases"]))
+    if key not in _patterns:
+        aliases = "|".join(re.escape(a) for a in sorted(e["aliases"], key=len, reverse=True))
+        rx = re.escape(e["name"])
+        if aliases:
+            rx += rf"|(?<![\w$])\$?(?:{aliases})(?!\w)"
+        _patterns[key] = re.compile(rx, re.IGNORECASE)
+    return _patterns[key]
+
+def mentions(name, text, path=None):
+    return bool(pattern(name, path).search(text or ""))
+
+# ─── SHARDING ───────────────────────────────────────────────────────────────
+def shard(names, index, count):
+    """The coins in `names` owned by shard `index` of `count`."""
+    return list(names)[index::count]
+
+def parse_shard(spec):
+    """ "2/8" -> (2, 8); shard indexes are 0-based."""
+    index, count = (int(x) for x in spec.split("/"))
+    if not 0 <= index < count:
+        raise ValueError(f"Bad shard spec {spec!r}: need 0 <= index < count")
+    return index, count
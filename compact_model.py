@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# compact_model.py
+"""
+Compact, sklearn-free inference for the price predictor.
+
+export() compiles a trained train_price_predictor.PricePredictor into plain
+arrays saved next to the pickle as "<model>.npz" (one .npy per array),
+stamped with a digest of the pickle it was compiled from:
+
+  • table  – tree ensemble on a single feature (the sentiment forest): the
+             ensemble is a step function, so it is evaluated once per
+             interval between split thresholds → edges + values, predicted
+             with one searchsorted
+  • trees  – tree ensemble on several features: every tree's nodes
+             flattened into feature / threshold / left / right / value
+             arrays, walked for all rows and trees at once
+  • linear – scaler + ridge folded into one coefficient vector
+  • naive  – no arrays
+
+CompactPredictor only needs NumPy, so inference processes skip importing
+sklearn and unpickling the forest – as long as the stamp still matches the
+pickle on disk (file mtimes say nothing after a checkout). Like sklearn, trees compare the input
+cast to float32 against float64 thresholds, so outputs match the pickled
+model; export() checks that on the training rows and refuses to write an
+artifact that disagrees.
+
+    python compact_model.py          # price_predictor.pkl → price_predictor.npz
+    python compact_model.py --check  # parity of the existing .npz only
+"""
+
+import os
+import sys
+import json
+import argparse
+from hashlib import blake2b
+
+import numpy as np
+
+import storage
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+PARITY_RTOL = 1e-9
+LEAF        = -1   # sklearn's TREE_LEAF
+
+def compact_path(model_path):
+    return os.path.splitext(model_path)[0] + ".npz"
+
+def file_digest(path):
+    """Content digest of the pickle an export was compiled from."""
+    h = blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# ─── COMPILE ────────────────────────────────────────────────────────────────
+def _linear(est):
+    """Ridge, or make_pipeline(StandardScaler(), Ridge()), as (coef, intercept) on raw features."""
+    steps  = [s for _, s in getattr(est, "steps", [("model", est)])]
+    coef   = np.ravel(steps[-1].coef_).astype("float64")
+    icept  = float(np.ravel(steps[-1].intercept_)[0])
+    for scaler in reversed(steps[:-1]):
+        scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_) if scaler.scale_ is not None else 1.0
+        mean  = scaler.mean_ if scaler.mean_ is not None else 0.0
+        coef  = coef / scale
+        icept = icept - float(np.sum(mean * coef))
+    return {"coef": coef, "intercept": np.float64(icept)}
+
+def _trees(est):
+    """Forest or gradient boosting → flattened node arrays (children re-indexed globally)."""
+    trees = [t.tree_ for t in np.ravel(est.estimators_)]
+    if hasattr(est, "learning_rate"):
+        scale, base = est.learning_rate, float(np.ravel(est.init_.constant_)[0])
+    else:
+        scale, base = 1.0 / len(trees), 0.0
+    offsets = np.cumsum([0] + [t.node_count for t in trees])[:-1]
+    shift   = lambda child, off: np.where(child == LEAF, LEAF, child + off)
+    return {
+        "feature":   np.concatenate([np.where(t.children_left == LEAF, 0, t.feature) for t in trees]).astype("int32"),
+        "threshold": np.concatenate([t.threshold for t in trees]).astype("float64"),
+        "left":      np.concatenate([shift(t.children_left, o) for t, o in zip(trees, offsets)]).astype("int32"),
+        "right":     np.concatenate([shift(t.children_right, o) for t, o in zip(trees, offsets)]).astype("int32"),
+        "value":     np.concatenate([t.value.reshape(-1) for t in trees]).astype("float64"),
+        "roots":     offsets.astype("int32"),
+        "depth":     np.int32(max(t.max_depth for t in trees)),
+        "scale":     np.float64(scale),
+        "base":      np.float64(base),
+    }
+
+def _walk(M, a, exact=False):
+    """Ensemble output for rows of M (n × features). exact=True skips sklearn's float32 input cast."""
+    Xc   = M if exact else M.astype("float32").astype("float64")
+    node = np.repeat(a["roots"][None, :], len(M), axis=0)
+    rows = np.arange(len(M))[:, None]
+    for _ in range(int(a["depth"])):
+        left  = a["left"][node]
+        inner = left != LEAF
+        if not inner.any():
+            break
+        go_left = Xc[rows, a["feature"][node]] <= a["threshold"][node]
+        node    = np.where(inner, np.where(go_left, left, a["right"][node]), node)
+    return a["base"] + a["scale"] * a["value"][node].sum(axis=1)
+
+def _table(trees):
+    """Single-feature ensemble → (edges, values): rows with edges[i-1] < x <= edges[i] get values[i]."""
+    edges = np.unique(trees["threshold"][trees["left"] != LEAF])
+    reps  = np.append(edges, np.inf)  # each edge lies in its own interval; +inf in the last one
+    return {"edges": edges, "values": _walk(reps[:, None], trees, exact=True)}
+
+def compile_model(model):
+    """PricePredictor → (kind, arrays)."""
+    est = model.estimator
+    if model.target == "naive" or est is None:
+        return "naive", {}
+    if hasattr(est, "estimators_"):
+        trees = _trees(est)
+        return ("table", _table(trees)) if len(model.features) == 1 else ("trees", trees)
+    return "linear", _linear(est)
+
+# ─── PREDICT ────────────────────────────────────────────────────────────────
+class CompactPredictor:
+    """Drop-in for PricePredictor.predict(): DataFrame (or dict of columns) → next-hour prices."""
+
+    def __init__(self, header, arrays):
+        self.header   = header
+        self.kind     = header["kind"]
+        self.target   = header["target"]
+        self.features = list(header["features"])
+        self.arrays   = arrays
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+        return cls(json.loads(str(arrays.pop("header"))), arrays)
+
+    def raw(self, M):
+        a = self.arrays
+        if self.kind == "table":
+            x = M[:, 0].astype("float32").astype("float64")
+            return a["values"][np.searchsorted(a["edges"], x, side="left")]
+        if self.kind == "trees":
+            return _walk(M, a)
+        if self.kind == "linear":
+            return M @ a["coef"] + a["intercept"]
+        raise ValueError(f"no raw output for {self.kind!r}")
+
+    def predict(self, X):
+        if self.target == "naive":
+            return np.asarray(X["PriceUSD"], dtype="float64")
+        out = self.raw(np.column_stack([np.asarray(X[f], dtype="float64") for f in self.features]))
+        return out if self.target == "price" else np.asarray(X["PriceUSD"], dtype="float64") * (1 + out)
+
+def load(path):
+    return CompactPredictor.load(path)
+
+# ─── EXPORT / PARITY ────────────────────────────────────────────────────────
+def parity(model, compact, X):
+    """Largest relative difference between the pickled model and the compact one on X."""
+    want, got = model.predict(X), compact.predict(X)
+    return float(np.max(np.abs(got - want) / np.maximum(np.abs(want), 1e-12), initial=0.0))
+
+def export(model, path, info=None, X=None, source=None):
+    """
+    Compile `model` to `path` (.npz), stamped with the digest of its pickle
+    `source` if given. With sample rows X, refuse if the outputs drift beyond PARITY_RTOL.
+    """
+    kind, arrays = compile_model(model)
+    header  = {**(info or {}), "kind": kind, "target": model.target, "features": model.features,
+               "source_digest": file_digest(source) if source else None}
+    compact = CompactPredictor(header, arrays)
+    if X is not None and len(X):
+        diff = parity(model, compact, X)
+        if diff > PARITY_RTOL:
+            raise ValueError(f"compact {kind} model differs from the original by {diff:.3g} (rtol {PARITY_RTOL})")
+    with storage.atomic_write(path, mode="wb") as f:
+        np.savez(f, header=np.array(json.dumps(header, default=str)), **arrays)
+    return compact
+
+# ─── MAIN ───────────────────────────────────────────────────────────────────
+def main(argv=None):
+    import train_price_predictor as tpp
+
+    ap = argparse.ArgumentParser(description="Compile price_predictor.pkl to a NumPy-only artifact")
+    ap.add_argument("--check", action="store_true", help="only compare the existing artifact with the pickle")
+    ap.add_argument("--horizon", type=int, default=tpp.HORIZON_HRS, choices=tpp.HORIZONS_HRS, help="which model")
+    args = ap.parse_args(argv)
+
+    pkl   = tpp.model_path(args.horizon)
+    meta  = tpp.load_model(pkl)
+    model = meta["model"]
+    data  = tpp.build_dataset(horizon=args.horizon)
+    path  = compact_path(pkl)
+    if args.check:
+        diff = parity(model, load(path), data)
+        print(f"{'✅' if diff <= PARITY_RTOL else '❌'} {path}: max relative difference {diff:.3g} on {len(data)} rows")
+        return 0 if diff <= PARITY_RTOL else 1
+
+    info    = {k: v for k, v in meta.items() if k != "model"}
+    compact = export(model, path, info, data, source=pkl)
+    print(f"✅ {compact.kind} model → {path} ({os.path.getsize(path) / 1024:.1f} KB, "
+          f"pickle {os.path.getsize(pkl) / 1024:.1f} KB), parity checked on {len(data)} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,19 +1,15 @@
 # -*- coding: utf-8 -*-
 """
 Your price‐alert thresholds, plus the list of coins you track.
+Both now come from the coin registry (coins.json → "alerts").
 """
+import coin_registry
 
-# 1) Define the coins you support:
-COINS = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
+# 1) The coins you support:
+COINS = coin_registry.names()
 
-# 2) (the rest of your existing thresholds & alert logic lives here)
-# For example:
-THRESHOLDS = {
-    "Bitcoin":  { "upper": 70000, "lower": 30000 },
-    "Ethereum": { "upper":  4000, "lower":  1000 },
-    "Solana":   { "upper":   500, "lower":   10 },
-    "Dogecoin": { "upper":     1, "lower":    0.05 },
-}
+# 2) Per-coin { "upper": .., "lower": .. } thresholds
+THRESHOLDS = coin_registry.thresholds()
 
 def check_price_alerts(current_prices):
     """
@@ -1,15 +1,18 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import json
 import os
-from datetime import datetime, timedelta
+from datetime import timedelta
 import altair as alt
 
+import rollups
+import data_cache
+import downsample
+import coin_registry
+
 # --- Config ---
 st.set_page_config(page_title="AlphaPulse: Crypto Sentiment Pro", layout="centered")
 LOGO_PATH = "alpha_logo.jpg"
-COINS = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
+COINS = coin_registry.names()
 
 # --- Load Logo ---
 if os.path.exists(LOGO_PATH):
@@ -17,43 +20,31 @@ if os.path.exists(LOGO_PATH):
 st.markdown("<h1 style='text-align: center;'>AlphaPulse: Crypto Sentiment Pro</h1>", unsafe_allow_html=True)
 
 # --- Load Data ---
-@st.cache_data(ttl=600)
-def load_sentiment_data():
-    sh = pd.read_csv("sentiment_history.csv")
-    so = pd.read_csv("sentiment_output.csv")
-    for df in [sh, so]:
-        if 'Timestamp' in df.columns:
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-    return sh, so
-
-@st.cache_data(ttl=600)
-def load_prediction_log():
-    with open("prediction_log.json") as f:
-        pred_log = json.load(f)
-    # Flatten structure
-    flat = []
-    for coin, entries in pred_log.items():
-        for entry in entries:
-            flat.append({
-                "Coin": coin,
-                "Timestamp": pd.to_datetime(entry["timestamp"]),
-                "Predicted": entry["predicted"],
-                "Actual": entry["actual"],
-                "DiffPct": entry.get("diff_pct", 0)
-            })
-    return pd.DataFrame(flat)
+# The pipeline (analyze.py) refreshes these small rollup tables after every
+# ingest, so a rerun never touches the full history or prediction log.
+# data_cache shares one copy of each table across sessions and reloads it
+# only when the file on disk changes.
+def load_rollups():
+    if not all(os.path.exists(p) for p in (rollups.HOURLY_CSV, rollups.LATEST_CSV)):
+        rollups.build_rollups()
+    levels = {
+        "hourly": data_cache.get_file(rollups.HOURLY_CSV, rollups.read_rollup),
+        "daily":  data_cache.get_file(rollups.DAILY_CSV, rollups.read_rollup) if os.path.exists(rollups.DAILY_CSV) else None,
+        "weekly": data_cache.get_file(rollups.WEEKLY_CSV, rollups.read_rollup) if os.path.exists(rollups.WEEKLY_CSV) else None,
+    }
+    return levels, data_cache.get_file(rollups.LATEST_CSV, rollups.read_rollup, arrow=False)
 
-@st.cache_data(ttl=600)
 def load_latest_prices():
     for fname in ["latest_prices.csv", "btc_history.csv"]:
         if os.path.exists(fname):
-            df = pd.read_csv(fname)
+            df = data_cache.get_file(fname)
             if 'Coin' in df.columns and 'PriceUSD' in df.columns:
                 return df.set_index("Coin")["PriceUSD"].to_dict()
     return {}
 
-sent_hist, sent_out = load_sentiment_data()
-pred_log = load_prediction_log()
+levels, latest = load_rollups()
+hourly = levels["hourly"]
+latest = latest.set_index("Coin")
 latest_prices = load_latest_prices()
 
 # --- Main Tabs ---
@@ -62,17 +53,12 @@ tab1, tab2, tab3 = st.tabs(["Sentiment Summary", "Trends Over Time", "Next Hour
 # ----- TAB 1: Sentiment Summary -----
 with tab1:
     st.subheader("24h Sentiment Average (per coin)")
-    now = datetime.utcnow()
-    cutoff = now - timedelta(hours=24)
-    df = sent_hist[sent_hist["Timestamp"] >= cutoff]
-
     table = []
     for coin in COINS:
-        last_sent = df[df["Coin"] == coin].sort_values("Timestamp")
-        if len(last_sent) < 2:
+        if coin not in latest.index or latest.at[coin, "Buckets24h"] < 2:
             continue
-        avg24 = last_sent.tail(24)["Sentiment"].mean()
-        change = avg24 - last_sent.head(1)["Sentiment"].iloc[0]
+        avg24 = latest.at[coin, "Sentiment24h"]
+        change = latest.at[coin, "SentimentChange24h"]
         color = "green" if change >= 0 else "red"
         table.append((coin, f"{avg24:.3f}", f":{color}[{change:+.3f}]"))
     st.table(pd.DataFrame(table, columns=["Coin", "24h Avg Sentiment", "Change"]))
@@ -81,64 +67,59 @@ with tab1:
 with tab2:
     st.subheader("Price vs. Sentiment Trends")
     selected_coin = st.selectbox("Select coin:", COINS)
-    coin_df = sent_hist[sent_hist["Coin"] == selected_coin].sort_values("Timestamp")
-    window = 48  # show last 48 records/hours
-    if len(coin_df) > window:
-        coin_df = coin_df.tail(window)
-    if not coin_df.empty:
-        base = alt.Chart(coin_df).encode(x='Timestamp:T')
-        price = base.mark_line(strokeWidth=2, color='blue').encode(y=alt.Y('PriceUSD:Q', axis=alt.Axis(title='Price (USD)')))
-        sent = base.mark_line(strokeWidth=2, color='orange').encode(
-            y=alt.Y('Sentiment:Q', axis=alt.Axis(title='Sentiment', titleColor='orange'))
-        )
-        chart = alt.layer(price, sent).resolve_scale(y='independent').interactive()
-        st.altair_chart(chart, use_container_width=True)
-    else:
+    coin_hist = hourly[hourly["Coin"] == selected_coin]
+    if coin_hist.empty:
         st.info("Not enough data to display this chart.")
+    else:
+        first, last = coin_hist["Timestamp"].min().date(), coin_hist["Timestamp"].max().date()
+        picked = st.date_input(
+            "Date range:", (max(first, last - timedelta(days=2)), last),
+            min_value=first, max_value=last,
+        )
+        start, end = (picked if isinstance(picked, tuple) and len(picked) == 2 else (first, last))
+        start, end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+
+        # Coarsest level only when the range is long; each series capped at POINT_BUDGET points
+        level = downsample.pick_level(start, end)
+        frame = levels.get(level)
+        if frame is None:
+            level, frame = "hourly", hourly
+        frame = frame[frame["Coin"] == selected_coin]
+        chart_df = downsample.series_for_range(frame, start, end, ["PriceUSD", "Sentiment"])
+        st.caption(f"{level.title()} resolution · {len(chart_df)} points")
+
+        if chart_df.empty:
+            st.info("Not enough data to display this chart.")
+        else:
+            base = alt.Chart(chart_df).encode(x='Timestamp:T')
+            price = base.transform_filter(alt.datum.Series == "PriceUSD").mark_line(strokeWidth=2, color='blue').encode(
+                y=alt.Y('Value:Q', axis=alt.Axis(title='Price (USD)'))
+            )
+            sent = base.transform_filter(alt.datum.Series == "Sentiment").mark_line(strokeWidth=2, color='orange').encode(
+                y=alt.Y('Value:Q', axis=alt.Axis(title='Sentiment', titleColor='orange'))
+            )
+            chart = alt.layer(price, sent).resolve_scale(y='independent').interactive()
+            st.altair_chart(chart, use_container_width=True)
 
 # ----- TAB 3: Next Hour Prediction -----
 with tab3:
     st.subheader("Next Hour Predictions")
-    # Get last entry for each coin from sentiment_history
-    last_rows = sent_hist.sort_values("Timestamp").groupby("Coin").tail(1)
-    price_now = {row["Coin"]: row["PriceUSD"] for _, row in last_rows.iterrows()}
-    # Fallback if price missing
-    for coin in COINS:
-        if coin not in price_now and coin in latest_prices:
-            price_now[coin] = latest_prices[coin]
-    # Predicted price
-    preds = {}
-    pct_changes = {}
-    for coin in COINS:
-        # Find latest prediction for each coin
-        pred_row = pred_log[pred_log["Coin"] == coin].sort_values("Timestamp").tail(1)
-        if not pred_row.empty:
-            pred_price = pred_row["Predicted"].iloc[0]
-            preds[coin] = pred_price
-            # Calc % change
-            curr = price_now.get(coin, pred_price)
-            pct = ((pred_price - curr) / curr) * 100 if curr else 0
-            pct_changes[coin] = pct
-        else:
-            preds[coin] = "N/A"
-            pct_changes[coin] = "N/A"
-    # Calculate prediction accuracy for last 24h
-    accs = {}
-    for coin in COINS:
-        coin_preds = pred_log[(pred_log["Coin"] == coin) & (pred_log["Timestamp"] >= now - timedelta(hours=24))]
-        if not coin_preds.empty:
-            diffs = np.abs((coin_preds["Predicted"] - coin_preds["Actual"]) / coin_preds["Actual"])
-            acc = (1 - diffs.mean()) * 100
-            accs[coin] = f"{acc:.1f}%"
-        else:
-            accs[coin] = "N/A"
-    # Show Table
     rows = []
     for coin in COINS:
-        curr = price_now.get(coin, "N/A")
-        pred = preds.get(coin, "N/A")
-        pct = pct_changes.get(coin, 0)
+        row = latest.loc[coin] if coin in latest.index else pd.Series(dtype=object)
+        curr = row.get("PriceUSD")
+        if pd.isna(curr):
+            curr = latest_prices.get(coin, "N/A")
+        pred = row.get("Predicted")
+        pred = "N/A" if pd.isna(pred) else pred
+        pct = (pred - curr) / curr * 100 if isinstance(pred, float) and isinstance(curr, float) and curr else "N/A"
         color = "green" if isinstance(pct, float) and pct > 0 else "red"
         pct_display = f":{color}[{pct:+.2f}%]" if isinstance(pct, float) else "N/A"
-        rows.append([coin, curr, pred, pct_display, accs[coin]])
-    st.table(pd.DataFrame(rows, columns=["Coin", "Now", "Next Hour", "% Change", "24h Accuracy"]))
+        # accuracy numbers are precomputed by accuracy.py as predictions resolve
+        acc = row.get("Accuracy24h")
+        acc_display = "N/A" if pd.isna(acc) else f"{acc:.1f}%"
+        hit, dirn = row.get("HitRate24h"), row.get("Directional24h")
+        hit_display = "N/A" if pd.isna(hit) else f"{hit:.0%}"
+        dir_display = "N/A" if pd.isna(dirn) else f"{dirn:.0%}"
+        rows.append([coin, curr, pred, pct_display, acc_display, hit_display, dir_display])
+    st.table(pd.DataFrame(rows, columns=["Coin", "Now", "Next Hour", "% Change", "24h Accuracy", "24h Hit Rate", "24h Direction"]))
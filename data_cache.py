@@ -0,0 +1,106 @@
+# data_cache.py
+"""
+Shared, version-keyed data cache for the Streamlit apps.
+
+st.cache_data pickles and copies every return value per call and can only
+expire on a wall-clock TTL or be wiped wholesale with st.cache_data.clear().
+This module keeps one copy of each frame in a process-wide store (held by
+st.cache_resource, so every session shares it) and keys each entry on a
+*data version*: a file's mtime/size, or a cheap probe of a remote table.
+An entry is reloaded only when its version changes, and edits invalidate
+just the keys they touched.
+
+Frames handed out are shared between sessions – treat them as read-only
+and .copy() before mutating.
+"""
+
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+# ─── STORE ──────────────────────────────────────────────────────────────────
+@st.cache_resource
+def _store():
+    return {
+        "entries": {},   # key -> (version, value)
+        "probes":  {},   # key -> (checked_at, version)
+        "locks":   {},   # key -> threading.Lock
+        "lock":    threading.Lock(),
+    }
+
+def _key_lock(store, key):
+    with store["lock"]:
+        return store["locks"].setdefault(key, threading.Lock())
+
+def to_arrow(df):
+    """Store text columns as Arrow strings (compact, zero-copy slicing); numbers stay numpy."""
+    if not HAVE_ARROW:
+        return df
+    text = [c for c in df.columns if df[c].dtype == object]
+    return df.astype({c: "string[pyarrow]" for c in text}) if text else df
+
+# ─── API ────────────────────────────────────────────────────────────────────
+def get(key, loader, version=None):
+    """
+    Return the cached value for `key`, calling loader() only if nothing is
+    cached yet or the cached entry was built for a different `version`.
+    Concurrent sessions asking for the same stale key share one load.
+    """
+    store = _store()
+    entry = store["entries"].get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    with _key_lock(store, key):
+        entry = store["entries"].get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = loader()
+        store["entries"][key] = (version, value)
+        return value
+
+def probe(key, version_fn, ttl=5):
+    """
+    Throttled version check for remote data: calls version_fn() at most once
+    every `ttl` seconds per key and returns the last seen version otherwise.
+    """
+    store = _store()
+    checked = store["probes"].get(key)
+    if checked is not None and time.time() - checked[0] < ttl:
+        return checked[1]
+    version = version_fn()
+    store["probes"][key] = (time.time(), version)
+    return version
+
+def file_version(path):
+    try:
+        s = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (s.st_mtime_ns, s.st_size)
+
+def get_file(path, reader=pd.read_csv, arrow=True):
+    """Read a file through `reader`, re-reading only when its mtime/size changes."""
+    key = ("file", os.path.abspath(path), getattr(reader, "__name__", repr(reader)))
+
+    def load():
+        df = reader(path)
+        return to_arrow(df) if arrow and isinstance(df, pd.DataFrame) else df
+
+    return get(key, load, version=file_version(path))
+
+def invalidate(*keys):
+    """Drop specific keys (and their version probes) so the next get() reloads them."""
+    store = _store()
+    for key in keys:
+        store["entries"].pop(key, None)
+        store["probes"].pop(key, None)
@@ -0,0 +1,182 @@
+# dedup.py
+"""
+Ingest-time duplicate detection, run before sentiment scoring.
+
+The same headline arrives through several RSS feeds and Reddit link posts,
+and the overlapping Reddit listing returns last hour's posts again. Every
+document is fingerprinted twice:
+
+  • exact – 64-bit hash of the normalised text (lower-case, URLs and
+            punctuation stripped, whitespace collapsed)
+  • near  – MinHash signature over word unigrams + bigrams (NUM_PERM
+            one-byte minima, 64 bytes per document); two texts are
+            near-duplicates when their estimated Jaccard similarity is
+            >= NEAR_JACCARD. Lookups use LSH (BANDS bands of ROWS bytes), so
+            only documents sharing a whole band are compared.
+
+(SimHash was tried first, but on headline-length texts a reworded copy and
+an unrelated story are too close in Hamming distance to separate reliably.)
+
+Fingerprints are tracked per coin, so a story mentioning BTC and ETH counts
+once for each (and shard workers owning different coins never interfere).
+The index is bounded – at most MAX_ITEMS entries, none older than
+MAX_AGE_H – and persisted to dedup_index.json between runs.
+"""
+
+import os
+import re
+import time
+from collections import deque
+from hashlib import blake2b
+from operator import eq
+
+import numpy as np
+
+import storage
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+INDEX_JSON   = os.path.join(BASE_DIR, "dedup_index.json")
+MAX_ITEMS    = 20_000
+MAX_AGE_H    = 48
+NUM_PERM     = 64
+BANDS, ROWS  = 16, 4     # BANDS * ROWS == NUM_PERM; candidate threshold ≈ (1/16)^(1/4) ≈ 0.5
+NEAR_JACCARD = 0.6
+MIN_TOKENS   = 4         # shorter texts only get the exact check
+MAX_CANDIDATES = 256     # signatures compared per lookup
+
+_URL_RE   = re.compile(r"https?://\S+|www\.\S+")
+_PUNCT_RE = re.compile(r"[^\w\s$]")
+
+# ─── FINGERPRINTS ───────────────────────────────────────────────────────────
+def normalize(text):
+    text = _URL_RE.sub(" ", str(text).lower())
+    return " ".join(_PUNCT_RE.sub(" ", text).split())
+
+def _hash64(s):
+    return int.from_bytes(blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+_rng   = np.random.default_rng(20240501)  # fixed: signatures must be comparable across runs
+_SEEDS = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64)
+_MULTS = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+
+def minhash(tokens):
+    """NUM_PERM-byte MinHash signature (low byte of each minimum)."""
+    feats = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    h     = np.fromiter((_hash64(f) for f in feats), dtype=np.uint64, count=len(feats))
+    with np.errstate(over="ignore"):
+        perm = (h[:, None] ^ _SEEDS[None, :]) * _MULTS[None, :]
+    return (perm.min(axis=0) & np.uint64(0xFF)).astype(np.uint8).tobytes()
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures (corrected for 1-byte collisions)."""
+    same = sum(map(eq, sig_a, sig_b)) / NUM_PERM
+    return (same - 1 / 256) / (1 - 1 / 256)
+
+def fingerprint(text):
+    """(exact, minhash signature or None) for a document's text."""
+    norm   = normalize(text)
+    tokens = norm.split()
+    return _hash64(norm), (minhash(tokens) if len(tokens) >= MIN_TOKENS else None)
+
+def _bands(sig):
+    return [(i, sig[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+# ─── ROLLING INDEX ──────────────────────────────────────────────────────────
+class Deduper:
+    def __init__(self, max_items=MAX_ITEMS, max_age_h=MAX_AGE_H, threshold=NEAR_JACCARD):
+        self.max_items = max_items
+        self.max_age_s = max_age_h * 3600
+        self.threshold = threshold
+        self._items    = deque()   # (added_at, coin, exact, sig) oldest first
+        self._exact    = {}        # (coin, exact) -> refcount
+        self._bands    = {}        # (coin, band_no, band_bytes) -> {signature: refcount}
+        self._new      = []        # entries added since load(), for save()
+        self.stats     = {"exact": 0, "near": 0, "fresh": 0}
+
+    def __len__(self):
+        return len(self._items)
+
+    # -- index maintenance --
+    def _add(self, added_at, coin, exact, sig):
+        self._items.append((added_at, coin, exact, sig))
+        self._exact[(coin, exact)] = self._exact.get((coin, exact), 0) + 1
+        if sig is not None:
+            for band in _bands(sig):
+                slot = self._bands.setdefault((coin, *band), {})
+                slot[sig] = slot.get(sig, 0) + 1
+
+    def _drop_oldest(self):
+        _, coin, exact, sig = self._items.popleft()
+        key = (coin, exact)
+        self._exact[key] -= 1
+        if not self._exact[key]:
+            del self._exact[key]
+        if sig is not None:
+            for band in _bands(sig):
+                slot = self._bands[(coin, *band)]
+                slot[sig] -= 1
+                if not slot[sig]:
+                    del slot[sig]
+                if not slot:
+                    del self._bands[(coin, *band)]
+
+    def _evict(self, now):
+        while self._items and (len(self._items) > self.max_items or now - self._items[0][0] > self.max_age_s):
+            self._drop_oldest()
+
+    def _near(self, coin, sig):
+        # newest first, and at most MAX_CANDIDATES comparisons: templated posts
+        # ("BTC price update: …") share bands with thousands of entries
+        seen = set()
+        for band in _bands(sig):
+            for cand in reversed(self._bands.get((coin, *band), {})):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                if similarity(cand, sig) >= self.threshold:
+                    return True
+                if len(seen) >= MAX_CANDIDATES:
+                    return False
+        return False
+
+    # -- public API --
+    def check(self, text, coins, now=None):
+        """
+        Return the subset of `coins` for which `text` is new, and record it as
+        seen for them. Duplicates (exact or near) are counted in .stats.
+        """
+        now        = now or time.time()
+        exact, sig = fingerprint(text)
+        fresh      = []
+        self._evict(now)  # an entry past max_age_h must not match any more
+        for coin in coins:
+            if (coin, exact) in self._exact:
+                self.stats["exact"] += 1
+            elif sig is not None and self._near(coin, sig):
+                self.stats["near"] += 1
+            else:
+                fresh.append(coin)
+                self.stats["fresh"] += 1
+                self._add(now, coin, exact, sig)
+                self._new.append((now, coin, exact, sig))
+        self._evict(now)
+        return tuple(fresh)
+
+    # -- persistence --
+    @classmethod
+    def load(cls, path=INDEX_JSON, **kwargs):
+        dd = cls(**kwargs)
+        for added_at, coin, exact, sig in storage.read_json(path, default={}).get("items", []):
+            dd._add(added_at, coin, exact, bytes.fromhex(sig) if sig else None)
+        dd._evict(time.time())
+        return dd
+
+    def save(self, path=INDEX_JSON):
+        """Merge this run's new fingerprints into the file (other workers may have saved meanwhile)."""
+        with storage.update_json(path, default={}, backup=False) as data:
+            new    = [[t, coin, exact, sig.hex() if sig else None] for t, coin, exact, sig in self._new]
+            merged = sorted(data.get("items", []) + new, key=lambda e: e[0])
+            cutoff = time.time() - self.max_age_s
+            data["items"] = [e for e in merged if e[0] >= cutoff][-self.max_items:]
+        self._new = []
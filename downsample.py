@@ -0,0 +1,104 @@
+# downsample.py
+"""
+Server-side downsampling for long-range charts.
+
+The dashboard picks the finest precomputed rollup level (hourly / daily /
+weekly, written by rollups.py) whose row count for the requested range
+stays near the point budget, then reduces each series to a fixed point budget with
+LTTB (Largest-Triangle-Three-Buckets) or min/max bucketing. Render cost is
+therefore bounded by the budget, not by how much history exists.
+"""
+
+import numpy as np
+import pandas as pd
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+POINT_BUDGET = 300  # points per series sent to the browser
+OVERSAMPLE   = 4    # use a finer level as long as it has ≤ budget × this many rows
+
+# (label, bucket width in hours) — finest first
+LEVELS = [("hourly", 1), ("daily", 24), ("weekly", 24 * 7)]
+
+# ─── ALGORITHMS ─────────────────────────────────────────────────────────────
+def lttb_indices(x, y, budget):
+    """
+    Largest-Triangle-Three-Buckets. Returns the indices of at most `budget`
+    points that best preserve the visual shape of (x, y). x must be sorted.
+    """
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # interior points are split into budget-2 buckets; first/last always kept
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)
+    out   = np.empty(budget, dtype=int)
+    out[0], out[-1] = 0, n - 1
+
+    a = 0
+    for i in range(budget - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        # triangle area for every candidate in this bucket, vectorised
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) -
+            (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def minmax_indices(x, y, budget):
+    """Keep the min and max of each of (budget-2)/2 equal-count buckets, plus both endpoints."""
+    n = len(x)
+    if budget >= n or budget < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype="float64")
+    buckets = (budget - 2) // 2
+    bucket  = np.minimum((np.arange(n) * buckets) // n, buckets - 1)
+    order   = np.lexsort((y, bucket))  # sorted by bucket, then by value
+    starts  = np.searchsorted(bucket[order], np.arange(buckets))
+    ends    = np.append(starts[1:], n) - 1
+    keep    = np.concatenate([[0, n - 1], order[starts], order[ends]])
+    return np.unique(keep)
+
+METHODS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+# ─── FRAMES ─────────────────────────────────────────────────────────────────
+def downsample(df, x_col, y_col, budget=POINT_BUDGET, method="lttb"):
+    """Return the rows of df (sorted by x_col) that survive downsampling of y_col."""
+    sub = df.dropna(subset=[x_col, y_col]).sort_values(x_col)
+    if len(sub) <= budget:
+        return sub
+    x = sub[x_col]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype("int64")
+    idx = METHODS[method](x.to_numpy(), sub[y_col].to_numpy(), budget)
+    return sub.iloc[idx]
+
+def pick_level(start, end, budget=POINT_BUDGET):
+    """Finest rollup level whose row count for [start, end] stays within budget × OVERSAMPLE."""
+    span_hrs = max((pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / 3600, 1)
+    for label, width in LEVELS:
+        if span_hrs / width <= budget * OVERSAMPLE:
+            return label
+    return LEVELS[-1][0]
+
+def series_for_range(frame, start, end, columns, budget=POINT_BUDGET, method="lttb"):
+    """
+    Slice an already-level-selected rollup frame to [start, end] and downsample
+    each column independently. Returns long format: Timestamp, Series, Value.
+    """
+    window = frame[(frame["Timestamp"] >= pd.Timestamp(start)) & (frame["Timestamp"] <= pd.Timestamp(end))]
+    parts = []
+    for col in columns:
+        sub = downsample(window, "Timestamp", col, budget, method)
+        parts.append(pd.DataFrame({"Timestamp": sub["Timestamp"], "Series": col, "Value": sub[col]}))
+    if not parts:
+        return pd.DataFrame(columns=["Timestamp", "Series", "Value"])
+    return pd.concat(parts, ignore_index=True)
@@ -2,17 +2,34 @@ import time
 import requests
 import pandas as pd
 
+import instrument
+import storage
+import coin_registry
+
 CACHE_FILE = "latest_prices.csv"
 CACHE_TIME = 60  # seconds
 
-def fetch_prices(coins):
-    # Simple cache: reuse data if <CACHE_TIME old
+def _coingecko_id(coin):
+    try:
+        return coin_registry.coingecko_id(coin)
+    except KeyError:
+        return coin.lower()
+
+def _fresh_cache():
     import os
-    if os.path.exists(CACHE_FILE):
-        mtime = os.path.getmtime(CACHE_FILE)
-        if time.time() - mtime < CACHE_TIME:
-            return pd.read_csv(CACHE_FILE)
-    ids = ','.join([c.lower() for c in coins])
+    if os.path.exists(CACHE_FILE) and time.time() - os.path.getmtime(CACHE_FILE) < CACHE_TIME:
+        return pd.read_csv(CACHE_FILE)
+    return None
+
+def fetch_prices(coins):
+    # Simple cache: reuse data if <CACHE_TIME old and it covers every requested
+    # coin (shard workers each ask for a different subset of the registry)
+    cached = _fresh_cache()
+    if cached is not None and set(coins) <= set(cached["Coin"]):
+        instrument.count("cache.prices.hit")
+        return cached[cached["Coin"].isin(coins)].reset_index(drop=True)
+    instrument.count("cache.prices.miss")
+    ids = ','.join(_coingecko_id(c) for c in coins)
     url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd"
     resp = requests.get(url)
     if resp.status_code == 429:
@@ -22,8 +39,12 @@ def fetch_prices(coins):
     resp.raise_for_status()
     data = resp.json()
     df = pd.DataFrame([
-        {"Coin": c, "PriceUSD": data[c.lower()]["usd"] if c.lower() in data else None}
+        {"Coin": c, "PriceUSD": data.get(_coingecko_id(c), {}).get("usd")}
         for c in coins
     ])
-    df.to_csv(CACHE_FILE, index=False)
+    # merge into the shared cache; atomic so concurrent readers never see a partial file
+    with storage.file_lock(CACHE_FILE):
+        cached = _fresh_cache()
+        merged = df if cached is None else pd.concat([cached[~cached["Coin"].isin(coins)], df], ignore_index=True)
+        storage.write_csv(merged, CACHE_FILE)
     return df
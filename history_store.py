@@ -0,0 +1,255 @@
+# history_store.py
+"""
+Memory-mapped columnar copy of sentiment_history.csv.
+
+The CSV stays the append target (analyze.py, backfill_sentiment.py, the
+publisher's deltas), but readers go through this module instead of parsing
+it. Next to each history CSV we keep "<name>.arrow": an uncompressed Arrow
+IPC file, sorted by time, with
+
+    Timestamp        int64   epoch nanoseconds, UTC
+    Coin / Source /  dictionary<int32, string>  (pandas categoricals)
+    SuggestedAction
+    Sentiment        float64
+    PriceUSD         float64
+
+open_history() memory-maps that file, so concurrent readers share the OS
+page cache and nothing is parsed or copied up front; time_slice() then
+binary-searches the sorted Timestamp column and returns a zero-copy slice.
+
+The CSV is append-only (append() adds a run's rows, skipping keys already
+stored), so the Arrow copy grows the same way: "<name>.arrow.json" records
+how many bytes of the CSV it covers plus a digest of the bytes just before
+that watermark, and rebuild() parses only what was appended since, written
+as a small immutable segment under "<name>.arrow.d/". Every MAX_SEGMENTS
+segments are compacted into the base file (no CSV parsing). The whole CSV is
+only re-read when the watermark no longer matches – the file was rewritten
+(backfill) or the new rows are older than what is stored – so the copy stays
+sorted by time. Either the writer updates it right after appending or the
+first reader does.
+"""
+
+import os
+import shutil
+from hashlib import blake2b
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import storage
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+HIST_CSV     = os.path.join(BASE_DIR, "sentiment_history.csv")
+CATEGORICALS = ("Coin", "Source", "SuggestedAction")
+NUMERICS     = ("Sentiment", "PriceUSD")
+KEY          = ("Timestamp", "Coin", "Source")  # one row per run, coin and source
+MAX_SEGMENTS = 24    # appended segments kept before compacting them into the base file
+TAIL_CHECK   = 256   # bytes before the watermark that must be unchanged to extend the copy
+
+SCHEMA = pa.schema(
+    [pa.field("Timestamp", pa.int64())]
+    + [pa.field(c, pa.dictionary(pa.int32(), pa.string())) for c in CATEGORICALS]
+    + [pa.field(c, pa.float64()) for c in NUMERICS]
+)
+
+# ─── PARSING ────────────────────────────────────────────────────────────────
+def parse_timestamps(series):
+    """Parse the mixed ISO8601 timestamps we write into tz-naive UTC."""
+    return (
+        pd.to_datetime(series, utc=True, errors="coerce", format="ISO8601")
+          .dt.tz_convert(None)
+    )
+
+def arrow_path(csv_path=HIST_CSV):
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+def _manifest_path(csv_path):
+    return arrow_path(csv_path) + ".json"
+
+def _segment_dir(csv_path):
+    return arrow_path(csv_path) + ".d"
+
+def tail_digest(csv_path, end):
+    """Digest of the bytes just before offset `end` – changes if the file was rewritten, not appended to."""
+    with open(csv_path, "rb") as f:
+        f.seek(max(end - TAIL_CHECK, 0))
+        return blake2b(f.read(min(end, TAIL_CHECK)), digest_size=16).hexdigest()
+
+def _watermark(csv_path):
+    """(manifest, CSV bytes now complete, whether the manifest still describes a prefix of the CSV)."""
+    manifest = storage.read_json(_manifest_path(csv_path), default=None)
+    end      = storage.complete_size(csv_path)
+    prefix   = (
+        manifest is not None and os.path.exists(arrow_path(csv_path))
+        and manifest["csv_end"] <= end and manifest["tail"] == tail_digest(csv_path, manifest["csv_end"])
+    )
+    return manifest, end, prefix
+
+def _is_stale(csv_path):
+    manifest, end, prefix = _watermark(csv_path)
+    return not prefix or manifest["csv_end"] != end
+
+# ─── WRITE ──────────────────────────────────────────────────────────────────
+def frame_to_table(df):
+    """History DataFrame (any timestamp format) → sorted Arrow table in SCHEMA."""
+    ts = parse_timestamps(df["Timestamp"]) if "Timestamp" in df else pd.Series(dtype="datetime64[ns]")
+    out = pd.DataFrame({"Timestamp": ts})
+    for c in CATEGORICALS:
+        out[c] = df[c].astype("string") if c in df else pd.Series(pd.NA, index=df.index, dtype="string")
+    for c in NUMERICS:
+        out[c] = pd.to_numeric(df[c], errors="coerce") if c in df else np.nan
+    out = out.dropna(subset=["Timestamp"]).sort_values("Timestamp", kind="stable")
+
+    arrays = [pa.array(out["Timestamp"].to_numpy("datetime64[ns]").view("int64"))]
+    arrays += [pa.array(out[c], type=pa.string()).dictionary_encode() for c in CATEGORICALS]
+    arrays += [pa.array(out[c].to_numpy("float64")) for c in NUMERICS]
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+def _write_arrow(table, path):
+    with storage.atomic_write(path, mode="wb") as f:
+        with ipc.new_file(f, SCHEMA) as writer:
+            writer.write_table(table)
+
+def _max_ts(table, current=None):
+    if not table.num_rows:
+        return current
+    last = int(table.column("Timestamp")[-1].as_py())  # tables are sorted
+    return last if current is None else max(current, last)
+
+def rebuild(csv_path=HIST_CSV):
+    """
+    Bring the .arrow copy up to date with the CSV – incrementally when only
+    rows were appended; returns its path (None if there is no CSV).
+    """
+    if not os.path.exists(csv_path):
+        return None
+    with storage.file_lock(arrow_path(csv_path)):
+        manifest, end, prefix = _watermark(csv_path)
+        if prefix and manifest["csv_end"] == end:
+            return arrow_path(csv_path)
+        if prefix:
+            df, end = storage.read_csv_range(csv_path, manifest["csv_end"])
+            new = frame_to_table(df)
+            if not new.num_rows or manifest["max_ts"] is None or new.column("Timestamp")[0].as_py() >= manifest["max_ts"]:
+                _extend(csv_path, manifest, new, end)
+                return arrow_path(csv_path)
+        _rewrite(csv_path)
+    return arrow_path(csv_path)
+
+def _extend(csv_path, manifest, new, end):
+    """Append `new` (sorted, not older than anything stored) as a segment, or compact."""
+    segments, base_rows = list(manifest["segments"]), manifest["base_rows"]
+    if new.num_rows and len(segments) >= MAX_SEGMENTS:
+        table = pa.concat_tables([_read(csv_path, manifest), new]).unify_dictionaries().combine_chunks()
+        _write_arrow(table, arrow_path(csv_path))
+        shutil.rmtree(_segment_dir(csv_path), ignore_errors=True)
+        segments, base_rows = [], table.num_rows
+    elif new.num_rows:
+        os.makedirs(_segment_dir(csv_path), exist_ok=True)
+        name = f"{end:016d}.arrow"
+        _write_arrow(new, os.path.join(_segment_dir(csv_path), name))
+        segments.append(name)
+    storage.write_json({
+        "csv_end":   end,
+        "tail":      tail_digest(csv_path, end),
+        "max_ts":    _max_ts(new, manifest["max_ts"]),
+        "base_rows": base_rows,
+        "segments":  segments,
+    }, _manifest_path(csv_path))
+
+def _rewrite(csv_path):
+    """Full rebuild from the whole CSV."""
+    df, end = storage.read_csv_range(csv_path)
+    table   = frame_to_table(df).combine_chunks()
+    _write_arrow(table, arrow_path(csv_path))
+    shutil.rmtree(_segment_dir(csv_path), ignore_errors=True)
+    storage.write_json({
+        "csv_end":   end,
+        "tail":      tail_digest(csv_path, end),
+        "max_ts":    _max_ts(table),
+        "base_rows": table.num_rows,
+        "segments":  [],
+    }, _manifest_path(csv_path))
+
+def append(csv_path, df):
+    """
+    Append history rows to the CSV – skipping (Timestamp, Coin, Source) keys
+    it already holds, last one wins within `df` – and extend the .arrow copy.
+    Returns the number of rows written.
+    """
+    new = df.assign(_ts=parse_timestamps(df["Timestamp"])).dropna(subset=["_ts"])
+    new = new.drop_duplicates(subset=["_ts", "Coin", "Source"], keep="last")
+    with storage.file_lock(csv_path + ".append"):
+        if len(new) and os.path.exists(csv_path):
+            # only rows in this batch's time range can clash – a slice of the mapped copy
+            have = load_history(csv_path, start=new["_ts"].min(), end=new["_ts"].max() + pd.Timedelta(1, "ns"),
+                                columns=list(KEY))
+            seen = set(zip(have["Timestamp"], have["Coin"].astype(str), have["Source"].astype(str)))
+            new  = new[[k not in seen for k in zip(new["_ts"], new["Coin"].astype(str), new["Source"].astype(str))]]
+        if len(new):
+            storage.append_csv(new.drop(columns="_ts"), csv_path)
+        rebuild(csv_path)
+    return len(new)
+
+# ─── READ ───────────────────────────────────────────────────────────────────
+def _read(csv_path, manifest):
+    """Base file + segments as one (chunked, still sorted) memory-mapped table."""
+    tables = [ipc.open_file(pa.memory_map(arrow_path(csv_path), "r")).read_all()]
+    if tables[0].num_rows != manifest["base_rows"]:
+        raise FileNotFoundError("base file was rewritten after the manifest was read")
+    for name in manifest["segments"]:
+        tables.append(ipc.open_file(pa.memory_map(os.path.join(_segment_dir(csv_path), name), "r")).read_all())
+    return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+def open_history(csv_path=HIST_CSV):
+    """Memory-mapped Arrow table of the history (empty table if there is none)."""
+    if os.path.exists(csv_path) and _is_stale(csv_path):
+        rebuild(csv_path)
+    for attempt in range(3):
+        manifest = storage.read_json(_manifest_path(csv_path), default=None)
+        if manifest is None or not os.path.exists(arrow_path(csv_path)):
+            return SCHEMA.empty_table()
+        try:
+            return _read(csv_path, manifest)
+        except FileNotFoundError:  # compacted/rewritten under us – read the new manifest
+            if attempt == 2:
+                raise
+
+def _epoch_ns(when):
+    ts = pd.Timestamp(when)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.as_unit("ns").value
+
+def time_slice(table, start=None, end=None):
+    """Rows with start <= Timestamp < end, as a zero-copy slice of the sorted table."""
+    if table.num_rows == 0 or (start is None and end is None):
+        return table
+    col = table.column("Timestamp")
+    ts  = col.chunk(0).to_numpy() if col.num_chunks == 1 else col.to_numpy()
+    lo  = 0 if start is None else int(np.searchsorted(ts, _epoch_ns(start), side="left"))
+    hi  = len(ts) if end is None else int(np.searchsorted(ts, _epoch_ns(end), side="left"))
+    return table.slice(lo, max(hi - lo, 0))
+
+def to_frame(table, columns=None):
+    """Arrow history → pandas: Timestamp as datetime64[ns] (tz-naive UTC), categoricals for strings."""
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    df = table.to_pandas()
+    if "Timestamp" in df:
+        df["Timestamp"] = df["Timestamp"].to_numpy().view("datetime64[ns]")
+    return df
+
+def load_history(csv_path=HIST_CSV, start=None, end=None, columns=None, coins=None):
+    """
+    DataFrame of history rows in [start, end) – only that slice is materialised.
+    `coins` optionally restricts to a list of coin names.
+    """
+    table = time_slice(open_history(csv_path), start, end)
+    if coins is not None:
+        import pyarrow.compute as pc
+        table = table.filter(pc.is_in(pc.cast(table.column("Coin"), pa.string()), value_set=pa.array(list(coins), pa.string())))
+    return to_frame(table, columns)
@@ -0,0 +1,124 @@
+# image_pipeline.py
+"""
+Client photo / logo processing for the MEGA Client Manager.
+
+  • decode with PIL's draft mode, so a 5 MB JPEG is downscaled by the
+    decoder itself (1/2, 1/4, 1/8) instead of being fully decoded first
+  • centre-crop to a square and emit fixed-size derivatives
+    ("display" and "thumb"), re-encoded as optimised JPEG
+  • name objects by content hash, so re-uploading the same image is a no-op
+    (and several clients can point at one object – see remove())
+  • process and upload on a shared worker pool, so the logo and the
+    headshot of one form submit are handled concurrently
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+DERIVATIVES  = {"display": 512, "thumb": 128}  # name -> square edge in px
+THUMB_PX     = DERIVATIVES["thumb"]            # show thumbs at their own size, never upscaled
+PUBLIC_PATH  = "/storage/v1/object/public/"
+JPEG_QUALITY = 85
+MAX_WORKERS  = 4
+
+_pool     = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="images")
+_uploaded = {}  # (bucket, digest) -> display URL, for this process
+
+# ─── PROCESSING ─────────────────────────────────────────────────────────────
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def load_square(data, edge=max(DERIVATIVES.values())):
+    """Decode `data` at the smallest scale that still yields an `edge`-px square, then centre-crop."""
+    img = Image.open(BytesIO(data))
+    img.draft("RGB", (edge, edge))  # JPEG only: decoder-side downscale; no-op for PNG
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    width, height = img.size
+    min_dim = min(width, height)
+    left = (width - min_dim) // 2
+    top = (height - min_dim) // 2
+    return img.crop((left, top, left + min_dim, top + min_dim))
+
+def derivatives(data):
+    """{name: JPEG bytes} for every size in DERIVATIVES, largest first."""
+    square = load_square(data)
+    out = {}
+    for name, edge in sorted(DERIVATIVES.items(), key=lambda kv: -kv[1]):
+        if square.width > edge:
+            square = square.resize((edge, edge), Image.LANCZOS)
+        buffer = BytesIO()
+        square.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        out[name] = buffer.getvalue()
+    return out
+
+# ─── UPLOAD ─────────────────────────────────────────────────────────────────
+def object_path(bucket, digest, name="display"):
+    return f"{bucket}/{digest}.jpg" if name == "display" else f"{bucket}/{name}/{digest}.jpg"
+
+def thumb_url(display_url):
+    """Thumbnail URL for a display URL produced by process_and_upload (same URL for legacy uploads)."""
+    head, _, filename = (display_url or "").rpartition("/")
+    if not head or len(filename) != 64 + len(".jpg"):  # legacy uploads are uuid-named, no thumbs
+        return display_url
+    return f"{head}/thumb/{filename}"
+
+def stored(storage, bucket, path):
+    """Whether object `path` is already in `bucket` (False when the listing itself fails)."""
+    folder, _, filename = path.rpartition("/")
+    try:
+        found = storage.from_(bucket).list(folder, {"search": filename})
+    except Exception:
+        return False
+    return any(obj.get("name") == filename for obj in found or [])
+
+def process_and_upload(storage, public_base, bucket, data):
+    """
+    Build derivatives for `data` and upload them under content-hash paths.
+    Returns the public URL of the display image. Skips all work for an
+    image this process has already uploaded or whose display object is
+    already stored – it goes up last, so it implies the thumbnail – and
+    treats "already exists" from storage as success.
+    """
+    digest = content_hash(data)
+    url    = f"{public_base}{PUBLIC_PATH}{object_path(bucket, digest)}"
+    if (bucket, digest) in _uploaded:
+        return _uploaded[(bucket, digest)]
+    if stored(storage, bucket, object_path(bucket, digest)):
+        _uploaded[(bucket, digest)] = url
+        return url
+
+    for name, blob in reversed(derivatives(data).items()):
+        path = object_path(bucket, digest, name)
+        try:
+            storage.from_(bucket).upload(path, blob, {"content-type": "image/jpeg"})
+        except Exception as e:
+            if "exist" not in str(e).lower() and "duplicate" not in str(e).lower():
+                raise
+
+    _uploaded[(bucket, digest)] = url
+    return url
+
+def submit(storage, public_base, bucket, data):
+    """Queue process_and_upload on the worker pool; returns a Future for the URL."""
+    return _pool.submit(process_and_upload, storage, public_base, bucket, data)
+
+# ─── DELETE ─────────────────────────────────────────────────────────────────
+def stored_paths(display_url):
+    """Object paths behind a display URL: the image and its thumbnail (just the image for legacy uploads)."""
+    urls = {display_url, thumb_url(display_url)}
+    return sorted(u.split(PUBLIC_PATH, 1)[1] for u in urls if u and PUBLIC_PATH in u)
+
+def remove(storage, bucket, display_url):
+    """
+    Delete an uploaded image and its thumbnail. Objects are shared by every
+    client with the same image, so only call this once no row references it.
+    """
+    paths = stored_paths(display_url)
+    if paths:
+        storage.from_(bucket).remove(paths)
+    for key in [k for k, v in _uploaded.items() if v == display_url]:
+        del _uploaded[key]  # a later upload of the same image has to really upload again
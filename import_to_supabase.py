@@ -1,6 +1,7 @@
 import pandas as pd
 from supabase import create_client, Client
-from datetime import datetime
+
+import client_sync
 
 # Supabase credentials
 url = "https://xxyfipfbnusrowhbtwkb.supabase.co"
@@ -35,27 +36,24 @@ df = df.rename(columns={
     "Upload 1 supported file. Max 10 MB.": "photo_url"
 })
 
-# Add last_update
-df["last_update"] = datetime.utcnow().isoformat()
-
-# Filter valid columns
+# Filter valid columns (last_update is stamped by client_sync on changed rows only)
 columns = [
     "name", "legal_name", "badge_name", "bio", "dob", "gender",
     "phone", "email", "company", "logo_url",
     "address", "city", "state", "zip",
     "emergency_contact", "emergency_contact_phone",
     "airport_code", "arrival_date", "arrival_time",
-    "photo_url", "last_update"
+    "photo_url"
 ]
 df = df[[col for col in columns if col in df.columns]]
 
-# Upsert into Supabase using "name" as conflict key
-for _, row in df.iterrows():
-    data = row.dropna().to_dict()
-    try:
-        supabase.table("clients").upsert(data, on_conflict="name").execute()
-        print(f"✅ Synced: {data.get('name', '[No Name]')}")
-    except Exception as e:
-        print(f"⚠️ Error syncing {data.get('name', '[No Name]')}: {e}")
+# Refresh the local mirror, then bulk-upsert only new/changed rows ("name" is the conflict key)
+conn = client_sync.open_mirror()
+client_sync.pull(supabase, conn)
+try:
+    sent, skipped = client_sync.push(supabase, conn, client_sync.frame_to_rows(df))
+    print(f"✅ Synced {sent} changed clients, skipped {skipped} unchanged.")
+except Exception as e:
+    print(f"⚠️ Error syncing clients: {e}")
 
 print("✅ All clients processed with upsert protection.")
@@ -0,0 +1,201 @@
+# instrument.py
+"""
+Lightweight run-level instrumentation for the pipeline.
+
+    instrument.start_run("analyze")
+    with instrument.span("reddit"):
+        posts = fetch_reddit_posts(...)
+    instrument.count("rows.reddit", len(posts))
+    instrument.finish_run()          # appends one JSON record to logs/run_metrics.jsonl
+
+Every outbound `requests` call made while a run is active is timed per
+host automatically. All helpers are no-ops when no run is active, so
+library modules can call them unconditionally.
+
+Process-pool workers have their own (empty) module state: a worker wraps
+its job in start_run(..., profile=False) / detach() and returns the
+detached stages/counters/http with its result, and the parent folds them
+into its run with merge().
+
+Profiling: set SAE_PROFILE=cprofile (writes logs/profile_<ts>.prof) or
+SAE_PROFILE=pyinstrument (writes logs/profile_<ts>.html) to capture a
+full profile of the run alongside the timing record.
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR     = os.path.join(BASE_DIR, "logs")
+METRICS_LOG = os.path.join(LOG_DIR, "run_metrics.jsonl")
+
+_run = None  # the active run record, if any
+
+# ─── RUN LIFECYCLE ──────────────────────────────────────────────────────────
+def start_run(name, profile=None):
+    """Begin collecting spans/counters for a run named `name`."""
+    global _run
+    _patch_requests()
+    _run = {
+        "run":      name,
+        "started":  datetime.now(timezone.utc).isoformat(),
+        "_t0":      time.perf_counter(),
+        "stages":   {},
+        "counters": {},
+        "http":     {},
+        "_profiler": _start_profiler(os.getenv("SAE_PROFILE") if profile is None else profile),
+    }
+    return _run
+
+def finish_run(error=None, path=None):
+    """Close the active run, write its JSON record and return it."""
+    global _run
+    if _run is None:
+        return None
+    current, _run = _run, None
+
+    record = {k: v for k, v in current.items() if not k.startswith("_")}
+    record["duration_s"] = round(time.perf_counter() - current["_t0"], 4)
+    if error is not None:
+        record["error"] = repr(error)
+    profile_path = _stop_profiler(current["_profiler"])
+    if profile_path:
+        record["profile"] = profile_path
+
+    path = path or METRICS_LOG
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+def detach():
+    """Close the active run without writing it; returns its stages/counters/http for merge()."""
+    global _run
+    if _run is None:
+        return None
+    current, _run = _run, None
+    _stop_profiler(current["_profiler"])
+    return {k: current[k] for k in ("stages", "counters", "http")}
+
+def merge(metrics):
+    """Fold a detach()ed worker run into the active run (calls and totals add up, max is the max)."""
+    if _run is None or not metrics:
+        return
+    for table in ("stages", "http"):
+        for key, other in metrics.get(table, {}).items():
+            stat = _run[table].setdefault(key, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+            stat["calls"]   += other["calls"]
+            stat["total_s"]  = round(stat["total_s"] + other["total_s"], 6)
+            stat["max_s"]    = round(max(stat["max_s"], other["max_s"]), 6)
+    for name, n in metrics.get("counters", {}).items():
+        count(name, n)
+
+@contextmanager
+def run(name, profile=None):
+    """`with instrument.run("analyze"):` – start_run/finish_run around a block."""
+    start_run(name, profile)
+    try:
+        yield
+    except BaseException as e:
+        finish_run(error=e)
+        raise
+    else:
+        finish_run()
+
+# ─── SPANS / COUNTERS ───────────────────────────────────────────────────────
+def _record(table, key, seconds):
+    stat = table.setdefault(key, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+    stat["calls"]   += 1
+    stat["total_s"]  = round(stat["total_s"] + seconds, 6)
+    stat["max_s"]    = round(max(stat["max_s"], seconds), 6)
+
+@contextmanager
+def span(name):
+    """Time a block; repeated spans with the same name are aggregated."""
+    if _run is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _run is not None:
+            _record(_run["stages"], name, time.perf_counter() - t0)
+
+def timed(name):
+    """Decorator form of span()."""
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        inner.__name__ = fn.__name__
+        inner.__doc__  = fn.__doc__
+        return inner
+    return wrap
+
+def count(name, n=1):
+    """Add `n` to a counter (row counts, cache hits/misses, ...)."""
+    if _run is not None:
+        _run["counters"][name] = _run["counters"].get(name, 0) + n
+
+# ─── HTTP ───────────────────────────────────────────────────────────────────
+_orig_request = None
+
+def _patch_requests():
+    """Wrap requests.Session.request once so every HTTP call is timed per host."""
+    global _orig_request
+    if _orig_request is not None:
+        return
+    _orig_request = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        if _run is None:
+            return _orig_request(self, method, url, *args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return _orig_request(self, method, url, *args, **kwargs)
+        finally:
+            if _run is not None:
+                _record(_run["http"], urlparse(str(url)).netloc or str(url), time.perf_counter() - t0)
+
+    requests.Session.request = request
+
+# ─── PROFILING ──────────────────────────────────────────────────────────────
+def _start_profiler(mode):
+    if not mode:
+        return None
+    if mode == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        return ("cprofile", prof)
+    if mode == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        return ("pyinstrument", prof)
+    raise ValueError(f"Unknown SAE_PROFILE mode: {mode}")
+
+def _stop_profiler(handle):
+    if handle is None:
+        return None
+    mode, prof = handle
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    if mode == "cprofile":
+        prof.disable()
+        path = os.path.join(LOG_DIR, f"profile_{stamp}.prof")
+        prof.dump_stats(path)
+    else:
+        prof.stop()
+        path = os.path.join(LOG_DIR, f"profile_{stamp}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(prof.output_html())
+    return path
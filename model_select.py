@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# model_select.py
+"""
+Model selection for the price predictor (one horizon per run, next hour by default).
+
+Every candidate in CANDIDATES (each parameter combination of each model) is
+scored with expanding-window time-series cross-validation: fold k trains on
+the first part of the hourly dataset and predicts the block right after it,
+leaving out training rows whose target lies inside that block, so no fold
+ever sees the future. Metrics come from accuracy.score() – the
+same MAPE / hit rate / directional accuracy the live log is judged by – plus
+mean fit time and predict time per row.
+
+The feature matrix and fold boundaries are built once and cached as .npy
+files under CACHE_DIR (keyed on the history file and the split settings);
+pool workers memory-map them instead of each rebuilding the dataset. The
+grid is spread over a process pool, one estimator thread per worker.
+
+    python model_select.py                      # leaderboard → model_leaderboard.csv
+    python model_select.py --models ridge gbr   # only some candidates
+    python model_select.py --save               # refit the best on all data → price_predictor.pkl
+    python model_select.py --horizon 24 --save  # same for the 24h model → price_predictor_24h.pkl
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from hashlib import blake2b
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import accuracy
+import storage
+import train_price_predictor as tpp
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR       = os.path.join(BASE_DIR, ".cache", "model_select")
+LEADERBOARD_CSV = os.path.join(BASE_DIR, "model_leaderboard.csv")
+N_SPLITS        = 5
+MIN_TRAIN       = 200   # rows in the first training window
+RANK_BY         = "MAPE"
+
+def _grid(**axes):
+    return [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())]
+
+CANDIDATES = {
+    "naive":            [{}],
+    "forest_sentiment": [{"n_estimators": 100}],  # the original model
+    "forest":           _grid(n_estimators=[100, 300], max_depth=[3, 6, None], min_samples_leaf=[5, 20], n_jobs=[1]),
+    "gbr":              _grid(n_estimators=[100, 300], learning_rate=[0.03, 0.1], max_depth=[2, 3], subsample=[0.8]),
+    "ridge":            _grid(alpha=[0.1, 1.0, 10.0, 100.0]),
+}
+
+# ─── FOLD CACHE ─────────────────────────────────────────────────────────────
+def fold_bounds(timestamps, n_splits=N_SPLITS, min_train=MIN_TRAIN, horizon=tpp.HORIZON_HRS):
+    """
+    [(train_end, test_start, test_end)] – fold k tests on rows
+    [test_start, test_end) and trains on [0, train_end): only rows whose
+    target (`horizon` hours on) was already known when the test block starts.
+    """
+    ts   = np.asarray(timestamps, dtype="datetime64[ns]")
+    test = (len(ts) - min_train) // n_splits
+    if test < 1:
+        raise ValueError(f"{len(ts)} rows is too few for {n_splits} folds after {min_train} training rows")
+    starts = min_train + test * np.arange(n_splits)
+    ends   = np.searchsorted(ts, ts[starts] - np.timedelta64(horizon, "h"), side="right")
+    return [(int(e), int(s), int(s + test)) for e, s in zip(ends, starts)]
+
+def prepare(hist_path=None, n_splits=N_SPLITS, min_train=MIN_TRAIN, horizon=tpp.HORIZON_HRS):
+    """Build (or reuse) the cached X / y / folds arrays; returns the cache directory."""
+    hist_path = hist_path or tpp.HIST_CSV
+    st  = os.stat(hist_path)
+    key = blake2b(json.dumps([os.path.abspath(hist_path), st.st_mtime_ns, st.st_size,
+                              tpp.FEATURES, horizon, n_splits, min_train]).encode(), digest_size=8).hexdigest()
+    path = os.path.join(CACHE_DIR, key)
+    if os.path.exists(os.path.join(path, "folds.npy")):
+        return path
+
+    data = tpp.build_dataset(hist_path, horizon=horizon)
+    os.makedirs(path, exist_ok=True)
+    for name, arr in (("X", data[tpp.FEATURES].to_numpy(dtype="float64")),
+                      ("y", data["TargetPrice"].to_numpy(dtype="float64")),
+                      ("folds", np.array(fold_bounds(data["Timestamp"], n_splits, min_train, horizon), dtype="int64"))):
+        with storage.atomic_write(os.path.join(path, f"{name}.npy"), mode="wb") as f:
+            np.save(f, arr)
+    print(f"🧮 Cached {len(data)} rows × {len(tpp.FEATURES)} features, {n_splits} folds → {path}")
+    return path
+
+# ─── EVALUATION ─────────────────────────────────────────────────────────────
+_DATA = {}
+
+def _init_worker(path):
+    for name in ("X", "y", "folds"):
+        _DATA[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+def evaluate(task):
+    """Cross-validate one (name, params) candidate on the cached folds; returns a leaderboard row."""
+    name, params = task
+    X = pd.DataFrame(np.asarray(_DATA["X"]), columns=tpp.FEATURES)
+    y = np.asarray(_DATA["y"])
+    scored, fit_s, pred_s, rows = [], 0.0, 0.0, 0
+    for train_end, test_start, test_end in _DATA["folds"]:
+        model = tpp.make_model(name, params)
+        t0 = time.perf_counter()
+        model.fit(X.iloc[:train_end], y[:train_end])
+        t1 = time.perf_counter()
+        pred = model.predict(X.iloc[test_start:test_end])
+        t2 = time.perf_counter()
+        fit_s, pred_s, rows = fit_s + t1 - t0, pred_s + t2 - t1, rows + test_end - test_start
+        scored.append(accuracy.score(pred, y[test_start:test_end], X["PriceUSD"].to_numpy()[test_start:test_end]))
+
+    s = pd.concat(scored, ignore_index=True)
+    return {
+        "Model":        name,
+        "Params":       json.dumps(params, sort_keys=True),
+        "MAPE":         s["ErrPct"].mean(),
+        "HitRate":      s["Hit"].mean(),
+        "Directional":  s["DirectionHit"].mean(),
+        "BiasPct":      s["BiasPct"].mean(),
+        "FitSeconds":   fit_s / len(_DATA["folds"]),
+        "PredictUsRow": pred_s / rows * 1e6,
+        "TestRows":     rows,
+    }
+
+def leaderboard(path, models=None, workers=None):
+    """Evaluate every candidate over a process pool; rows sorted best first by RANK_BY."""
+    tasks = [(name, params) for name, grid in CANDIDATES.items() if not models or name in models for params in grid]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(path,)) as pool:
+        rows = list(pool.map(evaluate, tasks))
+    return pd.DataFrame(rows).sort_values([RANK_BY, "FitSeconds"], ignore_index=True)
+
+# ─── MAIN ───────────────────────────────────────────────────────────────────
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cross-validate price predictor candidates and pick the best")
+    ap.add_argument("--models", nargs="+", choices=list(CANDIDATES), help="subset of candidates (default: all)")
+    ap.add_argument("--horizon", type=int, default=tpp.HORIZON_HRS, choices=tpp.HORIZONS_HRS, help="hours ahead")
+    ap.add_argument("--splits", type=int, default=N_SPLITS)
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", default=LEADERBOARD_CSV)
+    ap.add_argument("--save", action="store_true", help="refit the best candidate on all data and persist it")
+    args = ap.parse_args(argv)
+
+    t0    = time.perf_counter()
+    path  = prepare(n_splits=args.splits, horizon=args.horizon)
+    board = leaderboard(path, args.models, args.workers)
+    storage.write_csv(board, args.out)
+    print(f"🏁 {len(board)} candidates × {args.splits} folds in {time.perf_counter() - t0:.1f}s → {args.out}")
+    print(board.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+    best  = board.iloc[0]
+    naive = board[board["Model"] == "naive"]
+    if len(naive) and best["Model"] != "naive":
+        print(f"📏 Best {best['Model']} MAPE {best['MAPE']:.3f}% vs naive {naive['MAPE'].iloc[0]:.3f}%")
+
+    if args.save:
+        params = json.loads(best["Params"])
+        data   = tpp.build_dataset(horizon=args.horizon)
+        model  = tpp.make_model(best["Model"], params).fit(data, data["TargetPrice"])
+        cv     = {k: (v.item() if hasattr(v, "item") else v) for k, v in best.items() if k not in ("Model", "Params")}
+        tpp.save_model(model, best["Model"], params, data, cv={**cv, "splits": args.splits}, horizon=args.horizon)
+        print(f"✅ Saved {args.horizon}h {best['Model']} {best['Params']} to {tpp.model_path(args.horizon)}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
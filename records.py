@@ -0,0 +1,200 @@
+# records.py
+"""
+Compact record types for pipeline rows.
+
+Rows used to be dicts that each repeated the ISO timestamp string, the coin
+name and the emoji action. Here:
+
+  • timestamps are int64 epoch microseconds (UTC)
+  • coins/sources/actions are small ints: coin codes come from one interning
+    table seeded with the registry order, Source/Action are IntEnums
+  • single items (a scraped post, a source Document) are __slots__ dataclasses
+  • batches (SentimentBatch, HistoryBatch) store one typed array per column –
+    ~30 bytes per history row instead of ~400 for a dict – and convert to a
+    DataFrame / CSV only at the edges
+
+Batches also round-trip through to_dict()/from_dict() (columnar JSON) so shard
+segments stay small on disk and cheap to pickle between processes.
+"""
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+import coin_registry
+
+# ─── ENUMS / INTERNING ──────────────────────────────────────────────────────
+class Source(IntEnum):
+    REDDIT    = 0
+    NEWS      = 1
+    PUSHSHIFT = 2
+    TWITTER   = 3
+
+    @property
+    def label(self):
+        return SOURCE_LABELS[self]
+
+SOURCE_LABELS = {Source.REDDIT: "Reddit", Source.NEWS: "News", Source.PUSHSHIFT: "Pushshift", Source.TWITTER: "Twitter"}
+
+class Action(IntEnum):
+    SELL = -1
+    HOLD = 0
+    BUY  = 1
+
+    @property
+    def label(self):
+        return ACTION_LABELS[self]
+
+ACTION_LABELS = {Action.BUY: "📈 Buy", Action.SELL: "📉 Sell", Action.HOLD: "🤝 Hold"}
+ACTION_BAND   = 0.2  # |avg sentiment| above this → Buy / Sell
+
+def action_for(avg):
+    return Action.BUY if avg > ACTION_BAND else Action.SELL if avg < -ACTION_BAND else Action.HOLD
+
+_coin_names = list(coin_registry.names())
+_coin_codes = {name: i for i, name in enumerate(_coin_names)}
+
+def coin_code(name):
+    """Interned small-int code for a coin name (unknown names get the next free code)."""
+    code = _coin_codes.get(name)
+    if code is None:
+        code = _coin_codes[name] = len(_coin_names)
+        _coin_names.append(name)
+    return code
+
+def coin_name(code):
+    return _coin_names[code]
+
+# ─── TIMESTAMPS ─────────────────────────────────────────────────────────────
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def epoch_us(when):
+    """datetime (naive = UTC) or unix seconds → int epoch microseconds."""
+    if isinstance(when, (int, float)):
+        return int(when * 1_000_000)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return (when - _EPOCH) // timedelta(microseconds=1)  # exact, no float rounding
+
+def now_us():
+    return epoch_us(datetime.now(timezone.utc))
+
+def iso_strings(ts_us):
+    """int64 epoch µs array → exactly what datetime.isoformat() gave the CSVs ("…[.ffffff]+00:00")."""
+    us   = np.asarray(ts_us, dtype="int64")
+    dt   = pd.to_datetime(us, unit="us")
+    base = np.asarray(dt.strftime("%Y-%m-%dT%H:%M:%S"), dtype=object)
+    frac = np.where(us % 1_000_000 != 0, np.asarray(dt.strftime(".%f"), dtype=object), "")
+    return base + frac + "+00:00"
+
+# ─── SINGLE ITEMS ───────────────────────────────────────────────────────────
+@dataclass(slots=True)
+class Post:
+    """One scraped document mentioning one coin."""
+    ts:     int     # epoch µs
+    coin:   int     # coin_code()
+    source: Source
+    text:   str
+
+@dataclass(slots=True)
+class Document:
+    """One item from a source adapter (see sources.py); may mention several coins."""
+    id:         str
+    ts:         int     # epoch µs
+    coins:      tuple   # coin_code()s mentioned
+    text:       str
+    source:     Source
+    engagement: float = 0.0  # upvotes + comments, likes + retweets, ... (0 if unknown)
+
+# ─── COLUMNAR BATCHES ───────────────────────────────────────────────────────
+class _Batch:
+    # (name, array typecode or None for a python list)
+    COLUMNS = ()
+
+    def __init__(self):
+        for name, code in self.COLUMNS:
+            setattr(self, name, array(code) if code else [])
+
+    def __len__(self):
+        return len(getattr(self, self.COLUMNS[0][0]))
+
+    def extend(self, other):
+        for name, _ in self.COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+        return self
+
+    def to_dict(self):
+        out = {name: list(getattr(self, name)) for name, _ in self.COLUMNS}
+        out["coin_names"] = list(_coin_names)  # codes are only meaningful within one process
+        return out
+
+    @classmethod
+    def from_dict(cls, data):
+        batch = cls()
+        for name, _ in cls.COLUMNS:
+            getattr(batch, name).extend(data.get(name, []))
+        if "coin_names" in data:
+            remap = [coin_code(n) for n in data["coin_names"]]
+            batch.coin = array("h", (remap[c] for c in batch.coin))
+        return batch
+
+    def codes(self, name):
+        """Zero-copy numpy view of an integer/float column."""
+        col = getattr(self, name)
+        return np.frombuffer(col, col.typecode) if len(col) else np.array([], col.typecode)
+
+    def to_csv(self, path, **to_csv_kwargs):
+        to_csv_kwargs.setdefault("index", False)
+        self.to_frame().to_csv(path, **to_csv_kwargs)
+
+    def _coins(self):
+        return pd.Categorical([coin_name(c) for c in self.coin], categories=list(_coin_names))
+
+    def _sources(self):
+        return pd.Categorical([SOURCE_LABELS[Source(s)] for s in self.source], categories=list(SOURCE_LABELS.values()))
+
+class SentimentBatch(_Batch):
+    """
+    Scored documents (sentiment_output.csv rows). `posted` (the document's own
+    time) and `weight` feed sentiment_agg but are not written to the CSV.
+    """
+    COLUMNS = (("ts", "q"), ("coin", "h"), ("source", "b"), ("sentiment", "d"), ("text", None),
+               ("posted", "q"), ("weight", "d"))
+
+    def append(self, ts, coin, source, sentiment, text, posted=None, weight=1.0):
+        self.ts.append(ts); self.coin.append(coin); self.source.append(source)
+        self.sentiment.append(sentiment); self.text.append(text)
+        self.posted.append(ts if posted is None else posted); self.weight.append(weight)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "Timestamp": iso_strings(self.ts),
+            "Coin":      self._coins(),
+            "Source":    self._sources(),
+            "Text":      self.text,
+            "Sentiment": self.codes("sentiment"),
+        })
+
+class HistoryBatch(_Batch):
+    """Per coin/source aggregates (sentiment_history.csv rows)."""
+    COLUMNS = (("ts", "q"), ("coin", "h"), ("source", "b"), ("sentiment", "d"), ("price", "d"), ("action", "b"))
+
+    def append(self, ts, coin, source, sentiment, price, action):
+        self.ts.append(ts); self.coin.append(coin); self.source.append(source)
+        self.sentiment.append(sentiment); self.price.append(price); self.action.append(action)
+
+    def to_frame(self, columns=None):
+        df = pd.DataFrame({
+            "Timestamp":       iso_strings(self.ts),
+            "Coin":            self._coins(),
+            "Source":          self._sources(),
+            "Sentiment":       np.round(self.codes("sentiment"), 4),
+            "PriceUSD":        np.round(self.codes("price"), 2),
+            "SuggestedAction": pd.Categorical([ACTION_LABELS[Action(a)] for a in self.action],
+                                              categories=list(ACTION_LABELS.values())),
+        })
+        return df if columns is None else df[columns]
@@ -3,8 +3,8 @@
 import os
 from dotenv import load_dotenv
 import praw
-from datetime import datetime, timezone
-from crypto_price_alerts import COINS
+import coin_registry
+from records import Post, Source, coin_code, epoch_us
 from textblob import TextBlob
 
 # ─── Load your .env so os.getenv() works ─────────────────────────────────────
@@ -17,22 +17,20 @@ reddit = praw.Reddit(
     user_agent    = os.getenv("REDDIT_USER_AGENT"),
 )
 
-def fetch_reddit_posts(coins):
+def fetch_reddit_posts(coins, limit=50):
     """
-    Pull the latest ~50 submissions from r/CryptoCurrency,
-    filter for mentions of each coin in COINS, and return
-    a list of dicts: { Timestamp, Coin, Source, Text }
+    Pull the latest `limit` submissions (None = whole listing) from r/CryptoCurrency,
+    filter for mentions of each coin (name or registry alias), and
+    return a list of records.Post (one per coin mentioned; the text is shared)
     """
     results = []
-    for submission in reddit.subreddit("CryptoCurrency").new(limit=50):
-        created = submission.created_utc
-        text    = f"{submission.title}\n\n{submission.selftext}"
+    known   = set(coin_registry.names())
+    codes   = {coin: coin_code(coin) for coin in coins}
+    for submission in reddit.subreddit("CryptoCurrency").new(limit=limit):
+        ts   = epoch_us(submission.created_utc)
+        text = f"{submission.title}\n\n{submission.selftext}"
         for coin in coins:
-            if coin.lower() in text.lower():
-                results.append({
-                    "Timestamp": datetime.fromtimestamp(created, tz=timezone.utc).isoformat(),
-                    "Coin":      coin,
-                    "Source":    "reddit",
-                    "Text":      text,
-                })
+            hit = coin_registry.mentions(coin, text) if coin in known else coin.lower() in text.lower()
+            if hit:
+                results.append(Post(ts, codes[coin], Source.REDDIT, text))
     return results
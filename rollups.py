@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# rollups.py
+"""
+Precomputed per-coin rollup tables.
+
+Run after every ingest (analyze.main calls build_rollups) so that the
+dashboard only ever reads a few small tables instead of re-parsing the
+full sentiment history and prediction log on every rerun.
+
+Tables written:
+    rollup_hourly.csv  – per coin / hour:  sentiment, price, 24h change, prediction error stats
+    rollup_daily.csv   – same, per coin / day
+    rollup_weekly.csv  – same, per coin / week (coarsest level for long-range charts)
+    rollup_latest.csv  – one row per coin with the numbers the dashboard headlines
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import storage
+import history_store
+import accuracy
+from history_store import parse_timestamps
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+HIST_CSV      = os.path.join(BASE_DIR, "sentiment_history.csv")
+PRED_LOG_JSON = os.path.join(BASE_DIR, "prediction_log.json")
+HOURLY_CSV    = os.path.join(BASE_DIR, "rollup_hourly.csv")
+DAILY_CSV     = os.path.join(BASE_DIR, "rollup_daily.csv")
+WEEKLY_CSV    = os.path.join(BASE_DIR, "rollup_weekly.csv")
+LATEST_CSV    = os.path.join(BASE_DIR, "rollup_latest.csv")
+ACCURACY_JSON = os.path.join(BASE_DIR, "accuracy.json")
+TOL_PCT       = accuracy.TOL_PCT
+
+ROLLUP_COLUMNS = [
+    "Timestamp", "Coin", "Sentiment", "PriceUSD", "Change24hPct", "Samples",
+    "Predictions", "Resolved", "MeanDiffPct", "HitRate", "BiasPct",
+]
+
+# ─── LOADERS ────────────────────────────────────────────────────────────────
+def load_history(path=HIST_CSV, start=None):
+    """History rows (optionally from `start` on) via the memory-mapped Arrow copy."""
+    df = history_store.load_history(path, start=start, columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"])
+    if df.empty:
+        return pd.DataFrame(columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"])
+    df["Coin"] = df["Coin"].astype(object)  # rollup merges/groupbys key on plain strings
+    return df.dropna(subset=["Timestamp", "Coin"])
+
+def load_predictions(path=PRED_LOG_JSON, horizon=1):
+    """
+    Flatten prediction_log.json into one frame (one DataFrame per coin, no
+    per-entry loop), keeping the `horizon`-hour predictions (entries without
+    horizon_h are 1h).
+    """
+    cols = ["Coin", "Timestamp", "Predicted", "Actual", "DiffPct", "Accurate"]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=cols)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            log = json.load(f)
+    except json.JSONDecodeError:
+        return pd.DataFrame(columns=cols)
+
+    frames = [pd.DataFrame(entries).assign(Coin=coin) for coin, entries in log.items() if entries]
+    if not frames:
+        return pd.DataFrame(columns=cols)
+    df = pd.concat(frames, ignore_index=True).rename(columns={
+        "timestamp": "Timestamp", "predicted": "Predicted", "actual": "Actual",
+        "diff_pct": "DiffPct", "accurate": "Accurate",
+    })
+    if "horizon_h" in df.columns:
+        df = df[df["horizon_h"].fillna(1) == horizon]
+    for c in cols:
+        if c not in df.columns:
+            df[c] = None
+    df = df[cols]
+    df["Timestamp"] = parse_timestamps(df["Timestamp"])
+    for c in ("Predicted", "Actual", "DiffPct"):
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df["Accurate"] = df["Accurate"].astype("float")
+    return df.dropna(subset=["Timestamp"])
+
+# ─── AGGREGATION ────────────────────────────────────────────────────────────
+def _sentiment_rollup(hist, freq):
+    if hist.empty:
+        return pd.DataFrame(columns=["Timestamp", "Coin", "Sentiment", "PriceUSD", "Change24hPct", "Samples"])
+    g = hist.groupby(["Coin", pd.Grouper(key="Timestamp", freq=freq)])
+    out = pd.DataFrame({
+        "Sentiment": g["Sentiment"].mean(),
+        "PriceUSD":  g["PriceUSD"].last(),
+        "Samples":   g["Sentiment"].count(),
+    }).reset_index()
+    out = out[out["Samples"] > 0].sort_values("Timestamp")
+
+    # 24h change: compare each bucket's price to the last price at least 24h earlier
+    ref = out[["Timestamp", "Coin", "PriceUSD"]].rename(columns={"PriceUSD": "Price24hAgo"})
+    ref["Timestamp"] = ref["Timestamp"] + timedelta(hours=24)
+    out = pd.merge_asof(out, ref, on="Timestamp", by="Coin", direction="backward")
+    out["Change24hPct"] = (out["PriceUSD"] - out["Price24hAgo"]) / out["Price24hAgo"] * 100
+    return out.drop(columns=["Price24hAgo"])
+
+def _prediction_rollup(preds, freq):
+    if preds.empty:
+        return pd.DataFrame(columns=["Timestamp", "Coin", "Predictions", "Resolved", "MeanDiffPct", "HitRate", "BiasPct"])
+    scored = accuracy.score(preds["Predicted"], preds["Actual"]).set_index(preds.index)
+    preds  = preds.assign(ErrPct=scored["ErrPct"], Hit=scored["Hit"], BiasPct=scored["BiasPct"])
+    g = preds.groupby(["Coin", pd.Grouper(key="Timestamp", freq=freq)])
+    return pd.DataFrame({
+        "Predictions": g["Predicted"].count(),
+        "Resolved":    g["Actual"].count(),
+        "MeanDiffPct": g["ErrPct"].mean(),
+        "HitRate":     g["Hit"].mean(),
+        "BiasPct":     g["BiasPct"].mean(),
+    }).reset_index()
+
+def rollup(hist, preds, freq):
+    """Per-coin aggregates at `freq` (e.g. "1h", "1D"), sentiment and prediction stats side by side."""
+    out = pd.merge(
+        _sentiment_rollup(hist, freq), _prediction_rollup(preds, freq),
+        on=["Timestamp", "Coin"], how="outer",
+    )
+    out = out.sort_values(["Coin", "Timestamp"]).reset_index(drop=True)
+    return out.reindex(columns=ROLLUP_COLUMNS)
+
+def latest_summary(hourly, preds, now, window_hrs=24, acc=None):
+    """
+    One row per coin: current price, 24h sentiment, latest forecast and 24h
+    accuracy (accuracy.py's precomputed summary, or `acc` if given).
+    """
+    cutoff = now - timedelta(hours=window_hrs)
+    recent = hourly[(hourly["Timestamp"] >= cutoff) & hourly["Sentiment"].notna()]
+    priced = hourly.dropna(subset=["PriceUSD"])
+
+    sent = recent.groupby("Coin").agg(
+        Sentiment24h=("Sentiment", "mean"),
+        FirstSentiment=("Sentiment", "first"),
+        Buckets24h=("Sentiment", "count"),
+    )
+    sent["SentimentChange24h"] = sent["Sentiment24h"] - sent["FirstSentiment"]
+
+    price = priced.groupby("Coin").agg(PriceUSD=("PriceUSD", "last"), PriceAt=("Timestamp", "last"))
+
+    if preds.empty:
+        pred = pd.DataFrame(columns=["Predicted", "PredictedAt"])
+    else:
+        ordered = preds.sort_values("Timestamp")
+        pred = ordered.groupby("Coin").agg(Predicted=("Predicted", "last"), PredictedAt=("Timestamp", "last"))
+
+    acc = accuracy.summary_frame("24h", ACCURACY_JSON, PRED_LOG_JSON) if acc is None else acc
+    acc = acc.set_index("Coin").rename(columns={
+        "MAPE": "MeanDiffPct24h", "HitRate": "HitRate24h", "Directional": "Directional24h", "BiasPct": "BiasPct24h",
+    }).drop(columns=["N"])
+
+    out = price.join([sent, pred, acc], how="outer")
+    out["PredChangePct"] = (out["Predicted"] - out["PriceUSD"]) / out["PriceUSD"] * 100
+    out["Accuracy24h"]   = 100 - out["MeanDiffPct24h"]
+    out["UpdatedAt"]     = now
+    return out.drop(columns=["FirstSentiment"]).reset_index().rename(columns={"index": "Coin"})
+
+# ─── BUILD / READ ───────────────────────────────────────────────────────────
+def build_rollups(now=None, hist_path=HIST_CSV, pred_path=PRED_LOG_JSON):
+    """
+    Recompute every rollup table from the raw history and prediction log.
+    Returns (hourly, daily, weekly, latest).
+    """
+    now   = now or datetime.utcnow()
+    hist  = load_history(hist_path)
+    preds = load_predictions(pred_path)
+    # accuracy state kept beside the log it was scored from (ACCURACY_JSON for the default log)
+    acc_path = os.path.join(os.path.dirname(os.path.abspath(pred_path)), os.path.basename(ACCURACY_JSON))
+
+    hourly = rollup(hist, preds, "1h")
+    daily  = rollup(hist, preds, "1D")
+    weekly = rollup(hist, preds, "1W")
+    latest = latest_summary(hourly, preds, now, acc=accuracy.summary_frame("24h", acc_path, pred_path))
+
+    storage.write_csv(hourly, HOURLY_CSV)
+    storage.write_csv(daily, DAILY_CSV)
+    storage.write_csv(weekly, WEEKLY_CSV)
+    storage.write_csv(latest, LATEST_CSV)
+    print(f"📊 Rollups rebuilt: {len(hourly)} hourly, {len(daily)} daily, {len(weekly)} weekly, {len(latest)} coins")
+    return hourly, daily, weekly, latest
+
+def read_rollup(path):
+    """Read a rollup table written by build_rollups (timestamps come back as datetimes)."""
+    df = pd.read_csv(path)
+    for c in ("Timestamp", "PriceAt", "PredictedAt", "UpdatedAt"):
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce", format="ISO8601")
+    return df
+
+if __name__ == "__main__":
+    build_rollups()
@@ -1,22 +1,40 @@
 import feedparser
 
-def fetch_rss_articles(keyword, limit=5):
-    feed_urls = [
-        "https://cointelegraph.com/rss",
-        "https://www.coindesk.com/arc/outboundfeeds/rss/",
-        "https://news.bitcoin.com/feed/",
-        "https://cryptopotato.com/feed/",
-        "https://www.newsbtc.com/feed/"
-    ]
+import coin_registry
 
+FEED_URLS = [
+    "https://cointelegraph.com/rss",
+    "https://www.coindesk.com/arc/outboundfeeds/rss/",
+    "https://news.bitcoin.com/feed/",
+    "https://cryptopotato.com/feed/",
+    "https://www.newsbtc.com/feed/"
+]
+
+def fetch_feed_entries():
+    """Parse every feed once: [(url, entries), ...]. Pass to fetch_rss_articles
+    to match many coins without re-downloading the feeds per coin."""
+    feeds = []
+    for url in FEED_URLS:
+        try:
+            feeds.append((url, feedparser.parse(url).entries))
+        except Exception as e:
+            print(f"⚠️ Failed to fetch from {url}: {e}")
+    return feeds
+
+def _matcher(keyword):
+    if keyword in coin_registry.names():
+        return lambda title: coin_registry.mentions(keyword, title)
+    return lambda title: keyword.lower() in title.lower()
+
+def fetch_rss_articles(keyword, limit=5, feeds=None):
+    matches = _matcher(keyword)
     results = []
 
-    for url in feed_urls:
+    for url, entries in (feeds if feeds is not None else fetch_feed_entries()):
         try:
-            feed = feedparser.parse(url)
             count = 0
-            for entry in feed.entries:
-                if keyword.lower() in entry.title.lower() and count < limit:
+            for entry in entries:
+                if matches(entry.title) and count < limit:
                     text = f"{entry.title}. {entry.get('summary', '')}"
                     results.append({
                         "text": text,
@@ -2,6 +2,8 @@ import schedule
 import time
 import subprocess
 
+import auto_push
+
 def run_analysis():
     print("🔁 Running scheduled sentiment analysis...\n")
     subprocess.run(["python", "analyze.py"])
@@ -9,6 +11,10 @@ def run_analysis():
 # Every 60 minutes (you can adjust this)
 schedule.every(60).minutes.do(run_analysis)
 
+# Publishing (git commit/push) runs on its own thread and interval so a slow
+# or rejecting remote never delays the next analysis run.
+auto_push.start_background()
+
 print("🕒 Scheduler started. Press Ctrl+C to stop.\n")
 while True:
     schedule.run_pending()
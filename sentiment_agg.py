@@ -0,0 +1,257 @@
+# sentiment_agg.py
+"""
+Incremental, weighted sentiment aggregation.
+
+Every scored document is folded into running sums per (coin, source, hour
+bucket) – nothing is rescanned, and a bucket keeps absorbing documents from
+every run that lands in it. Per bucket we keep
+
+    N   documents
+    W   Σ w          WS  Σ w·s
+    D   Σ w·g        DS  Σ w·g·s      g = 2^((t - base) / HALF_LIFE_H)
+
+where w = credibility(source) · (1 + ln(1 + engagement)) and t is the
+document's own timestamp. Prefix sums over the buckets are maintained
+alongside, so "weighted mean over the last N hours" is one subtraction per
+series: WS/W undecayed, or DS/D with exponential recency decay – the
+query-time factor 2^(-now/HALF_LIFE_H) is common to numerator and
+denominator and cancels, which is what keeps decayed queries O(1) too.
+
+State (about RETAIN_H hours of buckets) is kept in sentiment_agg.json and
+updated under a lock with record().
+"""
+
+import os
+import math
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import storage
+from records import Source, SOURCE_LABELS, coin_name, now_us
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+STATE_JSON  = os.path.join(BASE_DIR, "sentiment_agg.json")
+BUCKET_S    = 3600
+RETAIN_H    = 14 * 24
+SLACK       = 24      # spare future buckets allocated per resize
+HALF_LIFE_H = 6
+CREDIBILITY = {Source.NEWS: 1.0, Source.REDDIT: 0.8, Source.PUSHSHIFT: 0.8, Source.TWITTER: 0.6}
+
+FIELDS = ("N", "W", "WS", "D", "DS")
+_N, _W, _WS, _D, _DS = range(len(FIELDS))
+
+# ─── WEIGHTS ────────────────────────────────────────────────────────────────
+def weight(source, engagement=0.0):
+    """Source credibility × log-damped engagement (upvotes + comments, likes + retweets, ...)."""
+    return CREDIBILITY.get(Source(source), 1.0) * (1.0 + math.log1p(max(engagement or 0.0, 0.0)))
+
+def _bucket(ts_us):
+    return np.floor_divide(np.asarray(ts_us, dtype="int64"), BUCKET_S * 1_000_000)
+
+# ─── AGGREGATOR ─────────────────────────────────────────────────────────────
+class Aggregator:
+    """
+    Running weighted sums for every (coin, source) series over a shared range
+    of hour buckets [base, base + width). Coins are stored by name.
+    """
+
+    def __init__(self):
+        self.base  = None                 # absolute bucket number of column 0
+        self.head  = None                 # newest bucket seen
+        self.keys  = {}                   # (coin name, Source) -> series row
+        self.sums  = np.zeros((0, len(FIELDS), 0))
+        self.cum   = np.zeros((0, len(FIELDS), 1))  # cum[..., k] = Σ sums[..., :k]
+
+    @property
+    def width(self):
+        return self.sums.shape[2]
+
+    # -- layout --
+    def _row(self, coin, source):
+        key = (coin, Source(source))
+        if key not in self.keys:
+            self.keys[key] = len(self.keys)
+            self.sums = np.concatenate([self.sums, np.zeros((1, len(FIELDS), self.width))])
+            self.cum  = np.concatenate([self.cum, np.zeros((1, len(FIELDS), self.width + 1))])
+        return self.keys[key]
+
+    def _rebase(self, new_base, width):
+        """Move column 0 to bucket `new_base` and resize to `width` columns, rescaling the decay sums."""
+        shift = new_base - self.base
+        out   = np.zeros((len(self.keys), len(FIELDS), width))
+        lo, hi = max(shift, 0), min(self.width, shift + width)
+        if hi > lo:
+            out[:, :, lo - shift:hi - shift] = self.sums[:, :, lo:hi]
+        out[:, [_D, _DS]] *= 2.0 ** (-shift * BUCKET_S / (HALF_LIFE_H * 3600))
+        self.base, self.sums = new_base, out
+        self._refresh()
+
+    def _refresh(self):
+        self.cum = np.zeros((len(self.keys), len(FIELDS), self.width + 1))
+        np.cumsum(self.sums, axis=2, out=self.cum[:, :, 1:])
+
+    def _fit(self, lo, hi):
+        """Make buckets [lo, hi] addressable; buckets more than RETAIN_H before the newest are dropped."""
+        if self.base is None:
+            self.base = self.head = lo
+        self.head = max(self.head, hi)
+        floor     = self.head - RETAIN_H + 1
+        keep      = floor if self.base < floor - SLACK else self.base  # prune in steps, not every hour
+        new_base  = min(max(lo, floor), keep)
+        if new_base != self.base or self.head >= self.base + self.width:
+            self._rebase(new_base, self.head - new_base + 1 + SLACK)
+
+    # -- updates --
+    def add_many(self, ts_us, coins, sources, sentiments, weights=None):
+        """Fold a batch of scored documents in (parallel sequences; coins by name)."""
+        ts_us      = np.asarray(ts_us, dtype="int64")
+        sentiments = np.asarray(sentiments, dtype="float64")
+        weights    = np.ones(len(ts_us)) if weights is None else np.asarray(weights, dtype="float64")
+        if not len(ts_us):
+            return self
+        rows    = np.array([self._row(c, s) for c, s in zip(coins, sources)])
+        buckets = _bucket(ts_us)
+        self._fit(int(buckets.min()), int(buckets.max()))
+
+        keep = buckets >= self.base  # older than the retention window
+        rows, buckets, ts_us, s, w = rows[keep], buckets[keep] - self.base, ts_us[keep], sentiments[keep], weights[keep]
+        g    = np.exp2((ts_us / 1e6 - self.base * BUCKET_S) / (HALF_LIFE_H * 3600))
+        vals = np.stack([np.ones_like(w), w, w * s, w * g, w * g * s], axis=1)
+        for f in range(len(FIELDS)):
+            np.add.at(self.sums[:, f, :], (rows, buckets), vals[:, f])
+
+        if len(buckets):
+            # only prefixes from the oldest touched bucket on change – for the
+            # hourly append that is the current bucket plus the empty SLACK ones
+            first = int(buckets.min())
+            np.cumsum(self.sums[:, :, first:], axis=2, out=self.cum[:, :, first + 1:])
+            self.cum[:, :, first + 1:] += self.cum[:, :, first:first + 1]
+        return self
+
+    def merge(self, other):
+        """Add another aggregator's sums into this one (e.g. a shard worker's delta)."""
+        if other.base is None:
+            return self
+        rows = [self._row(c, s) for c, s in other.keys]
+        self._fit(other.base, other.head)
+        off  = other.base - self.base
+        lo, hi = max(0, -off), min(other.width, self.width - off)
+        if hi > lo:
+            part = other.sums[:, :, lo:hi].copy()
+            part[:, [_D, _DS]] *= 2.0 ** (off * BUCKET_S / (HALF_LIFE_H * 3600))  # onto our decay base
+            self.sums[rows, :, off + lo:off + hi] += part
+            self._refresh()
+        return self
+
+    def add(self, ts_us, coin, source, sentiment, weight=1.0):
+        return self.add_many([ts_us], [coin], [source], [sentiment], [weight])
+
+    def add_batch(self, batch):
+        """Fold in a records.SentimentBatch (uses its posted/weight columns)."""
+        return self.add_many(
+            batch.codes("posted"),
+            [coin_name(c) for c in batch.coin],
+            [Source(s) for s in batch.source],
+            batch.codes("sentiment"),
+            batch.codes("weight"),
+        )
+
+    # -- queries --
+    def _window(self, hours, now):
+        """Per-series field totals over the last `hours` buckets up to and including now's."""
+        if self.base is None:
+            return np.zeros((len(self.keys), len(FIELDS)))
+        hi = int(_bucket(now if now is not None else now_us())) + 1 - self.base
+        lo = hi - math.ceil(hours)
+        hi, lo = min(max(hi, 0), self.width), min(max(lo, 0), self.width)
+        return self.cum[:, :, hi] - self.cum[:, :, lo]
+
+    def bucket_totals(self, bucket):
+        """Per-series field sums of one absolute hour bucket (zeros outside the kept range)."""
+        col = -1 if self.base is None else bucket - self.base
+        if not 0 <= col < self.width:
+            return np.zeros((len(self.keys), len(FIELDS)))
+        return self.sums[:, :, col]
+
+    def summary(self, hours, now=None, decay=True, by_source=False):
+        """
+        DataFrame of weighted means over the last `hours` hour buckets (the
+        current, partial one included): Coin[, Source], Sentiment, Samples, Weight.
+        `now` is epoch µs (default: now).
+        """
+        tot  = self._window(hours, now)
+        keys = list(self.keys)
+        df   = pd.DataFrame(tot, columns=FIELDS)
+        df["Coin"]   = [c for c, _ in keys]
+        df["Source"] = [SOURCE_LABELS[s] for _, s in keys]
+        df = df.groupby(["Coin", "Source"] if by_source else ["Coin"], sort=False)[list(FIELDS)].sum().reset_index()
+        df = df[df["N"] > 0]
+        num, den = (df["DS"], df["D"]) if decay else (df["WS"], df["W"])
+        return pd.DataFrame({
+            **{c: df[c] for c in (["Coin", "Source"] if by_source else ["Coin"])},
+            "Sentiment": np.where(den > 0, num / den.where(den > 0, 1), 0.0),
+            "Samples":   df["N"].astype("int64"),
+            "Weight":    df["W"],
+        }).reset_index(drop=True)
+
+    def mean(self, coin, hours, now=None, source=None, decay=True):
+        """Weighted mean for one coin (optionally one source) over the last `hours`; None if no data."""
+        rows = [r for (c, s), r in self.keys.items() if c == coin and (source is None or s == Source(source))]
+        if not rows:
+            return None
+        tot = self._window(hours, now)[rows].sum(axis=0)
+        den = tot[_D] if decay else tot[_W]
+        return float((tot[_DS] if decay else tot[_WS]) / den) if tot[_N] and den > 0 else None
+
+    def means(self, hours, now=None, decay=True):
+        """{coin: weighted mean} over the last `hours`, for coins with data."""
+        df = self.summary(hours, now, decay)
+        return dict(zip(df["Coin"], df["Sentiment"].astype(float)))
+
+    # -- persistence --
+    def to_dict(self):
+        return {
+            "base":   self.base,
+            "head":   self.head,
+            "bucket_s": BUCKET_S,
+            "half_life_h": HALF_LIFE_H,
+            "keys":   [[c, SOURCE_LABELS[s]] for c, s in self.keys],
+            "sums":   self.sums.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        if not data or not data.get("keys") or data.get("bucket_s", BUCKET_S) != BUCKET_S:
+            return agg
+        labels = {v: k for k, v in SOURCE_LABELS.items()}
+        agg.base = int(data["base"])
+        agg.head = int(data.get("head", agg.base))
+        agg.keys = {(c, labels[s]): i for i, (c, s) in enumerate(data["keys"])}
+        agg.sums = np.asarray(data["sums"], dtype="float64").reshape(len(agg.keys), len(FIELDS), -1)
+        if data.get("half_life_h", HALF_LIFE_H) != HALF_LIFE_H:
+            # decay sums were built for another half-life: undecayed until they age out
+            agg.sums[:, [_D, _DS]] = agg.sums[:, [_W, _WS]]
+        agg._refresh()
+        return agg
+
+def load(path=STATE_JSON):
+    return Aggregator.from_dict(storage.read_json(path, default={}))
+
+@contextmanager
+def update(path=STATE_JSON):
+    """Locked read-modify-write of the persisted aggregator."""
+    with storage.update_json(path, default={}, backup=True) as data:
+        agg = Aggregator.from_dict(data)
+        yield agg
+        data.clear()
+        data.update(agg.to_dict())
+
+def record(batch, path=STATE_JSON):
+    """Fold a SentimentBatch into the persisted state; returns the updated Aggregator."""
+    with update(path) as agg:
+        agg.add_batch(batch)
+    return agg
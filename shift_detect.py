@@ -0,0 +1,163 @@
+# shift_detect.py
+"""
+Online sentiment-shift and volume detection on the streaming aggregate.
+
+For every (coin, source) series in sentiment_agg, each hour bucket gives
+one observation of weighted mean sentiment and one of mention volume
+(ln(1 + documents)). Per series we keep EWMA estimates of mean and
+variance and standardise each observation against them:
+
+  • sentiment – two-sided CUSUM on the z-scores: S⁺ = max(0, S⁺ + z − K),
+                S⁻ = max(0, S⁻ − z − K); a shift is flagged when either
+                exceeds H (and both restart)
+  • volume    – a spike when z ≥ VOLUME_Z
+
+plus, per coin, a flip of the Buy / Sell / Hold action of the weighted
+signal. All of it is O(1) per new bucket: closed buckets are folded into
+the state once (shift_state.json keeps the last one per series), and the
+current, still-filling bucket is checked provisionally on every run
+without being committed, so a shift alerts in the run that sees it rather
+than an hour later. An event fires once per series, kind and bucket.
+
+    events = shift_detect.update(agg, now_us, signal)   # after agg.merge(...)
+    if events: send_telegram_message(shift_detect.format_events(events))
+"""
+
+import os
+import math
+
+import storage
+import sentiment_agg
+from records import SOURCE_LABELS, ACTION_LABELS, Action, action_for, now_us
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+STATE_JSON  = os.path.join(BASE_DIR, "shift_state.json")
+ALPHA       = 0.1    # EWMA weight of the newest bucket (~10 bucket memory)
+WARMUP      = 12     # buckets learned before a series may alert
+MIN_DOCS    = 3      # documents a bucket needs for a sentiment observation
+CUSUM_K     = 0.5    # slack, in standard deviations
+CUSUM_H     = 5.0    # decision threshold, in standard deviations
+VOLUME_Z    = 4.0
+MIN_SD      = {"sent": 0.05, "vol": 0.25}  # floors so a flat series doesn't alert on noise
+BUCKET_US   = sentiment_agg.BUCKET_S * 1_000_000
+
+_N, _W, _WS = (sentiment_agg.FIELDS.index(f) for f in ("N", "W", "WS"))
+
+# ─── EWMA / CUSUM ───────────────────────────────────────────────────────────
+def _z(est, x, kind):
+    if est["n"] < WARMUP:
+        return 0.0
+    return (x - est["mean"]) / max(math.sqrt(est["var"]), MIN_SD[kind])
+
+def _learn(est, x):
+    if not est["n"]:
+        est["mean"], est["var"] = x, 0.0
+    else:
+        d = x - est["mean"]
+        est["mean"] += ALPHA * d
+        est["var"]   = (1 - ALPHA) * (est["var"] + ALPHA * d * d)
+    est["n"] += 1
+
+def _new_series(bucket):
+    return {
+        "bucket":  bucket,                           # last bucket folded in
+        "sent":    {"mean": 0.0, "var": 0.0, "n": 0},
+        "vol":     {"mean": 0.0, "var": 0.0, "n": 0},
+        "pos":     0.0,
+        "neg":     0.0,
+        "alerted": {},                               # kind -> last bucket it fired for
+    }
+
+def _observe(st, bucket, totals, commit):
+    """
+    One bucket of one series → events (kind, direction, value, z). With
+    commit=False (the current, partial bucket) the state is left untouched.
+    """
+    events = []
+    n   = float(totals[_N])
+    vol = math.log1p(n)
+    zv  = _z(st["vol"], vol, "vol")
+    if zv >= VOLUME_Z:
+        events.append(("volume", "up", n, zv))
+
+    pos, neg = st["pos"], st["neg"]
+    if n >= MIN_DOCS and totals[_W] > 0:
+        s  = float(totals[_WS] / totals[_W])
+        zs = _z(st["sent"], s, "sent")
+        pos, neg = max(0.0, pos + zs - CUSUM_K), max(0.0, neg - zs - CUSUM_K)
+        if pos > CUSUM_H or neg > CUSUM_H:
+            events.append(("shift", "up" if pos > CUSUM_H else "down", s, zs))
+            pos = neg = 0.0
+        if commit:
+            _learn(st["sent"], s)
+
+    if commit:
+        # a partial bucket only ever under-counts, so it's learned once closed
+        _learn(st["vol"], vol)
+        st["pos"], st["neg"], st["bucket"] = pos, neg, bucket
+
+    fresh = [e for e in events if st["alerted"].get(e[0]) != bucket]
+    for kind, *_ in fresh:
+        st["alerted"][kind] = bucket
+    return fresh
+
+# ─── DETECTION ──────────────────────────────────────────────────────────────
+def detect(state, agg, now=None, signal=None):
+    """
+    Advance `state` (a dict, persisted by update()) to the aggregator's
+    buckets up to `now` (epoch µs) and return new events. `signal` is the
+    {coin: weighted mean} the predictions use; its action flips are events too.
+    """
+    now     = now if now is not None else now_us()
+    current = int(now // BUCKET_US)
+    series  = state.setdefault("series", {})
+    events  = []
+    if agg.base is not None:
+        cols = {}
+        for (coin, source), row in agg.keys.items():
+            st = series.setdefault(f"{coin}|{SOURCE_LABELS[source]}", _new_series(agg.base - 1))
+            # closed buckets not folded in yet (empty ones count as zero volume); a new
+            # series warms up on everything the aggregator holds, but only events
+            # from the last closed bucket on are still news
+            for b in range(max(st["bucket"] + 1, agg.base), current):
+                if b not in cols:
+                    cols[b] = agg.bucket_totals(b)
+                found = _observe(st, b, cols[b][row], commit=True)
+                if b >= current - 1:
+                    events += [_event(coin, source, b, *e) for e in found]
+            if current not in cols:
+                cols[current] = agg.bucket_totals(current)
+            events += [_event(coin, source, current, *e) for e in _observe(st, current, cols[current][row], commit=False)]
+
+    actions = state.setdefault("actions", {})
+    for coin, avg in (signal or {}).items():
+        act = action_for(avg)
+        if coin in actions and actions[coin] != int(act):
+            events.append({"coin": coin, "source": None, "bucket": current, "kind": "flip",
+                           "direction": f"{Action(actions[coin]).name}→{act.name}", "value": float(avg), "z": None})
+        actions[coin] = int(act)
+    return events
+
+def _event(coin, source, bucket, kind, direction, value, z):
+    return {"coin": coin, "source": SOURCE_LABELS[source], "bucket": bucket, "kind": kind,
+            "direction": direction, "value": round(float(value), 4), "z": round(float(z), 2)}
+
+def update(agg, now=None, signal=None, path=STATE_JSON):
+    """Locked detect() against the persisted state; returns the new events."""
+    with storage.update_json(path, default={}, backup=False) as state:
+        return detect(state, agg, now, signal)
+
+# ─── ALERT TEXT ─────────────────────────────────────────────────────────────
+def format_events(events):
+    lines = ["🚨 Sentiment Shift"]
+    for e in events:
+        if e["kind"] == "flip":
+            old, new = (Action[a] for a in e["direction"].split("→"))
+            lines.append(f"{e['coin']}: {ACTION_LABELS[old]} → {ACTION_LABELS[new]} ({e['value']:+.2f})")
+        elif e["kind"] == "shift":
+            arrow = "↑" if e["direction"] == "up" else "↓"
+            lines.append(f"{e['coin']} · {e['source']}: sentiment {arrow} {e['value']:+.2f} (z {e['z']:+.1f})")
+        else:
+            lines.append(f"{e['coin']} · {e['source']}: {int(e['value'])} mentions this hour (z {e['z']:+.1f})")
+    return "\n".join(lines)
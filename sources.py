@@ -0,0 +1,256 @@
+# sources.py
+"""
+Source adapters: every ingest source yields records.Document items lazily
+from an async generator,
+
+    async for doc in adapter.documents(coins):   # doc.id, .ts, .coins, .text, .source, .engagement
+        ...
+
+and stream() consumes several adapters concurrently through one bounded
+queue, so a fast source blocks (backpressure) instead of piling up
+documents in memory while the consumer is busy scoring.
+
+The underlying clients (praw, feedparser, requests, snscrape) are blocking;
+_threaded() runs each one in its own thread and hands items over one at a
+time through a small queue, so the thread stalls as soon as the consumer
+falls behind and stops when the consumer closes the generator (that is
+what lets the snscrape subprocess be terminated early).
+
+Adapters: RedditAdapter, RssAdapter (one per feed), PushshiftAdapter and
+TwitterAdapter (snscrape or the v2 API; enabled with SAE_TWITTER).
+"""
+
+import os
+import asyncio
+import threading
+import concurrent.futures
+from contextlib import aclosing
+from datetime import datetime, timezone
+
+import coin_registry
+from records import Document, Source, coin_code, epoch_us, now_us
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+QUEUE_SIZE       = 64     # documents buffered between producers and the consumer
+REDDIT_SUBREDDIT = "CryptoCurrency"
+REDDIT_LIMIT     = int(os.getenv("SAE_REDDIT_LIMIT", "50")) or None    # 0 = whole listing (~1000)
+TWITTER_MODE     = os.getenv("SAE_TWITTER", "")  # "", "snscrape" or "api"
+TWITTER_LIMIT    = int(os.getenv("SAE_TWITTER_LIMIT", "50")) or None   # 0 = no limit
+
+_DONE = object()
+
+# ─── THREAD BRIDGE ──────────────────────────────────────────────────────────
+async def _threaded(make_iter, maxsize=1):
+    """Async-iterate a blocking iterator produced by make_iter() in a daemon thread."""
+    loop  = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize)
+    stop  = threading.Event()
+
+    def put(item):
+        if stop.is_set() or loop.is_closed():
+            return False
+        coro = queue.put(item)
+        try:
+            fut = asyncio.run_coroutine_threadsafe(coro, loop)
+        except RuntimeError:  # event loop closed meanwhile
+            coro.close()
+            return False
+        while not stop.is_set():
+            try:
+                fut.result(timeout=0.2)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        fut.cancel()
+        return False
+
+    def pump():
+        it = None
+        try:
+            it = iter(make_iter())
+            for item in it:
+                if not put(item):
+                    break
+        except Exception as e:  # surfaced in the consumer
+            put(e)
+        finally:
+            if hasattr(it, "close"):
+                it.close()
+            put(_DONE)
+
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def _mentions(text, coins):
+    return tuple(coin_code(c) for c in coins if coin_registry.mentions(c, text))
+
+# ─── ADAPTERS ───────────────────────────────────────────────────────────────
+class SourceAdapter:
+    """Base class: subclasses implement documents(coins) as an async generator."""
+    name   = "source"
+    source = None
+
+    async def documents(self, coins):
+        raise NotImplementedError
+        yield  # pragma: no cover – makes this an async generator
+
+class RedditAdapter(SourceAdapter):
+    name   = "reddit"
+    source = Source.REDDIT
+
+    def __init__(self, subreddit=REDDIT_SUBREDDIT, limit=REDDIT_LIMIT):
+        self.subreddit = subreddit
+        self.limit     = limit  # None = everything the listing will give
+
+    async def documents(self, coins):
+        from reddit_fetch import reddit  # praw client, created on import
+
+        def listing():
+            return reddit.subreddit(self.subreddit).new(limit=self.limit)
+
+        async with aclosing(_threaded(listing)) as subs:
+            async for sub in subs:
+                text = f"{sub.title}\n\n{sub.selftext}"
+                hits = _mentions(text, coins)
+                if hits:
+                    yield Document(f"reddit:{sub.id}", epoch_us(sub.created_utc), hits, text, self.source,
+                                   sub.score + sub.num_comments)
+
+class RssAdapter(SourceAdapter):
+    name   = "rss"
+    source = Source.NEWS
+
+    def __init__(self, url):
+        self.url  = url
+        self.name = f"rss:{url}"
+
+    async def documents(self, coins):
+        import feedparser
+
+        async with aclosing(_threaded(lambda: feedparser.parse(self.url).entries)) as entries:
+            async for entry in entries:
+                hits = _mentions(entry.title, coins)  # headline match, as rss_fetch always did
+                if not hits:
+                    continue
+                parsed = entry.get("published_parsed")
+                ts     = epoch_us(datetime(*parsed[:6], tzinfo=timezone.utc)) if parsed else now_us()
+                text   = f"{entry.title}. {entry.get('summary', '')}"
+                yield Document(entry.get("id") or entry.link, ts, hits, text, self.source)
+
+class PushshiftAdapter(SourceAdapter):
+    """Historical Reddit submissions in [after, before) (unix seconds), paged oldest → newest."""
+    name   = "pushshift"
+    source = Source.PUSHSHIFT
+    URL    = "https://api.pushshift.io/reddit/search/submission"
+
+    def __init__(self, after, before, subreddit=REDDIT_SUBREDDIT, page_size=500):
+        self.after, self.before = after, before
+        self.subreddit, self.page_size = subreddit, page_size
+
+    def _pages(self, coins):
+        import requests
+        after = self.after
+        query = "|".join(coins)
+        while after < self.before:
+            resp = requests.get(self.URL, params={
+                "subreddit": self.subreddit, "q": query, "after": after,
+                "before": self.before, "size": self.page_size, "sort": "asc",
+            }, headers={"User-Agent": "sae-sources"}, timeout=20)
+            resp.raise_for_status()
+            data = resp.json().get("data", [])
+            yield from data
+            if len(data) < self.page_size:
+                return
+            after = int(data[-1]["created_utc"]) + 1
+
+    async def documents(self, coins):
+        async with aclosing(_threaded(lambda: self._pages(coins))) as items:
+            async for item in items:
+                text = item.get("selftext") or item.get("title") or ""
+                hits = _mentions(text, coins)
+                if hits:
+                    yield Document(f"reddit:{item.get('id')}", epoch_us(item.get("created_utc", 0)), hits, text, self.source,
+                                   (item.get("score") or 0) + (item.get("num_comments") or 0))
+
+class TwitterAdapter(SourceAdapter):
+    name   = "twitter"
+    source = Source.TWITTER
+
+    def __init__(self, mode=TWITTER_MODE or "snscrape", limit=TWITTER_LIMIT):
+        self.mode, self.limit = mode, limit
+
+    def _tweets(self, coins):
+        query = "(" + " OR ".join(coins) + ") lang:en"
+        if self.mode == "api":
+            from twitter_api_fetch import fetch_tweets
+            for t in fetch_tweets(query, min(max(self.limit or 100, 10), 100)):
+                m = t.public_metrics or {}
+                yield str(t.id), t.created_at, t.text, m.get("like_count", 0) + m.get("retweet_count", 0)
+        else:
+            from twitter_fetch import iter_tweets  # reads snscrape line by line, stops at limit
+            for t in iter_tweets(query, self.limit):
+                yield (str(t.get("id")), datetime.fromisoformat(t["date"]), t.get("rawContent") or t.get("content", ""),
+                       (t.get("likeCount") or 0) + (t.get("retweetCount") or 0))
+
+    async def documents(self, coins):
+        async with aclosing(_threaded(lambda: self._tweets(coins))) as tweets:
+            async for tid, created, text, engagement in tweets:
+                hits = _mentions(text, coins)
+                if hits:
+                    yield Document(f"twitter:{tid}", epoch_us(created) if created else now_us(), hits, text, self.source,
+                                   engagement)
+
+def default_adapters():
+    """The live ingest sources: Reddit, each RSS feed, plus Twitter if SAE_TWITTER is set."""
+    from rss_fetch import FEED_URLS
+    adapters = [RedditAdapter()] + [RssAdapter(url) for url in FEED_URLS]
+    if TWITTER_MODE:
+        adapters.append(TwitterAdapter(TWITTER_MODE))
+    return adapters
+
+# ─── CONCURRENT CONSUMPTION ─────────────────────────────────────────────────
+async def stream(adapters, coins, maxsize=QUEUE_SIZE):
+    """
+    Interleave documents from all adapters as they arrive. A failing adapter
+    is reported and skipped; closing this generator stops every producer.
+    """
+    queue = asyncio.Queue(maxsize)
+
+    async def produce(adapter):
+        try:
+            async with aclosing(adapter.documents(coins)) as docs:
+                async for doc in docs:
+                    await queue.put(doc)
+        except Exception as e:
+            print(f"⚠️ Source {adapter.name} failed: {e}")
+        await queue.put(_DONE)
+
+    tasks     = [asyncio.create_task(produce(a)) for a in adapters]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            doc = await queue.get()
+            if doc is _DONE:
+                remaining -= 1
+                continue
+            yield doc
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def collect(adapters, coins, maxsize=QUEUE_SIZE):
+    """Blocking helper: every document from `adapters` as a list."""
+    async def run():
+        async with aclosing(stream(adapters, coins, maxsize)) as docs:
+            return [doc async for doc in docs]
+    return asyncio.run(run())
@@ -0,0 +1,239 @@
+# storage.py
+"""
+Crash- and concurrency-safe writes for the shared state files
+(prediction_log.json, sentiment_*.csv, latest_prices.csv, rollups, ...).
+
+  • atomic_write / write_json / write_csv – write to a temp file in the same
+    directory, fsync, then os.replace() over the target, so readers only ever
+    see the old file or the complete new one, never a truncated one
+  • file_lock – advisory exclusive lock (flock on POSIX, msvcrt on Windows)
+    on "<path>.lock", for read-modify-write cycles across processes
+  • update_json – lock + read + yield + atomic write in one step
+  • read_json – never silently turns a damaged file into {}: it falls back to
+    the last good "<path>.bak", or moves the damaged file aside first
+
+fsync policy comes from SAE_FSYNC: "full" (file + directory), "file"
+(default, file only) or "none".
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import stat
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+FSYNC_POLICY  = os.getenv("SAE_FSYNC", "file")
+LOCK_TIMEOUT  = 60    # seconds to wait for a lock before giving up
+LOCK_POLL     = 0.05
+_UMASK        = None  # read once by _umask()
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ─── LOCKING ────────────────────────────────────────────────────────────────
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT):
+    """Hold an exclusive advisory lock for `path` (via "<path>.lock")."""
+    lock_path = f"{path}.lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {path}")
+                time.sleep(LOCK_POLL)
+        yield
+    finally:
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        os.close(fd)
+
+# ─── ATOMIC WRITES ──────────────────────────────────────────────────────────
+def _fsync_dir(directory):
+    if FSYNC_POLICY != "full" or os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _umask():
+    """
+    The process umask. os.umask() can only read it by setting it, which would
+    hand files other threads create meanwhile a 0o000 umask – so read it from
+    /proc, or off the mode of a freshly created probe file.
+    """
+    global _UMASK
+    if _UMASK is None:
+        try:
+            with open("/proc/self/status", encoding="ascii") as f:
+                _UMASK = next(int(line.split()[1], 8) for line in f if line.startswith("Umask:"))
+        except (OSError, StopIteration, ValueError, IndexError):
+            probe = os.path.join(tempfile.gettempdir(), f".umask-{os.getpid()}-{time.monotonic_ns()}")
+            os.close(os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            try:
+                _UMASK = 0o666 & ~stat.S_IMODE(os.stat(probe).st_mode)
+            finally:
+                os.remove(probe)
+    return _UMASK
+
+def _target_mode(path):
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+@contextmanager
+def atomic_write(path, mode="w", encoding="utf-8", newline=None):
+    """Yield a temp file; on clean exit it atomically replaces `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        kwargs = {} if "b" in mode else {"encoding": encoding, "newline": newline}
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            if FSYNC_POLICY in ("file", "full"):
+                os.fsync(f.fileno())
+        # mkstemp creates 0600; keep the target's mode (or the umask default for a new file)
+        # so other users – dashboard, cron – can still read the shared files
+        os.chmod(tmp, _target_mode(path))
+        os.replace(tmp, path)
+        _fsync_dir(directory)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def write_json(obj, path, backup=False, **dump_kwargs):
+    """Atomically write JSON; with backup=True keep the previous version as "<path>.bak"."""
+    dump_kwargs.setdefault("indent", 2)
+    if backup and os.path.exists(path):
+        shutil.copy2(path, f"{path}.bak")
+    with atomic_write(path) as f:
+        json.dump(obj, f, **dump_kwargs)
+
+def write_csv(df, path, **to_csv_kwargs):
+    """Atomically write a DataFrame as CSV."""
+    to_csv_kwargs.setdefault("index", False)
+    with atomic_write(path, newline="") as f:
+        df.to_csv(f, **to_csv_kwargs)
+
+def append_csv(df, path):
+    """
+    Locked in-place append of DataFrame rows (header only for a new file).
+    Columns follow the existing header, so streaming writers can append one
+    micro-batch at a time without rewriting the file.
+
+    Not atomic: a crash mid-append can leave a partial last line. Readers
+    stop at the last newline (read_csv_range), and the next append cuts
+    the partial line off before writing.
+    """
+    with file_lock(path):
+        header = None
+        if os.path.exists(path) and os.path.getsize(path):
+            end = complete_size(path)
+            if end < os.path.getsize(path):
+                print(f"⚠️ {path}: dropping a partial last line left by an interrupted append")
+                os.truncate(path, end)
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), None)
+        if header:
+            df = df.reindex(columns=header)
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False, header=not header)
+            f.flush()
+            if FSYNC_POLICY in ("file", "full"):
+                os.fsync(f.fileno())
+
+# ─── READS ──────────────────────────────────────────────────────────────────
+def complete_size(path, block=1 << 16):
+    """Bytes of `path` up to and including its last newline – the part no append is still writing."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(block, pos)
+            f.seek(pos - step)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                return pos - step + i + 1
+            pos -= step
+    return 0
+
+def read_csv_range(path, start=0, **read_csv_kwargs):
+    """
+    (DataFrame, end): the complete lines of an appended CSV from byte offset
+    `start` on (0 = everything; else an `end` returned earlier), parsed with
+    the file's header. A partial last line is left for the next read.
+    """
+    import pandas as pd
+
+    end = complete_size(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        if end < len(header) or not header.endswith(b"\n"):
+            return pd.DataFrame(), 0
+        start = max(start, len(header))
+        f.seek(start)
+        body = f.read(max(end - start, 0))
+    return pd.read_csv(io.BytesIO(header + body), **read_csv_kwargs), max(end, start)
+
+def read_json(path, default=None):
+    """
+    Load JSON from `path`. Missing file → `default`. A damaged file is never
+    silently replaced by `default`: the last good .bak is used if there is
+    one, otherwise the damaged file is moved to "<path>.corrupt-<ts>" first.
+    """
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        bak = f"{path}.bak"
+        if os.path.exists(bak):
+            try:
+                with open(bak, "r", encoding="utf-8") as f:
+                    print(f"⚠️ {path} is damaged ({e}); using {bak}")
+                    return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        aside = f"{path}.corrupt-{int(time.time())}"
+        os.replace(path, aside)
+        print(f"⚠️ {path} is damaged ({e}); moved to {aside}")
+        return default
+
+@contextmanager
+def update_json(path, default=None, backup=True):
+    """
+    Locked read-modify-write:
+
+        with storage.update_json("prediction_log.json", {}) as log:
+            log["Bitcoin"].insert(0, entry)
+    """
+    with file_lock(path):
+        obj = read_json(path, default)
+        yield obj
+        write_json(obj, path, backup=backup)
@@ -1,8 +1,13 @@
 # file: sync_form_to_csv.py
 import gspread
+from gspread.utils import rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 import datetime
+import os
+import shutil
+
+import storage
 
 # Setup
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -12,15 +17,40 @@ client = gspread.authorize(creds)
 # Open the sheet by its unique key
 sheet = client.open_by_key("1lrgVd6-nq9OkTiDo8v2wLrJYcLGgJwJLIDIKXZ_njc0").sheet1
 
+OUT_CSV    = "clients.csv"
+STATE_JSON = "sheet_sync_state.json"  # last sheet row already copied into OUT_CSV
+CHUNK_ROWS = 500
 
+# Pull only rows added since the last sync, CHUNK_ROWS at a time
+state = storage.read_json(STATE_JSON, default={}) if os.path.exists(OUT_CSV) else {}
+header = sheet.row_values(1)
+last_col = rowcol_to_a1(1, len(header)).rstrip("0123456789")
+first_row = next_row = state.get("last_row", 1) + 1
+synced_at = datetime.datetime.now()
+chunks = []
 
-# Pull data
-records = sheet.get_all_records()
-df = pd.DataFrame(records)
+while True:
+    values = sheet.get(f"A{next_row}:{last_col}{next_row + CHUNK_ROWS - 1}")
+    if not values:
+        break
+    chunk = pd.DataFrame([row + [""] * (len(header) - len(row)) for row in values], columns=header)
+    # Optional: add timestamp column
+    chunk['Synced At'] = synced_at
+    chunks.append(chunk)
+    next_row += len(values)
+    if len(values) < CHUNK_ROWS:
+        break
 
-# Optional: add timestamp column
-df['Synced At'] = datetime.datetime.now()
+# Old rows + new chunks go to a temp file that replaces OUT_CSV in one step, so
+# readers never see a half-written chunk; the state only moves once it has.
+added = next_row - first_row
+if chunks:
+    with storage.atomic_write(OUT_CSV, newline="") as f:
+        if first_row > 2:
+            with open(OUT_CSV, "r", encoding="utf-8", newline="") as old:
+                shutil.copyfileobj(old, f)
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=first_row == 2 and i == 0, index=False)
+    storage.write_json({"last_row": next_row - 1}, STATE_JSON)
 
-# Group or sort if needed (we’ll adjust based on your form structure)
-df.to_csv("clients.csv", index=False)
-print("Google Form responses synced to clients.csv")
+print(f"Google Form responses synced to {OUT_CSV} (+{added} new rows)")
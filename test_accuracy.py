@@ -0,0 +1,136 @@
+# test_accuracy.py
+"""accuracy's per-prediction scores and the incremental rolling state."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import accuracy
+
+NOW = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def _resolved(n=200, seed=5, coins=("Bitcoin", "Ethereum")):
+    """Predictions spread over the last 40 days, a few % off the actual, with the price an hour before."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        actual = 100 * (1 + rng.normal(0, 0.05))
+        out.append({
+            "coin":      coins[i % len(coins)],
+            "timestamp": (NOW - timedelta(hours=int(rng.integers(1, 40 * 24)))).isoformat(),
+            "predicted": round(actual * (1 + rng.normal(0.01, 0.04)), 4),
+            "actual":    round(actual, 4),
+            "base":      round(actual * (1 + rng.normal(0, 0.02)), 4),
+        })
+    return out
+
+
+def _direct(rows, hours=None):
+    """The summary computed straight from the rows, for comparing with the incremental state."""
+    df = pd.DataFrame(rows)
+    if hours is not None:
+        ts     = pd.to_datetime(df.timestamp, utc=True)
+        bucket = (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(hours=1)
+        df     = df[bucket > int(NOW.timestamp()) // 3600 - hours]
+    s = accuracy.score(df.predicted, df.actual, df.base)
+    return {"n": len(s), "mape": s.ErrPct.mean(), "hit_rate": s.Hit.mean(),
+            "bias": s.BiasPct.mean(), "directional": s.DirectionHit.mean()}
+
+
+def test_score_per_prediction():
+    s = accuracy.score([105, 90, 100, 50], [100, 100, 100, 0], [95, 95, 100, 10])
+    assert s.ErrPct.tolist()[:3] == pytest.approx([5.0, 10.0, 0.0])
+    assert s.BiasPct.tolist()[:3] == pytest.approx([5.0, -10.0, 0.0])
+    assert s.Hit.tolist()[:3] == [0.0, 0.0, 1.0]         # TOL_PCT is 4
+    assert s.DirectionHit.tolist()[:2] == [1.0, 0.0]      # up/up, down/up
+    assert np.isnan(s.DirectionHit[2])                    # no move: no direction to get right
+    assert s.iloc[3].isna().all()                         # missing actual
+
+
+def test_incremental_record_matches_a_direct_score(tmp_path):
+    path = str(tmp_path / "accuracy.json")
+    rows = _resolved()
+    for start in range(0, len(rows), 37):  # resolved a few at a time, run after run
+        summary = accuracy.record(rows[start:start + 37], path, now=NOW)
+
+    for coin in ("Bitcoin", "Ethereum"):
+        mine = [r for r in rows if r["coin"] == coin]
+        for window, hours in [*accuracy.WINDOWS_H.items(), ("all", None)]:
+            want, got = _direct(mine, hours), summary[coin][window]
+            assert got["n"] == want["n"]
+            for key in ("mape", "hit_rate", "bias", "directional"):
+                assert got[key] == pytest.approx(want[key], abs=1e-4), (coin, window, key)
+
+
+def test_rebuild_from_the_log_equals_the_incremental_state(tmp_path):
+    rows = _resolved(60)
+    log  = {}
+    for r in rows:
+        log.setdefault(r["coin"], []).append({"timestamp": r["timestamp"], "predicted": r["predicted"],
+                                              "actual": r["actual"], "current": r["base"]})
+    log["Bitcoin"].append({"timestamp": NOW.isoformat(), "predicted": 1.0})                            # still open
+    log["Bitcoin"].append({"timestamp": NOW.isoformat(), "predicted": 1.0, "actual": 2.0, "horizon_h": 24})  # other horizon
+    log_path = tmp_path / "prediction_log.json"
+    log_path.write_text(json.dumps(log))
+
+    incremental = accuracy.record(rows, str(tmp_path / "incremental.json"), now=NOW)
+    rebuilt     = accuracy.rebuild(str(log_path), str(tmp_path / "accuracy.json"), now=NOW)
+    assert rebuilt == incremental
+    assert accuracy.rebuild(str(log_path), str(tmp_path / "acc_24h.json"), now=NOW, horizon=24)["Bitcoin"]["all"]["n"] == 1
+
+
+def test_old_buckets_are_pruned_but_all_time_totals_stay(tmp_path):
+    path = str(tmp_path / "accuracy.json")
+    accuracy.record(_resolved(100), path, now=NOW)
+    later = accuracy.record([], path, now=NOW + timedelta(days=60))
+    state = json.loads((tmp_path / "accuracy.json").read_text())
+
+    assert all(not c["buckets"] for c in state["coins"].values())
+    assert later["Bitcoin"]["30d"]["n"] == 0 and later["Bitcoin"]["30d"]["mape"] is None
+    assert later["Bitcoin"]["all"]["n"] == 50
+
+
+def test_summary_frame_and_horizon_paths(tmp_path):
+    path = str(tmp_path / "accuracy.json")
+    accuracy.record(_resolved(40), path, now=NOW)
+    frame = accuracy.summary_frame("7d", path, str(tmp_path / "no_log.json"))
+    assert sorted(frame.Coin) == ["Bitcoin", "Ethereum"]
+    assert frame.MAPE.dtype == "float64"
+    assert accuracy.state_path(1, path) == path
+    assert accuracy.state_path(24, path) == str(tmp_path / "accuracy_24h.json")
+
+
+def test_a_failed_record_leaves_the_predictions_open(tmp_path, monkeypatch):
+    pytest.importorskip("praw")
+    pytest.importorskip("textblob")
+    import analyze
+    import history_store
+
+    now = datetime.utcnow()
+    log = tmp_path / "prediction_log.json"
+    log.write_text(json.dumps({"Bitcoin": [{"timestamp": (now - timedelta(hours=3)).isoformat(), "predicted": 100.0, "current": 99.0}]}))
+    hist = str(tmp_path / "sentiment_history.csv")
+    history_store.append(hist, pd.DataFrame({
+        "Timestamp": [(now - timedelta(hours=1)).isoformat(timespec="seconds")], "Coin": ["Bitcoin"], "Source": ["News"],
+        "Sentiment": [0.1], "PriceUSD": [101.0], "SuggestedAction": ["Hold"],
+    }))
+    monkeypatch.setattr(analyze, "PRED_LOG_JSON", str(log))
+    monkeypatch.setattr(analyze, "HIST_CSV", hist)
+    monkeypatch.setattr(analyze, "ACCURACY_JSON", str(tmp_path / "accuracy.json"))
+
+    record = accuracy.record
+    def crash(*args, **kwargs):
+        raise RuntimeError("killed between resolving and recording")
+    monkeypatch.setattr(accuracy, "record", crash)
+    with pytest.raises(RuntimeError):
+        analyze.update_predictions_with_actuals()
+    assert "actual" not in json.loads(log.read_text())["Bitcoin"][0]
+
+    monkeypatch.setattr(accuracy, "record", record)
+    analyze.update_predictions_with_actuals()
+    assert json.loads(log.read_text())["Bitcoin"][0]["actual"] == 101.0
+    assert accuracy.load_summary(str(tmp_path / "accuracy.json"))["Bitcoin"]["all"]["n"] == 1
@@ -0,0 +1,132 @@
+# test_auto_push.py
+"""The background publisher against a local bare repository (no network)."""
+
+import os
+import subprocess
+
+import pandas as pd
+import pytest
+
+import auto_push
+import storage
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def clone(remote, path):
+    git(os.path.dirname(path), "clone", "-q", remote, path)
+    git(path, "config", "user.email", "bot@example.com")
+    git(path, "config", "user.name", "bot")
+    return path
+
+
+def rows(*stamps):
+    return pd.DataFrame({"Timestamp": list(stamps), "Coin": "Bitcoin", "Source": "News",
+                         "Sentiment": 0.1, "PriceUSD": 100.0, "SuggestedAction": "Hold"})
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    remote = str(tmp_path / "remote.git")
+    git(tmp_path, "init", "-q", "--bare", remote)
+    work = clone(remote, str(tmp_path / "work"))
+    git(work, "commit", "-q", "--allow-empty", "-m", "init")
+    git(work, "push", "-q", "origin", "HEAD:main")
+    git(work, "fetch", "-q", "origin")
+
+    monkeypatch.setattr(auto_push, "REPO_DIR", work)
+    monkeypatch.setattr(auto_push, "PENDING_MARKER", os.path.join(work, ".publish_pending"))
+    monkeypatch.setattr(auto_push, "STATE_JSON", os.path.join(work, "publish_state.json"))
+    monkeypatch.setattr(auto_push, "DELTA_DIR", os.path.join(work, "published", "history"))
+    monkeypatch.setattr(auto_push, "HIST_CSV", os.path.join(work, "sentiment_history.csv"))
+    monkeypatch.setattr(auto_push, "SNAPSHOT_FILES", [])
+    monkeypatch.setattr(auto_push, "PUBLISH_BRANCH", "main")
+    monkeypatch.setattr(auto_push, "RETRY_BACKOFF_S", 0)
+    with open(os.path.join(work, ".gitignore"), "w") as f:
+        f.write("publish_state.json*\n.publish_pending\n*.lock\nsentiment_history.csv\n")
+    return remote, work
+
+
+def published(remote, tmp_path):
+    """All history rows the remote has received, in publish order."""
+    check = str(tmp_path / "check")
+    if os.path.exists(check):
+        git(check, "pull", "-q", "origin", "main")
+    else:
+        git(tmp_path, "clone", "-q", "--branch", "main", remote, check)
+    folder = os.path.join(check, "published", "history")
+    files  = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+    return pd.concat([pd.read_csv(os.path.join(folder, f)) for f in files], ignore_index=True) if files else pd.DataFrame()
+
+
+def test_publishes_appended_rows_including_older_stamps(repo, tmp_path):
+    remote, work = repo
+    storage.append_csv(rows("2025-01-01T10:00:00", "2025-01-01T11:00:00"), auto_push.HIST_CSV)
+    auto_push.request_publish()
+    assert auto_push.auto_push()
+    assert not os.path.exists(auto_push.PENDING_MARKER)
+    assert len(published(remote, tmp_path)) == 2
+
+    # a shard merge / late source appends a row stamped at or before the last publish
+    storage.append_csv(rows("2025-01-01T11:00:00", "2025-01-01T09:00:00", "2025-01-01T12:00:00"), auto_push.HIST_CSV)
+    auto_push.request_publish()
+    assert auto_push.auto_push()
+    assert len(published(remote, tmp_path)) == 5
+
+    auto_push.request_publish()
+    assert auto_push.auto_push()  # nothing new: no empty delta, nothing to push
+    assert len(published(remote, tmp_path)) == 5
+
+
+def test_rebases_onto_a_remote_that_moved(repo, tmp_path):
+    remote, work = repo
+    other = clone(remote, str(tmp_path / "other"))
+    git(other, "checkout", "-q", "main")
+    git(other, "commit", "-q", "--allow-empty", "-m", "someone else")
+    git(other, "push", "-q", "origin", "main")
+
+    storage.append_csv(rows("2025-01-01T10:00:00"), auto_push.HIST_CSV)
+    assert auto_push.auto_push(force=True)
+    log = git(remote, "log", "--format=%s", "main")
+    assert "someone else" in log and "publish pipeline output" in log.splitlines()[0]
+
+
+def test_failures_keep_the_marker_and_never_raise(repo, monkeypatch):
+    remote, work = repo
+    storage.append_csv(rows("2025-01-01T10:00:00"), auto_push.HIST_CSV)
+    auto_push.request_publish()
+
+    export = auto_push.export_history_delta
+    def broken(state, stamp):
+        raise ValueError("pyarrow blew up")
+    monkeypatch.setattr(auto_push, "export_history_delta", broken)
+    assert auto_push.auto_push() is False
+    assert os.path.exists(auto_push.PENDING_MARKER)
+
+    monkeypatch.setattr(auto_push, "export_history_delta", export)
+    git(work, "remote", "set-url", "origin", os.path.join(work, "missing.git"))
+    assert auto_push.auto_push() is False  # push fails
+    assert os.path.exists(auto_push.PENDING_MARKER)
+
+    git(work, "remote", "set-url", "origin", remote)
+    assert auto_push.auto_push()  # the commit left behind goes out next cycle
+    assert git(remote, "log", "-1", "--format=%s", "main").startswith("chore: publish pipeline output")
+
+
+def test_loop_survives_a_crashing_cycle(monkeypatch):
+    calls = []
+
+    def crash(force=False):
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    def stop_after_two(seconds):
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(auto_push, "auto_push", crash)
+    monkeypatch.setattr(auto_push.time, "sleep", stop_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        auto_push.run_forever(0)
+    assert len(calls) == 2
@@ -0,0 +1,131 @@
+# test_backtest.py
+"""The vectorised backtests against plain loops, and checks that no signal sees the future."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+
+T0 = datetime(2025, 1, 1)
+
+
+def _walk(coins=3, bars=500, seed=9):
+    rng     = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (coins, bars))
+    sent    = rng.normal(0, 0.2, (coins, bars))
+    sent[rng.random((coins, bars)) < 0.3] = np.nan  # hours without posts
+    return sent, returns
+
+
+def _loop_actions(sentiment, returns, buy, sell, fee, long_only=False):
+    """Bar by bar: decide at the end of hour t from what is known then, earn the move to t+1."""
+    coins, bars = sentiment.shape
+    pnl, pos = np.zeros(bars), np.zeros(coins)
+    for t in range(bars):
+        new = pos.copy()
+        for c in range(coins):
+            s = sentiment[c, t]
+            if s > buy:
+                new[c] = 1.0
+            elif s < -sell:
+                new[c] = 0.0 if long_only else -1.0
+        pnl[t] = (np.sum(new * returns[:, t]) - fee * np.abs(new - pos).sum()) / coins
+        pos = new
+    return pnl
+
+
+@pytest.mark.parametrize("long_only", [False, True])
+def test_action_grid_matches_a_bar_by_bar_loop(long_only):
+    sent, ret = _walk()
+    buy, sell, fees = np.array([0.05, 0.2]), np.array([0.1, 0.3]), np.array([0.0, 0.002])
+    grid = backtest.evaluate_actions(sent, ret, buy, sell, fees, long_only)
+    for i, b in enumerate(buy):
+        for j, s in enumerate(sell):
+            for k, f in enumerate(fees):
+                want = backtest._metrics(_loop_actions(sent, ret, b, s, f, long_only)[None], *np.zeros((3, 1)))
+                assert grid["TotalReturnPct"][i, j, k] == pytest.approx(want["TotalReturnPct"][0])
+                assert grid["MaxDrawdownPct"][i, j, k] == pytest.approx(want["MaxDrawdownPct"][0])
+                assert grid["Sharpe"][i, j, k] == pytest.approx(want["Sharpe"][0])
+
+
+def test_positions_ignore_the_future():
+    sent, _ = _walk()
+    cut     = 200
+    future  = sent.copy()
+    future[:, cut + 1:] = -future[:, cut + 1:]  # rewrite everything after hour `cut`
+    buy = sell = np.array([0.1])
+    a, b = backtest.action_positions(sent, buy, sell), backtest.action_positions(future, buy, sell)
+    np.testing.assert_array_equal(a[..., :cut + 1], b[..., :cut + 1])
+
+
+def _history_csv(path, bars=2000, seed=4):
+    """Random-walk prices; each hour's sentiment is the sign of the move *into* that hour (known by then)."""
+    rng   = np.random.default_rng(seed)
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    past  = np.sign(np.r_[0.0, np.diff(price)]) * 0.5
+    pd.DataFrame({
+        "Timestamp": [(T0 + timedelta(hours=h, minutes=30)).isoformat() for h in range(bars)],
+        "Coin": "Bitcoin", "Source": "News", "Sentiment": past, "PriceUSD": price, "SuggestedAction": "Hold",
+    }).to_csv(path, index=False)
+    return price
+
+
+def test_load_bars_aligns_each_bar_with_the_next_move(tmp_path):
+    path  = str(tmp_path / "sentiment_history.csv")
+    price = _history_csv(path)
+    bars  = backtest.load_bars(path, coins=["Bitcoin"])
+    np.testing.assert_allclose(bars["returns"][0, :-1], price[1:] / price[:-1] - 1)
+    assert bars["returns"][0, -1] == 0.0  # the last bar's move isn't known yet
+    assert bars["index"][0] == pd.Timestamp(T0)
+
+
+def test_a_signal_that_only_knows_the_past_has_no_edge(tmp_path):
+    # with look-ahead (position at t earning the move into t) this signal would hit ~100%
+    path = str(tmp_path / "sentiment_history.csv")
+    _history_csv(path)
+    bars = backtest.load_bars(path, coins=["Bitcoin"])
+    res  = backtest.evaluate_actions(bars["sentiment"], bars["returns"], np.array([0.1]), np.array([0.1]), np.array([0.0]))
+    assert 0.45 < res["HitRate"][0, 0, 0] < 0.55
+
+    cheat = np.roll(bars["sentiment"], -1, axis=1)  # tomorrow's news today
+    res   = backtest.evaluate_actions(cheat, bars["returns"], np.array([0.1]), np.array([0.1]), np.array([0.0]))
+    assert res["HitRate"][0, 0, 0] > 0.99
+
+
+def test_model_backtest_matches_a_loop_and_uses_the_logged_start_price():
+    rng   = np.random.default_rng(2)
+    n     = 300
+    cur   = 100 * (1 + rng.normal(0, 0.05, n))
+    preds = pd.DataFrame({
+        "Coin":      np.where(np.arange(n) % 2, "Bitcoin", "Ethereum"),
+        "Timestamp": [pd.Timestamp(T0) + pd.Timedelta(hours=i // 2, minutes=5) for i in range(n)],
+        "Current":   cur,
+        "Predicted": cur * (1 + rng.normal(0, 0.01, n)),
+        "Actual":    cur * (1 + rng.normal(0, 0.01, n)),
+    })
+    preds["Expected"] = preds.Predicted / preds.Current - 1
+    preds["Realised"] = preds.Actual / preds.Current - 1
+    thresholds, fees = np.array([0.0, 0.005]), np.array([0.0, 0.001])
+    grid = backtest.evaluate_model(preds, thresholds, fees)
+
+    for i, th in enumerate(thresholds):
+        for k, fee in enumerate(fees):
+            hourly = {}
+            for exp, real, ts in zip(preds.Expected, preds.Realised, preds.Timestamp):
+                pos = np.sign(exp) if abs(exp) > th else 0.0
+                hourly.setdefault(ts.floor("1h"), []).append(pos * real - 2 * fee * abs(pos))
+            pnl  = np.array([np.mean(v) for _, v in sorted(hourly.items())])
+            want = (np.prod(1 + pnl) - 1) * 100
+            assert grid["TotalReturnPct"][i, k] == pytest.approx(want)
+
+
+def test_sweeps_are_the_same_on_a_process_pool():
+    sent, ret = _walk(bars=200)
+    bars      = {"sentiment": sent, "returns": ret}
+    kw        = dict(buy=np.round(np.arange(0.02, 0.3, 0.02), 4), sell=np.array([0.05, 0.1]), fees=np.array([0.001]))
+    one, many = backtest.sweep_actions(bars, workers=1, **kw), backtest.sweep_actions(bars, workers=3, **kw)
+    pd.testing.assert_frame_equal(one, many)
+    assert len(one) == 14 * 2 and one.TotalReturnPct.is_monotonic_decreasing
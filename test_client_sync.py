@@ -0,0 +1,181 @@
+# test_client_sync.py
+"""client_sync against an in-memory stand-in for the Supabase table (no network)."""
+
+import re
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import client_sync
+
+
+class FakeQuery:
+    def __init__(self, table):
+        self.table  = table
+        self.orders = []
+        self.after  = None
+        self.size   = None
+        self.rows   = None
+
+    def select(self, *cols):
+        return self
+
+    def order(self, col):
+        self.orders.append(col)
+        return self
+
+    def or_(self, expr):
+        # the one keyset filter pull() sends: (last_update, id) > (ts, id)
+        m = re.fullmatch(r'last_update\.gt\."(.*)",and\(last_update\.eq\."\1",id\.gt\."(.*)"\)', expr)
+        assert m, expr
+        self.after = (m.group(1), int(m.group(2)))
+        return self
+
+    def limit(self, n):
+        self.size = n
+        return self
+
+    def upsert(self, rows, on_conflict):
+        assert on_conflict == "name"
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.rows is not None:
+            self.table.upserts.append(self.rows)
+            out = [self.table.put(r) for r in self.rows]
+            return SimpleNamespace(data=out)
+        rows = sorted(self.table.rows.values(), key=lambda r: tuple(r.get(c) or "" for c in self.orders))
+        if self.after:
+            rows = [r for r in rows if (r["last_update"], r["id"]) > self.after]
+        self.table.pages.append(len(rows[:self.size]))
+        return SimpleNamespace(data=[dict(r) for r in rows[:self.size]])
+
+
+class FakeClient:
+    """The clients table: rows by id, with PostgREST-ish select/upsert."""
+
+    def __init__(self, rows=()):
+        self.rows    = {}
+        self.pages   = []
+        self.upserts = []
+        for r in rows:
+            self.insert(r)
+
+    def insert(self, row):
+        rid = max(self.rows, default=0) + 1
+        self.rows[rid] = {**row, "id": rid}
+        return self.rows[rid]
+
+    def put(self, row):
+        same = [r for r in self.rows.values() if r["name"] == row["name"]]
+        if same:
+            same[0].update(row)
+            return dict(same[0])
+        return dict(self.insert(row))
+
+    def table(self, name):
+        assert name == client_sync.TABLE
+        return FakeQuery(self)
+
+
+def _client(n, stamp="2025-01-01T00:00:00"):
+    return FakeClient({"name": f"client{i:03d}", "email": f"c{i}@x.io", "last_update": stamp} for i in range(n))
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = client_sync.open_mirror(str(tmp_path / "mirror.db"))
+    yield c
+    c.close()
+
+
+def test_pull_pages_through_the_table(conn):
+    remote = _client(25)
+    assert client_sync.pull(remote, conn, page_size=10) == 25
+    assert remote.pages == [10, 10, 5]
+    assert client_sync.count(conn) == 25
+    assert list(client_sync.load_frame(conn)["name"]) == sorted(r["name"] for r in remote.rows.values())
+
+
+def test_pull_resumes_after_the_cursor(conn):
+    remote = _client(5)
+    client_sync.pull(remote, conn)
+    assert client_sync.get_cursor(conn) == ("2025-01-01T00:00:00", 5)
+
+    remote.rows[3].update(email="new@x.io", last_update="2025-01-02T00:00:00")
+    assert client_sync.pull(remote, conn) == 1
+    assert client_sync.get_cursor(conn) == ("2025-01-02T00:00:00", 3)
+    assert client_sync.mirrored(conn, ["client002"])["client002"]["email"] == "new@x.io"
+    assert client_sync.pull(remote, conn) == 0
+
+
+def test_rows_sharing_a_stamp_across_pages_are_not_skipped(conn):
+    remote = _client(4)
+    client_sync.pull(remote, conn, page_size=3)  # cursor lands mid-way through one stamp's rows
+    assert client_sync.count(conn) == 4
+    for i in range(6):  # one push: six rows stamped alike
+        remote.insert({"name": f"batch{i}", "last_update": "2025-01-03T00:00:00"})
+    assert client_sync.pull(remote, conn, page_size=4) == 6
+    assert client_sync.count(conn) == 10
+
+
+def test_mirror_is_keyed_on_id(conn):
+    remote = _client(2)
+    remote.insert({"name": "client000", "email": "twin@x.io", "last_update": "2025-01-01T00:00:00"})
+    client_sync.sync(remote, conn, remote_count=3)
+    assert client_sync.count(conn) == 3  # same name, two clients
+
+    remote.rows[2].update(name="renamed", last_update="2025-01-02T00:00:00")
+    remote.pages.clear()
+    client_sync.sync(remote, conn, remote_count=3)
+    assert remote.pages == [1]  # incremental – no full resync
+    assert sorted(client_sync.load_frame(conn)["name"]) == ["client000", "client000", "renamed"]
+
+
+def test_sync_resyncs_after_a_remote_delete(conn):
+    remote = _client(5)
+    client_sync.sync(remote, conn, remote_count=5)
+    del remote.rows[5]
+    client_sync.sync(remote, conn, remote_count=4)
+    assert client_sync.count(conn) == 4
+    assert "client004" not in client_sync.mirrored(conn, ["client004"])
+
+
+def test_old_name_keyed_mirror_is_replaced(tmp_path):
+    path = str(tmp_path / "old.db")
+    old  = sqlite3.connect(path)
+    old.execute("CREATE TABLE clients (name TEXT PRIMARY KEY, last_update TEXT, data TEXT NOT NULL)")
+    old.execute("INSERT INTO clients VALUES ('x', NULL, '{}')")
+    old.commit()
+    old.close()
+    conn = client_sync.open_mirror(path)
+    assert client_sync.count(conn) == 0 and client_sync.get_cursor(conn) is None
+    assert client_sync.pull(_client(2), conn) == 2
+    conn.close()
+
+
+def test_changed_rows_ignores_unchanged_and_bookkeeping_fields(conn):
+    client_sync.pull(_client(3), conn)
+    rows = [
+        {"name": "client000", "email": "c0@x.io", "last_update": "later", "id": 99},  # unchanged
+        {"name": "client001", "email": " c1@x.io "},                                # whitespace only
+        {"name": "client002", "email": "moved@x.io"},                               # changed
+        {"name": "client100", "email": "c100@x.io"},                                # new
+    ]
+    assert [r["name"] for r in client_sync.changed_rows(conn, rows)] == ["client002", "client100"]
+
+
+def test_push_sends_changed_rows_in_chunks(conn):
+    remote = _client(3)
+    client_sync.pull(remote, conn)
+    rows = [{"name": f"client{i:03d}", "email": f"c{i}@x.io"} for i in range(3)]
+    rows += [{"name": f"new{i}", "email": f"n{i}@x.io"} for i in range(5)]
+    rows += [{"name": "new9", "phone": "555"}]  # different columns → its own batch
+
+    assert client_sync.push(remote, conn, rows, chunk_size=2) == (6, 3)
+    assert [len(c) for c in remote.upserts] == [2, 2, 1, 1]
+    assert all(len({tuple(sorted(r)) for r in c}) == 1 for c in remote.upserts)
+    assert client_sync.count(conn) == 9
+    assert client_sync.changed_rows(conn, rows) == []
@@ -0,0 +1,62 @@
+# test_compact_model.py
+"""compact_model exports predict like the sklearn models they were compiled from."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+import compact_model
+import train_price_predictor as tpp
+
+
+def _bars(n=400, seed=7):
+    rng   = np.random.default_rng(seed)
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n + 1)))
+    return pd.DataFrame({
+        "AvgSentiment": np.clip(rng.normal(0.05, 0.2, n), -1, 1),
+        "PriceUSD":     price[:-1],
+        "Return1h":     np.r_[0.0, price[1:-1] / price[:-2] - 1],
+        "TargetPrice":  price[1:],
+    })
+
+
+@pytest.mark.parametrize("name, params, kind", [
+    ("forest_sentiment", {"n_estimators": 20}, "table"),
+    ("forest", {"n_estimators": 20, "max_depth": 5}, "trees"),
+    ("gbr", {"n_estimators": 30, "max_depth": 3}, "trees"),
+    ("ridge", {"alpha": 1.0}, "linear"),
+])
+def test_compact_predict_matches_sklearn(tmp_path, name, params, kind):
+    data  = _bars()
+    train, test = data.iloc[:300], _bars(200, seed=11)
+    model = tpp.make_model(name, params).fit(train, train["TargetPrice"])
+
+    path    = str(tmp_path / "model.npz")
+    compact = compact_model.export(model, path)
+    loaded  = compact_model.load(path)
+
+    assert compact.kind == loaded.kind == kind
+    np.testing.assert_allclose(loaded.predict(test), model.predict(test), rtol=compact_model.PARITY_RTOL)
+
+
+def test_export_refuses_a_model_that_drifts(tmp_path):
+    data  = _bars()
+    model = tpp.make_model("ridge", {"alpha": 1.0}).fit(data, data["TargetPrice"])
+    real  = model.predict(data)
+    model.predict = lambda X: real * 1.01  # the compiled arrays no longer describe this model
+    with pytest.raises(ValueError):
+        compact_model.export(model, str(tmp_path / "model.npz"), X=data)
+
+
+def test_stale_export_is_not_used_for_a_retrained_pickle(tmp_path, monkeypatch):
+    monkeypatch.setattr(tpp, "MODEL_PATH", str(tmp_path / "price_predictor.pkl"))
+    data = _bars()
+    tpp.save_model(tpp.make_model("ridge", {"alpha": 1.0}).fit(data, data["TargetPrice"]), "ridge", {}, data)
+    assert isinstance(tpp._predictor(), compact_model.CompactPredictor)
+
+    # retrain the pickle only – the export next to it now describes another model
+    import joblib
+    joblib.dump({"model": tpp.make_model("naive")}, tpp.MODEL_PATH)
+    assert isinstance(tpp._predictor(), tpp.PricePredictor)
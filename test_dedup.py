@@ -0,0 +1,82 @@
+# test_dedup.py
+"""Exact / near-duplicate detection and the bounded, persisted index."""
+
+import dedup
+
+STORY   = "Bitcoin ETF inflows hit a record as BlackRock fund adds 12,000 BTC in a single week"
+REWORD  = "BlackRock fund adds 12,000 BTC in a single week as Bitcoin ETF inflows hit a record high"
+OTHER   = "Ethereum developers schedule the next network upgrade for early spring after testnet delays"
+T0      = 1_700_000_000
+
+
+def test_normalize_ignores_case_urls_and_punctuation():
+    assert dedup.normalize("BTC to $100k!!  https://t.co/x  Now.") == "btc to $100k now"
+    assert dedup.fingerprint(STORY)[0] == dedup.fingerprint(STORY.upper() + " https://news.example/a")[0]
+
+
+def test_similarity_estimates_jaccard():
+    sig = lambda text: dedup.fingerprint(text)[1]
+    assert dedup.similarity(sig(STORY), sig(STORY)) == 1.0
+    assert dedup.similarity(sig(STORY), sig(REWORD)) >= dedup.NEAR_JACCARD
+    assert dedup.similarity(sig(STORY), sig(OTHER)) < 0.2
+
+
+def test_short_texts_only_get_the_exact_check():
+    assert dedup.fingerprint("to the moon")[1] is None
+    dd = dedup.Deduper()
+    assert dd.check("to the moon", ["BTC"], now=T0) == ("BTC",)
+    assert dd.check("To the moon!", ["BTC"], now=T0) == ()
+    assert dd.check("to the moon again", ["BTC"], now=T0) == ("BTC",)
+
+
+def test_check_drops_exact_and_near_duplicates_per_coin():
+    dd = dedup.Deduper()
+    assert dd.check(STORY, ["BTC", "ETH"], now=T0) == ("BTC", "ETH")
+    assert dd.check(STORY + "!", ["BTC"], now=T0 + 1) == ()
+    assert dd.check(REWORD, ["ETH", "SOL"], now=T0 + 2) == ("SOL",)  # new for SOL only
+    assert dd.check(OTHER, ["ETH"], now=T0 + 3) == ("ETH",)
+    assert dd.stats == {"exact": 1, "near": 1, "fresh": 4}
+    assert len(dd) == 4
+
+
+def test_index_is_bounded_by_size_and_age():
+    texts = [" ".join(f"{w}{i}" for w in "alpha bravo charlie delta echo".split()) for i in range(5)]
+    dd    = dedup.Deduper(max_items=3, max_age_h=1)
+    for i, text in enumerate(texts):
+        assert dd.check(text, ["BTC"], now=T0 + i) == ("BTC",)
+    assert len(dd) == 3
+    assert dd.check(texts[4], ["BTC"], now=T0 + 5) == ()
+    assert dd.check(texts[0], ["BTC"], now=T0 + 5) == ("BTC",)  # evicted
+
+    dd.check(OTHER, ["BTC"], now=T0 + 10)
+    assert dd.check(OTHER, ["BTC"], now=T0 + 10 + 3601) == ("BTC",)  # aged out
+    assert len(dd) == 1
+
+
+def test_save_merges_with_other_workers_and_load_restores(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup.time, "time", lambda: T0 + 100)
+    path = str(tmp_path / "dedup_index.json")
+    a, b = dedup.Deduper.load(path), dedup.Deduper.load(path)
+    a.check(STORY, ["BTC"], now=T0)
+    b.check(OTHER, ["ETH"], now=T0 + 1)
+    a.save(path)
+    b.save(path)
+
+    dd = dedup.Deduper.load(path)
+    assert len(dd) == 2
+    assert dd.check(REWORD, ["BTC"], now=T0 + 2) == ()
+    assert dd.check(OTHER, ["ETH", "BTC"], now=T0 + 2) == ("BTC",)
+
+    monkeypatch.setattr(dedup.time, "time", lambda: T0 + dedup.MAX_AGE_H * 3600 + 10)
+    assert len(dedup.Deduper.load(path)) == 0  # too old to keep on load
+
+
+def test_templated_posts_cap_the_comparisons(monkeypatch):
+    dd = dedup.Deduper()
+    for i in range(dedup.MAX_CANDIDATES * 2):
+        dd.check(f"BTC price update: bitcoin trades at {10_000 + i * 37} dollars right now", ["BTC"], now=T0)
+    calls = []
+    real  = dedup.similarity
+    monkeypatch.setattr(dedup, "similarity", lambda a, b: calls.append(1) or real(a, b))
+    dd.check("BTC price update: bitcoin trades at 99999 dollars right now on coinbase", ["BTC"], now=T0)
+    assert len(calls) <= dedup.MAX_CANDIDATES
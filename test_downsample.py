@@ -0,0 +1,93 @@
+# test_downsample.py
+"""LTTB / min-max downsampling and rollup-level selection on synthetic series."""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import downsample
+
+
+def _reference_lttb(x, y, budget):
+    """Plain-loop LTTB as published (Steinarsson 2013), to check the vectorised one against."""
+    n, every = len(x), (len(x) - 2) / (budget - 2)
+    out, a = [0], 0
+    for i in range(budget - 2):
+        lo, hi   = math.floor(i * every) + 1, math.floor((i + 1) * every) + 1
+        nlo, nhi = hi, min(math.floor((i + 2) * every) + 1, n)
+        avg_x, avg_y = sum(x[nlo:nhi]) / (nhi - nlo), sum(y[nlo:nhi]) / (nhi - nlo)
+        best, area_max = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > area_max:
+                best, area_max = j, area
+        out.append(best)
+        a = best
+    return out + [n - 1]
+
+
+def _walk(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype="float64"), np.cumsum(rng.normal(0, 1, n))
+
+
+@pytest.mark.parametrize("n, budget", [(1000, 100), (997, 50), (310, 300), (50, 3)])
+def test_lttb_matches_the_reference(n, budget):
+    x, y = _walk(n)
+    idx  = downsample.lttb_indices(x, y, budget)
+    assert list(idx) == _reference_lttb(list(x), list(y), budget)
+    assert len(idx) == budget and idx[0] == 0 and idx[-1] == n - 1
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_a_lone_spike():
+    x = np.arange(5000, dtype="float64")
+    y = np.zeros(5000)
+    y[2718] = 50.0
+    assert 2718 in downsample.lttb_indices(x, y, 100)
+
+
+def test_small_inputs_pass_through():
+    x, y = _walk(40)
+    assert list(downsample.lttb_indices(x, y, 40)) == list(range(40))
+    assert list(downsample.lttb_indices(x, y, 2)) == list(range(40))
+    assert list(downsample.minmax_indices(x, y, 3)) == list(range(40))
+
+
+def test_minmax_keeps_every_buckets_extremes():
+    x, y   = _walk(1000)
+    budget = 102
+    idx    = set(downsample.minmax_indices(x, y, budget))
+    assert {0, 999} <= idx and len(idx) <= budget
+    buckets = (budget - 2) // 2
+    for b in range(buckets):
+        members = [i for i in range(1000) if min(i * buckets // 1000, buckets - 1) == b]
+        assert members[int(np.argmin(y[members]))] in idx
+        assert members[int(np.argmax(y[members]))] in idx
+
+
+def test_downsample_frame_sorts_drops_gaps_and_handles_datetimes():
+    x, y = _walk(2000)
+    df   = pd.DataFrame({"Timestamp": pd.date_range("2025-01-01", periods=2000, freq="h"), "Sentiment": y})
+    df.loc[::7, "Sentiment"] = np.nan
+    out  = downsample.downsample(df.sample(frac=1, random_state=1), "Timestamp", "Sentiment", budget=200)
+    assert len(out) == 200
+    assert out.Timestamp.is_monotonic_increasing and out.Sentiment.notna().all()
+    assert out.Timestamp.iloc[0] == df.Timestamp[1] and out.Timestamp.iloc[-1] == df.Timestamp[1999]
+
+
+@pytest.mark.parametrize("days, level", [(1, "hourly"), (50, "hourly"), (51, "daily"), (1200, "daily"), (5000, "weekly")])
+def test_pick_level_is_the_finest_within_budget(days, level):
+    start = pd.Timestamp("2020-01-01")
+    assert downsample.pick_level(start, start + pd.Timedelta(days=days)) == level
+
+
+def test_series_for_range_is_bounded_per_column():
+    x, y  = _walk(3000)
+    frame = pd.DataFrame({"Timestamp": pd.date_range("2025-01-01", periods=3000, freq="h"), "Sentiment": y, "PriceUSD": y + 100})
+    out   = downsample.series_for_range(frame, "2025-02-01", "2025-04-01", ["Sentiment", "PriceUSD"], budget=100)
+    assert out.groupby("Series").size().to_dict() == {"PriceUSD": 100, "Sentiment": 100}
+    assert out.Timestamp.min() >= pd.Timestamp("2025-02-01") and out.Timestamp.max() <= pd.Timestamp("2025-04-01")
+    assert list(downsample.series_for_range(frame, "2025-01-01", "2025-02-01", []).columns) == ["Timestamp", "Series", "Value"]
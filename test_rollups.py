@@ -0,0 +1,101 @@
+# test_rollups.py
+"""rollups tables from a small synthetic history and prediction log."""
+
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import rollups
+
+T0 = datetime(2025, 1, 1)
+
+
+def _history(hours=48):
+    """Two coins, two sources an hour; Bitcoin's price climbs 1/h from 100, Ethereum's is flat."""
+    rows = []
+    for h in range(hours):
+        for coin, price in (("Bitcoin", 100.0 + h), ("Ethereum", 50.0)):
+            for source, sentiment in (("Reddit", 0.2), ("News", 0.4)):
+                rows.append({"Timestamp": T0 + timedelta(hours=h, minutes=5), "Coin": coin, "Source": source,
+                             "Sentiment": sentiment, "PriceUSD": price, "SuggestedAction": "Hold"})
+    return pd.DataFrame(rows)
+
+
+def _predictions():
+    """Bitcoin at hour 0: one hit (1% off), one miss (10% off), one still open."""
+    ts = pd.Timestamp(T0)
+    return pd.DataFrame({
+        "Coin":      ["Bitcoin"] * 3,
+        "Timestamp": [ts, ts + timedelta(minutes=10), ts + timedelta(minutes=20)],
+        "Predicted": [101.0, 110.0, 120.0],
+        "Actual":    [100.0, 100.0, np.nan],
+        "DiffPct":   [1.0, 10.0, np.nan],
+        "Accurate":  [1.0, 0.0, np.nan],
+    })
+
+
+def test_hourly_rollup_averages_sources_and_tracks_24h_change():
+    hourly = rollups.rollup(_history(), _predictions().iloc[:0], "1h")
+    assert list(hourly.columns) == rollups.ROLLUP_COLUMNS
+    assert len(hourly) == 2 * 48
+
+    btc = hourly[hourly.Coin == "Bitcoin"].set_index("Timestamp")
+    assert btc.Sentiment.round(6).eq(0.3).all()
+    assert btc.Samples.eq(2).all()
+    assert btc.Change24hPct.iloc[:24].isna().all()  # nothing a full day earlier yet
+    assert btc.loc[pd.Timestamp(T0 + timedelta(hours=30)), "Change24hPct"] == pytest.approx((130 - 106) / 106 * 100)
+    assert hourly[hourly.Coin == "Ethereum"].Change24hPct.dropna().eq(0).all()
+
+
+def test_prediction_stats_land_in_their_bucket():
+    hourly = rollups.rollup(_history(), _predictions(), "1h")
+    first  = hourly[(hourly.Coin == "Bitcoin") & (hourly.Timestamp == pd.Timestamp(T0))].iloc[0]
+    assert (first.Predictions, first.Resolved) == (3, 2)
+    assert first.HitRate == pytest.approx(0.5)
+    assert first.MeanDiffPct == pytest.approx(5.5)
+    assert first.BiasPct == pytest.approx(5.5)
+    assert hourly[hourly.Coin == "Ethereum"].Predictions.isna().all()
+
+
+def test_daily_and_weekly_fold_the_same_rows():
+    hist  = _history()
+    daily = rollups.rollup(hist, _predictions(), "1D")
+    assert len(daily) == 2 * 2
+    assert daily.Samples.eq(48).all()
+    weekly = rollups.rollup(hist, _predictions(), "1W")
+    assert weekly.groupby("Coin").Samples.sum().eq(96).all()
+    assert weekly[weekly.Coin == "Bitcoin"].PriceUSD.iloc[-1] == 147.0
+
+
+def test_latest_summary_headlines_each_coin():
+    hourly = rollups.rollup(_history(), _predictions(), "1h")
+    acc    = pd.DataFrame({"Coin": ["Bitcoin"], "N": [2], "MAPE": [5.5], "HitRate": [0.5],
+                           "Directional": [None], "BiasPct": [5.5]})
+    latest = rollups.latest_summary(hourly, _predictions(), now=T0 + timedelta(hours=48), acc=acc).set_index("Coin")
+
+    assert latest.loc["Bitcoin", "PriceUSD"] == 147.0
+    assert latest.loc["Bitcoin", "Buckets24h"] == 24
+    assert latest.loc["Bitcoin", "Predicted"] == 120.0
+    assert latest.loc["Bitcoin", "Accuracy24h"] == pytest.approx(94.5)
+    assert np.isnan(latest.loc["Ethereum", "Accuracy24h"])
+
+
+def test_build_rollups_writes_tables_that_read_back(tmp_path, monkeypatch):
+    for attr in ("HOURLY_CSV", "DAILY_CSV", "WEEKLY_CSV", "LATEST_CSV"):
+        monkeypatch.setattr(rollups, attr, str(tmp_path / f"{attr.lower()}.csv"))
+    hist_csv, pred_log = tmp_path / "sentiment_history.csv", tmp_path / "prediction_log.json"
+    hist = _history()
+    hist.assign(Timestamp=hist.Timestamp.dt.strftime("%Y-%m-%dT%H:%M:%S")).to_csv(hist_csv, index=False)
+    pred_log.write_text(json.dumps({"Bitcoin": [
+        {"timestamp": T0.isoformat(), "predicted": 101.0, "current": 99.0, "actual": 100.0},
+    ]}))
+
+    hourly, daily, weekly, latest = rollups.build_rollups(T0 + timedelta(hours=48), str(hist_csv), str(pred_log))
+    back = rollups.read_rollup(rollups.HOURLY_CSV)
+    assert len(back) == len(hourly) == 96
+    assert back.Timestamp.dtype.kind == "M"
+    assert set(rollups.read_rollup(rollups.LATEST_CSV).Coin) == {"Bitcoin", "Ethereum"}
+    assert (tmp_path / "accuracy.json").exists()  # scored beside the log it came from
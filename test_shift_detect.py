@@ -0,0 +1,110 @@
+# test_shift_detect.py
+"""Online shift / volume / flip detection on a synthetic hourly aggregate."""
+
+import numpy as np
+
+import sentiment_agg
+import shift_detect
+from records import Source
+
+H0 = 480_000  # an arbitrary epoch hour bucket
+
+
+def _ts(hour, minute=0):
+    return (H0 + hour) * shift_detect.BUCKET_US + minute * 60_000_000
+
+
+class Feed:
+    """One Bitcoin/News series, filled an hour at a time; detect() runs like analyze.py would, mid-hour."""
+
+    def __init__(self, seed=1):
+        self.agg   = sentiment_agg.Aggregator()
+        self.state = {}
+        self.rng   = np.random.default_rng(seed)
+
+    def hour(self, h, docs=5, level=0.1):
+        ts = [_ts(h, m) for m in np.linspace(1, 50, docs).astype(int)]
+        self.agg.add_many(ts, ["Bitcoin"] * docs, [Source.NEWS] * docs, level + self.rng.normal(0, 0.02, docs))
+        return shift_detect.detect(self.state, self.agg, now=_ts(h, 55))
+
+
+def _kinds(events):
+    return [(e["kind"], e["direction"], e["bucket"] - H0) for e in events]
+
+
+def test_a_steady_series_is_quiet():
+    feed = Feed()
+    assert [e for h in range(48) for e in feed.hour(h)] == []
+    st = feed.state["series"]["Bitcoin|News"]
+    assert st["bucket"] == H0 + 46  # closed buckets folded in, the current one only checked
+    assert abs(st["sent"]["mean"] - 0.1) < 0.02
+
+
+def test_a_jump_in_sentiment_alerts_in_the_hour_it_happens_and_only_once():
+    feed = Feed()
+    for h in range(30):
+        feed.hour(h)
+    events = feed.hour(30, level=0.6)
+    assert _kinds(events) == [("shift", "up", 30)]
+    assert events[0]["source"] == "News" and events[0]["z"] > shift_detect.CUSUM_H
+
+    # the same hour seen again, then committed when it closes: no repeat for bucket 30
+    assert shift_detect.detect(feed.state, feed.agg, now=_ts(30, 58)) == []
+    later = [k for h in range(31, 34) for k in _kinds(feed.hour(h, level=0.6))]
+    assert ("shift", "up", 30) not in later
+
+
+def test_a_drop_alerts_down():
+    feed = Feed()
+    for h in range(30):
+        feed.hour(h, level=0.3)
+    assert _kinds(feed.hour(30, level=-0.4)) == [("shift", "down", 30)]
+
+
+def test_volume_spike_is_provisional_until_the_bucket_closes():
+    feed = Feed()
+    for h in range(30):
+        feed.hour(h)
+    vol = feed.state["series"]["Bitcoin|News"]["vol"]
+    assert ("volume", "up", 30) in _kinds(feed.hour(30, docs=300))
+    assert vol["n"] == 30  # buckets 0–29: the partial bucket 30 wasn't learned
+    assert shift_detect.detect(feed.state, feed.agg, now=_ts(30, 58)) == []
+    feed.hour(31)
+    assert vol["n"] == 31 and vol["mean"] > 2  # learned once closed
+
+
+def test_nothing_alerts_during_warmup():
+    feed = Feed()
+    events = [e for h in range(shift_detect.WARMUP) for e in feed.hour(h, docs=3 + 40 * (h % 2), level=(-1) ** h * 0.8)]
+    assert events == []
+
+
+def test_thin_buckets_do_not_move_the_sentiment_estimate():
+    feed = Feed()
+    for h in range(30):
+        feed.hour(h)
+    feed.hour(30, docs=shift_detect.MIN_DOCS - 1, level=-0.9)  # too few documents to mean anything
+    assert feed.hour(31) == []
+    assert abs(feed.state["series"]["Bitcoin|News"]["sent"]["mean"] - 0.1) < 0.02
+
+
+def test_action_flips_and_persisted_updates(tmp_path):
+    feed = Feed()
+    path = str(tmp_path / "shift_state.json")
+    for h in range(20):
+        feed.hour(h)
+    assert shift_detect.update(feed.agg, _ts(19, 55), {"Bitcoin": 0.05}, path=path) == []
+    events = shift_detect.update(feed.agg, _ts(19, 56), {"Bitcoin": 0.45}, path=path)
+    assert _kinds(events) == [("flip", "HOLD→BUY", 19)]
+    assert shift_detect.update(feed.agg, _ts(19, 57), {"Bitcoin": 0.45}, path=path) == []
+
+    text = shift_detect.format_events(events + [
+        {"coin": "Bitcoin", "source": "News", "bucket": H0, "kind": "shift", "direction": "down", "value": -0.4, "z": -6.0},
+        {"coin": "Bitcoin", "source": "News", "bucket": H0, "kind": "volume", "direction": "up", "value": 300, "z": 5.1},
+    ])
+    assert text.splitlines() == [
+        "🚨 Sentiment Shift",
+        "Bitcoin: 🤝 Hold → 📈 Buy (+0.45)",
+        "Bitcoin · News: sentiment ↓ -0.40 (z -6.0)",
+        "Bitcoin · News: 300 mentions this hour (z +5.1)",
+    ]
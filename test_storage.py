@@ -0,0 +1,138 @@
+# test_storage.py
+"""storage's locks, atomic writes and appended-CSV reads on scratch files."""
+
+import os
+import glob
+import stat
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+import storage
+
+
+def _bump(path, times):
+    for _ in range(times):
+        with storage.update_json(path, default={"n": 0}, backup=False) as state:
+            state["n"] += 1
+
+
+def _hold(path, ready, release):
+    with storage.file_lock(path):
+        ready.set()
+        release.wait(10)
+
+
+def test_atomic_write_replaces_whole_or_not_at_all(tmp_path):
+    path = str(tmp_path / "state.json")
+    storage.write_json({"v": 1}, path)
+    with pytest.raises(RuntimeError):
+        with storage.atomic_write(path) as f:
+            f.write('{"v": 2, "half')
+            raise RuntimeError("crash mid-write")
+    assert storage.read_json(path) == {"v": 1}
+    assert os.listdir(tmp_path) == ["state.json"]  # no temp file left behind
+
+
+def test_atomic_write_keeps_the_target_mode(tmp_path):
+    path = str(tmp_path / "shared.csv")
+    storage.write_csv(pd.DataFrame({"a": [1]}), path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~storage._umask()  # not mkstemp's 0600
+    os.chmod(path, 0o640)
+    storage.write_csv(pd.DataFrame({"a": [2]}), path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_umask_is_read_without_changing_it(monkeypatch):
+    current = os.umask(0o022)
+    os.umask(current)
+    monkeypatch.setattr(storage, "_UMASK", None)
+    assert storage._umask() == current
+    assert os.umask(current) == current
+
+
+def test_write_json_backup_and_damaged_reads(tmp_path, capsys):
+    path = str(tmp_path / "log.json")
+    storage.write_json({"v": 1}, path)
+    storage.write_json({"v": 2}, path, backup=True)
+    with open(path, "w") as f:
+        f.write('{"v": 3,')  # torn by something that bypassed storage
+    assert storage.read_json(path, default={}) == {"v": 1}  # the last good .bak
+
+    os.remove(f"{path}.bak")
+    assert storage.read_json(path, default={}) == {}
+    assert not os.path.exists(path) and glob.glob(f"{path}.corrupt-*")  # moved aside, not overwritten
+    assert "damaged" in capsys.readouterr().out
+
+
+def test_update_json_skips_the_write_when_the_body_fails(tmp_path):
+    path = str(tmp_path / "log.json")
+    storage.write_json({"n": 1}, path)
+    with pytest.raises(KeyError):
+        with storage.update_json(path, default={}) as state:
+            state["n"] = 99
+            state["missing"]
+    assert storage.read_json(path) == {"n": 1}
+
+
+def test_update_json_is_serialised_across_processes(tmp_path):
+    path  = str(tmp_path / "counter.json")
+    procs = [multiprocessing.Process(target=_bump, args=(path, 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert storage.read_json(path) == {"n": 100}
+
+
+def test_file_lock_times_out_while_another_process_holds_it(tmp_path):
+    path    = str(tmp_path / "busy.json")
+    ready   = multiprocessing.Event()
+    release = multiprocessing.Event()
+    holder  = multiprocessing.Process(target=_hold, args=(path, ready, release))
+    holder.start()
+    try:
+        assert ready.wait(10)
+        with pytest.raises(TimeoutError):
+            with storage.file_lock(path, timeout=0.2):
+                pass
+    finally:
+        release.set()
+        holder.join(10)
+    with storage.file_lock(path, timeout=1):
+        pass
+
+
+def test_append_csv_follows_the_header_and_cuts_a_torn_line(tmp_path, capsys):
+    path = str(tmp_path / "rows.csv")
+    storage.append_csv(pd.DataFrame({"a": [1], "b": ["x"]}), path)
+    storage.append_csv(pd.DataFrame({"b": ["y"], "a": [2]}), path)  # column order follows the file
+    with open(path, "a") as f:
+        f.write("3,z-but-never-fin")  # an append killed mid-line
+    storage.append_csv(pd.DataFrame({"a": [4], "b": ["w"]}), path)
+
+    assert "partial last line" in capsys.readouterr().out
+    assert pd.read_csv(path).to_dict("list") == {"a": [1, 2, 4], "b": ["x", "y", "w"]}
+
+
+def test_read_csv_range_returns_complete_lines_from_an_offset(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    storage.append_csv(pd.DataFrame({"a": [1, 2]}), path)
+    df, end = storage.read_csv_range(path)
+    assert list(df.a) == [1, 2] and end == os.path.getsize(path)
+
+    storage.append_csv(pd.DataFrame({"a": [3]}), path)
+    with open(path, "a") as f:
+        f.write("4")  # still being written
+    df, end2 = storage.read_csv_range(path, end)
+    assert list(df.a) == [3] and end2 == os.path.getsize(path) - 1
+
+    with open(path, "a") as f:
+        f.write("\n")
+    df, _ = storage.read_csv_range(path, end2)
+    assert list(df.a) == [4]
+
+    (tmp_path / "header_only.csv").write_text("a,b")  # header still being written
+    df, end = storage.read_csv_range(str(tmp_path / "header_only.csv"))
+    assert df.empty and end == 0
@@ -0,0 +1,113 @@
+# test_wallet_monitor.py
+"""Wallet movement / level alerts and the adaptive polling schedule (no network)."""
+
+import pytest
+
+import storage
+import wallet_monitor as wm
+
+T0 = 1_700_000_000
+
+
+def test_first_reading_is_only_the_baseline():
+    entry = {}
+    assert wm.observe(entry, 5.0, T0, min_delta=1, threshold=1) == []
+    assert entry["last"] == 5.0 and entry["history"] == [[T0, 5.0]]
+    assert entry["next_poll"] == T0 + wm.MIN_INTERVAL_S
+
+
+def test_movements_of_min_delta_or_more_alert():
+    entry = {}
+    wm.observe(entry, 100.0, T0, min_delta=10)
+    assert wm.observe(entry, 105.0, T0 + 300, min_delta=10) == []
+    assert wm.observe(entry, 120.0, T0 + 600, min_delta=10) == ["received 15.0000 (balance 105.0000 → 120.0000)"]
+    assert wm.observe(entry, 95.0, T0 + 900, min_delta=10) == ["sent 25.0000 (balance 120.0000 → 95.0000)"]
+
+
+def test_crossing_the_threshold_level_alerts_either_way():
+    entry = {}
+    wm.observe(entry, 0.05, T0, min_delta=10, threshold=0.1)
+    assert wm.observe(entry, 0.08, T0 + 300, min_delta=10, threshold=0.1) == []
+    assert wm.observe(entry, 0.2, T0 + 600, min_delta=10, threshold=0.1) == ["balance rose above 0.1 (0.0800 → 0.2000)"]
+    assert wm.observe(entry, 0.3, T0 + 900, min_delta=10, threshold=0.1) == []  # still above: no repeat
+    assert wm.observe(entry, 0.01, T0 + 1200, min_delta=10, threshold=0.1) == ["balance fell below 0.1 (0.3000 → 0.0100)"]
+
+
+def test_many_small_moves_trip_the_velocity_alert_once_per_window():
+    entry, bal = {}, 100.0
+    wm.observe(entry, bal, T0, min_delta=10)
+
+    def wiggle(start, moves):
+        nonlocal bal
+        alerts = []
+        for i in range(1, moves + 1):  # each move 5, below min_delta
+            bal += 5 if i % 2 else -5
+            alerts += wm.observe(entry, bal, start + i * 600, min_delta=10)
+        return alerts
+
+    assert wiggle(T0, 12) == [f"{50:,.4f} moved in the last 24h"]  # at 5 × min_delta, then quiet
+    assert wiggle(T0 + 7200, 12) == []                              # same window
+    later = T0 + 7200 + 12 * 600 + wm.VELOCITY_WINDOW_S
+    assert wiggle(later, 9) == []                                   # older moves have left the window
+    assert wiggle(later + 9 * 600, 1) == [f"{50:,.4f} moved in the last 24h"]
+
+
+def test_dormant_wallets_back_off_and_a_move_resets_the_interval():
+    entry = {}
+    wm.observe(entry, 1.0, T0, min_delta=10)
+    intervals = []
+    for i in range(1, 12):
+        wm.observe(entry, 1.0, T0 + i, min_delta=10)
+        intervals.append(entry["interval"])
+    assert intervals[0] == wm.MIN_INTERVAL_S * wm.BACKOFF
+    assert intervals == sorted(intervals) and intervals[-1] == wm.MAX_INTERVAL_S
+    wm.observe(entry, 2.0, T0 + 100, min_delta=10)
+    assert entry["interval"] == wm.MIN_INTERVAL_S
+    assert len(entry["history"]) == 2  # only changes are kept
+
+
+def test_history_is_capped(monkeypatch):
+    monkeypatch.setattr(wm, "HISTORY_MAX", 5)
+    entry = {}
+    for i in range(20):
+        wm.observe(entry, float(i), T0 + i, min_delta=1000)
+    assert [b for _, b in entry["history"]] == [15.0, 16.0, 17.0, 18.0, 19.0]
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    balances, sent = {"a": 1.0, "b": 50.0}, []
+    monkeypatch.setattr(wm, "wallets", {
+        "Bitcoin":  [{"address": "a", "label": "A", "threshold": 0.1, "min_delta": 10}],
+        "Ethereum": [{"address": "b", "label": "B", "threshold": 100, "min_delta": 1000}],
+    })
+    monkeypatch.setattr(wm, "get_balance", lambda coin, address: balances[address])
+
+    path = str(tmp_path / "wallet_state.json")
+    def send(msg):
+        with storage.file_lock(path, timeout=0.5):  # would time out if sent under the state lock
+            sent.append(msg)
+    monkeypatch.setattr(wm, "send_telegram_message", send)
+    return balances, sent, path
+
+
+def test_check_wallets_alerts_outside_the_state_lock(monitor):
+    balances, sent, path = monitor
+    assert wm.check_wallets(now=T0, force=True, path=path)["alerts"] == 0
+
+    balances.update(a=20.0, b=150.0)
+    stats = wm.check_wallets(now=T0 + 600, force=True, path=path)
+    assert stats == {"polled": 2, "skipped": 0, "alerts": 2}
+    assert sent == [
+        "🐋 Bitcoin wallet 'A' received 19.0000 (balance 1.0000 → 20.0000)",     # a move, level unchanged
+        "🐋 Ethereum wallet 'B' balance rose above 100 (50.0000 → 150.0000)",  # a crossing, small move
+    ]
+    assert storage.read_json(path)["Bitcoin:a"]["last"] == 20.0
+
+
+def test_check_wallets_skips_wallets_that_are_not_due(monitor):
+    balances, sent, path = monitor
+    wm.check_wallets(now=T0, force=True, path=path)
+    assert wm.check_wallets(now=T0 + 60, path=path) == {"polled": 0, "skipped": 2, "alerts": 0}
+    assert wm.next_due(path) == T0 + wm.MIN_INTERVAL_S
+    assert wm.check_wallets(now=T0 + wm.MIN_INTERVAL_S, path=path)["polled"] == 2
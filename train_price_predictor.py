@@ -2,66 +2,258 @@
 # train_price_predictor.py
 
 import os
-import pandas as pd
-import joblib
-from dateutil import parser
+import json
 import datetime
-from sklearn.ensemble import RandomForestRegressor
+import pandas as pd
+import numpy as np
+
+import coin_registry
+import compact_model
+import history_store
+import storage
 
 # ─── CONFIG ────────────────────────────────────────────────────────────────
 BASE_DIR    = os.path.dirname(__file__)
 HIST_CSV    = os.path.join(BASE_DIR, "sentiment_history.csv")
-MODEL_PATH  = os.path.join(BASE_DIR, "price_predictor.pkl")
-COINS       = ["Bitcoin", "Ethereum", "Solana", "Dogecoin"]
+MODEL_PATH  = os.path.join(BASE_DIR, "price_predictor.pkl")  # the 1h model; others get a _<h>h suffix
+FEATURE_STATE_JSON = os.path.join(BASE_DIR, "feature_state.json")
+COINS       = coin_registry.names()
 HORIZON_HRS = 1  # predict 1 hour ahead
+HORIZONS_HRS = (1, 4, 24)
+BAR         = "1h"
+FEATURES    = ["AvgSentiment", "PriceUSD", "Return1h"]
+DEFAULT_SPEC = {"name": "forest_sentiment", "params": {"n_estimators": 100}}  # the original model
 
-def train_and_save():
-    # 1) Load & parse history
-    df = pd.read_csv(HIST_CSV)
-    # parse timestamps, drop tzinfo so everything is tz-naive UTC
-    df["Timestamp"] = (
-        pd.to_datetime(df["Timestamp"], utc=True, errors="coerce")
-          .dt.tz_convert(None)
-    )
+# ─── DATASET ────────────────────────────────────────────────────────────────
+def build_bars(hist_path=None, coins=None, horizons=HORIZONS_HRS):
+    """
+    One row per coin and hour: AvgSentiment (mean over sources), PriceUSD
+    (last price of the hour), Return1h (vs. the previous hour, 0 if that hour
+    is missing) and Target<h>h – the price h hours later (NaN if that hour is
+    missing) for every horizon. Features are computed once for all horizons.
+    """
+    df = history_store.load_history(hist_path or HIST_CSV, columns=["Timestamp", "Coin", "Sentiment", "PriceUSD"], coins=coins or COINS)
     df = df.dropna(subset=["Timestamp", "PriceUSD", "Sentiment"])
+    df = df[df["PriceUSD"] > 0].assign(Coin=lambda d: d["Coin"].astype(str))
+
+    g    = df.groupby(["Coin", pd.Grouper(key="Timestamp", freq=BAR)])
+    bars = pd.DataFrame({"AvgSentiment": g["Sentiment"].mean(), "PriceUSD": g["PriceUSD"].last()}).dropna().reset_index()
+    bars = bars.sort_values(["Coin", "Timestamp"], ignore_index=True)
+
+    price = bars.set_index(["Coin", "Timestamp"])["PriceUSD"]
+    step  = pd.Timedelta(BAR)
+    at    = lambda hours: price.reindex(pd.MultiIndex.from_arrays([bars["Coin"], bars["Timestamp"] + hours * step])).to_numpy()
+    bars["Return1h"] = np.nan_to_num(bars["PriceUSD"].to_numpy() / at(-1) - 1, nan=0.0)
+    for h in horizons:
+        bars[f"Target{h}h"] = at(h)
+    return bars
+
+def build_dataset(hist_path=None, coins=None, horizon=HORIZON_HRS, bars=None):
+    """
+    build_bars() with TargetPrice = the price `horizon` hours later. Rows
+    without a target are dropped; sorted by time so splits never look ahead.
+    Pass `bars` to reuse features already built for another horizon.
+    """
+    bars = build_bars(hist_path, coins, (horizon,)) if bars is None else bars
+    data = bars.assign(TargetPrice=bars[f"Target{horizon}h"]).dropna(subset=["TargetPrice"])
+    return data.sort_values("Timestamp", kind="stable", ignore_index=True)
+
+# ─── MODELS ─────────────────────────────────────────────────────────────────
+class PricePredictor:
+    """
+    Price model for one horizon, behind predict_prices(). `target` is
+      "price"  – the estimator predicts the price directly (the original forest)
+      "return" – it predicts the return to the horizon; price = PriceUSD · (1 + r)
+      "naive"  – no estimator: the future price is the current one
+    """
+
+    def __init__(self, estimator=None, features=FEATURES, target="return"):
+        self.estimator = estimator
+        self.features  = list(features)
+        self.target    = target
+
+    def fit(self, X, target_price):
+        if self.target == "naive":
+            return self
+        y = np.asarray(target_price, dtype="float64")
+        if self.target == "return":
+            y = y / X["PriceUSD"].to_numpy() - 1
+        self.estimator.fit(X[self.features], y)
+        return self
+
+    def predict(self, X):
+        if self.target == "naive":
+            return X["PriceUSD"].to_numpy(dtype="float64")
+        out = self.estimator.predict(X[self.features])
+        return out if self.target == "price" else X["PriceUSD"].to_numpy() * (1 + out)
+
+def make_model(name, params=None):
+    """Candidate by name (see model_select.CANDIDATES for the grids)."""
+    # sklearn only for training – inference goes through compact_model
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    params = dict(params or {})
+    if name == "naive":
+        return PricePredictor(None, ["PriceUSD"], "naive")
+    if name == "forest_sentiment":
+        return PricePredictor(RandomForestRegressor(random_state=42, **params), ["AvgSentiment"], "price")
+    if name == "forest":
+        return PricePredictor(RandomForestRegressor(random_state=42, **params))
+    if name == "gbr":
+        return PricePredictor(GradientBoostingRegressor(random_state=42, **params))
+    if name == "ridge":
+        return PricePredictor(make_pipeline(StandardScaler(), Ridge(**params)))
+    raise ValueError(f"unknown model {name!r}")
+
+# ─── PERSISTENCE ────────────────────────────────────────────────────────────
+def model_path(horizon=HORIZON_HRS):
+    """price_predictor.pkl for the 1h model, price_predictor_<h>h.pkl for the others."""
+    if horizon == HORIZON_HRS:
+        return MODEL_PATH
+    root, ext = os.path.splitext(MODEL_PATH)
+    return f"{root}_{horizon}h{ext}"
 
-    # 2) Build training records
-    records = []
-    for coin in COINS:
-        sub = (
-            df[df["Coin"] == coin]
-              .sort_values("Timestamp")
-              .reset_index(drop=True)
-        )
-        # shift price by HORIZON_HRS
-        sub["TargetPrice"] = sub["PriceUSD"].shift(-HORIZON_HRS)
-        valid = sub.dropna(subset=["TargetPrice"])
-        for _, row in valid.iterrows():
-            records.append({
-                "AvgSentiment": row["Sentiment"],
-                "TargetPrice":  row["TargetPrice"]
+def save_model(model, name, params, data, cv=None, path=None, horizon=HORIZON_HRS):
+    """
+    Persist the model with its metadata (also written to "<path>.json") and
+    its compact NumPy export, parity-checked on the training rows `data`.
+    """
+    import joblib
+
+    meta = {
+        "name":       name,
+        "params":     params,
+        "features":   model.features,
+        "target":     model.target,
+        "coins":      COINS,
+        "rows":       len(data),
+        "trained_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "cv":         cv,
+        "horizon_h":  horizon,
+    }
+    path = path or model_path(horizon)
+    with storage.atomic_write(path, mode="wb") as f:
+        joblib.dump({**meta, "model": model}, f)
+    storage.write_json(meta, path + ".json")
+    compact_model.export(model, compact_model.compact_path(path), meta, data, source=path)
+    return meta
+
+def load_model(path=None):
+    """{"model": PricePredictor, "name", "params", ...}; older (model, coins) pickles are wrapped."""
+    import joblib
+
+    obj = joblib.load(path or MODEL_PATH)
+    if isinstance(obj, tuple):
+        model, coins = obj
+        return {**DEFAULT_SPEC, "model": PricePredictor(model, ["AvgSentiment"], "price"), "coins": coins}
+    return obj
+
+def saved_spec(path=None):
+    """{"name", "params"} of the persisted model (the default forest if there is none)."""
+    meta = storage.read_json((path or MODEL_PATH) + ".json", default=None)
+    return {"name": meta["name"], "params": meta["params"]} if meta else dict(DEFAULT_SPEC)
+
+# ─── TRAIN ──────────────────────────────────────────────────────────────────
+def train_and_save(spec=None, horizon=HORIZON_HRS, bars=None):
+    """Refit the selected model for `horizon` (model_select.py --save picks it) on the full history."""
+    path = model_path(horizon)
+    spec = spec or saved_spec(path)
+    data = build_dataset(horizon=horizon, bars=bars)
+    model = make_model(spec["name"], spec["params"]).fit(data, data["TargetPrice"])
+    save_model(model, spec["name"], spec["params"], data, horizon=horizon,
+               cv=(storage.read_json(path + ".json", default={}) or {}).get("cv"))
+    print(f"✅ Trained {horizon}h {spec['name']} {json.dumps(spec['params'])} on {len(data)} rows, saved to {path}")
+
+def train_all(horizons=HORIZONS_HRS):
+    """One model per horizon, all from a single pass over the history."""
+    bars = build_bars(horizons=horizons)
+    for h in horizons:
+        train_and_save(horizon=h, bars=bars)
+
+# ─── FEATURE STATE ──────────────────────────────────────────────────────────
+def update_features(sentiments, prices, now, path=None):
+    """
+    Advance the persisted per-coin feature state with this run's inputs and
+    return the feature frame (one row per coin in COINS) that every horizon's
+    model predicts from. The state keeps the latest price of the current and
+    previous hour per coin, so Return1h is the same hour-over-hour return the
+    models were trained on, without reading the history back.
+    `prices` is {coin: price}; a coin without one this run keeps NaN.
+    """
+    hour = int(now.timestamp()) // 3600
+    rows = []
+    with storage.update_json(path or FEATURE_STATE_JSON, default={}) as state:
+        for coin, sent in zip(COINS, sentiments):
+            hourly = {h: p for h, p in state.get(coin, {}).items() if int(h) >= hour - 1}
+            if prices.get(coin):
+                hourly[str(hour)] = float(prices[coin])
+            price, prev = hourly.get(str(hour)), hourly.get(str(hour - 1))
+            state[coin] = hourly
+            rows.append({
+                "AvgSentiment": float(sent),
+                "PriceUSD":     price if price else np.nan,
+                "Return1h":     price / prev - 1 if price and prev else 0.0,
             })
+    return pd.DataFrame(rows, columns=FEATURES)
+
+# ─── PREDICT ────────────────────────────────────────────────────────────────
+_COMPACT = {}  # path -> ((npz stat, pickle stat), CompactPredictor or None)
 
-    train_df = pd.DataFrame(records)
-    X = train_df[["AvgSentiment"]]
-    y = train_df["TargetPrice"]
+def _stat(path):
+    st = os.stat(path) if os.path.exists(path) else None
+    return (st.st_mtime_ns, st.st_size) if st else None
 
-    # 3) Train
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X, y)
+def _compact(pkl):
+    """The compact export of `pkl` if it was compiled from the pickle now on disk, else None."""
+    path = compact_model.compact_path(pkl)
+    key  = (_stat(path), _stat(pkl))
+    if key[0] is None:
+        return None
+    if _COMPACT.get(path, (None,))[0] != key:
+        compact = compact_model.load(path)
+        source  = compact.header.get("source_digest")
+        fresh   = key[1] is None or (source is not None and source == compact_model.file_digest(pkl))
+        _COMPACT[path] = (key, compact if fresh else None)
+    return _COMPACT[path][1]
+
+def _predictor(horizon=HORIZON_HRS):
+    """
+    The compact NumPy model when it was compiled from the current pickle
+    (or there is no pickle), else the pickled one.
+    """
+    pkl = model_path(horizon)
+    return _compact(pkl) or load_model(pkl)["model"]
+
+def predict_prices(features, horizon=HORIZON_HRS):
+    """
+    features: DataFrame with one row per coin (same order as COINS) holding
+    the model's inputs – AvgSentiment, PriceUSD, Return1h (0 if unknown) –
+    or a plain list of average sentiments for the sentiment-only forest.
+    Returns numpy array of predicted prices `horizon` hours ahead.
+    """
+    model = _predictor(horizon)
+    X = features if isinstance(features, pd.DataFrame) else pd.DataFrame({"AvgSentiment": list(features)})
+    if "Return1h" in model.features and "Return1h" not in X:
+        X = X.assign(Return1h=0.0)
+    missing = [c for c in model.features + (["PriceUSD"] if model.target != "price" else []) if c not in X]
+    if missing:
+        raise ValueError(f"predict_prices: model needs {missing}")
+    return model.predict(X)
 
-    # 4) Persist
-    joblib.dump((model, COINS), MODEL_PATH)
-    print(f"✅ Trained and saved model to {MODEL_PATH}")
+def has_model(horizon=HORIZON_HRS):
+    pkl = model_path(horizon)
+    return os.path.exists(pkl) or os.path.exists(compact_model.compact_path(pkl))
 
-def predict_prices(avg_sents):
+def predict_horizons(features, horizons=HORIZONS_HRS):
     """
-    avg_sents: list of floats in same order as COINS.
-    Returns numpy array of predicted next-hour prices.
+    {horizon: predicted prices} – one shared feature frame, one batched call
+    per horizon's model. Horizons without a trained model are left out, so
+    nothing untrained is logged, scored or reported as a forecast.
     """
-    model, coins = joblib.load(MODEL_PATH)
-    dfX = pd.DataFrame(avg_sents, columns=["AvgSentiment"])
-    return model.predict(dfX)
+    return {h: predict_prices(features, h) for h in horizons if has_model(h)}
 
 if __name__ == "__main__":
-    train_and_save()
+    train_all()
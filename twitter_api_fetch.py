@@ -1,14 +1,17 @@
+import os
 import tweepy
+from dotenv import load_dotenv
 
-# 🔐 REPLACE THESE with your actual keys from the developer portal
-bearer_token = "AAAAAAAAAAAAAAAAAAAAAP%2By1AEAAAAAYSYmG370GZXVK6pgbF9tQzS27h4%3D0g87PoR7dXMGRuOA3D8WnD9VUTOQQaAq9kAPFfwd0eln72g1zZ"
+# 🔐 Bearer token from the developer portal, via .env (TWITTER_BEARER_TOKEN)
+load_dotenv()
+bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
 
 client = tweepy.Client(bearer_token=bearer_token)
 
 def fetch_tweets(query, max_results=10):
     response = client.search_recent_tweets(
         query=query,
-        tweet_fields=["created_at", "text"],
+        tweet_fields=["created_at", "text", "public_metrics"],
         max_results=max_results
     )
 
@@ -1,20 +1,47 @@
 import subprocess
+import threading
 import json
 
-def fetch_tweets(query, max_results=5):
+def iter_tweets(query, max_results=5):
+    """
+    Yield tweets from `snscrape --jsonl` one line at a time and stop the
+    scraper as soon as max_results have been read (None = no cap), instead of
+    waiting for it to dump the whole result set.
+    """
     command = [
         "snscrape", "--jsonl",
         "twitter-search", query
     ]
-
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    # drained alongside stdout so a chatty scraper can't block on a full stderr pipe
+    errors = []
+    drain = threading.Thread(target=lambda: errors.extend(proc.stderr), daemon=True)
+    drain.start()
+    count = 0
+    ended = False  # read to EOF; otherwise we stop it, and its exit code (-15 on POSIX, 1 on Windows) is no failure
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split("\n")
-        tweets = [json.loads(line) for line in lines[:max_results]]
-        return tweets
-    except subprocess.CalledProcessError as e:
-        print("❌ Scraping failed:", e.stderr)
-        return []
+        if max_results is not None and max_results <= 0:
+            return
+        for line in proc.stdout:
+            line = line.strip()
+            if line:
+                count += 1
+                yield json.loads(line)
+                if max_results is not None and count >= max_results:
+                    break  # don't wait for another line
+        else:
+            ended = True
+    finally:
+        if not ended:
+            proc.terminate()
+        proc.stdout.close()
+        proc.wait()
+        drain.join()
+        if ended and proc.returncode != 0 and count == 0:
+            print("❌ Scraping failed:", "".join(errors))
+
+def fetch_tweets(query, max_results=5):
+    return list(iter_tweets(query, max_results))
 
 if __name__ == "__main__":
     tweets = fetch_tweets("bitcoin since:2024-05-01", 5)
@@ -1,44 +1,67 @@
+import sys
+import time
+import argparse
+
 import requests
+
+import storage
 from send_telegram import send_telegram_message
 
-# Wallet addresses to monitor (multiple per coin)
+# State per wallet (last balance, change-only balance history, polling schedule)
+STATE_JSON        = "wallet_state.json"
+HISTORY_MAX       = 500             # balance changes kept per wallet
+MIN_INTERVAL_S    = 5 * 60          # poll a wallet that just moved this often...
+MAX_INTERVAL_S    = 6 * 3600        # ...backing off to this while it stays dormant
+BACKOFF           = 2.0
+VELOCITY_WINDOW_S = 24 * 3600
+VELOCITY_MULT     = 5               # alert when this many min_deltas moved within the window
+
+# Wallet addresses to monitor (multiple per coin). "threshold" is a balance
+# level, in coins – crossing it (either way) alerts; "min_delta" is the size
+# of a single movement, in coins, that alerts whatever the level
 wallets = {
     "Bitcoin": [
         {
             "address": "bc1ql49ydapnjafl5t2cp9zqpjwe6pdgmxy98859v2",
             "label": "Robinhood Cold Wallet",
-            "threshold": 0.10
+            "threshold": 0.10,
+            "min_delta": 10
         },
         {
             "address": "bc1qgdjqv0av3q56jvd82tkdjpy7gdp9ut8tlqmgrpmv24sq90ecnvqqjwvw97",
             "label": "Bitfinex Cold Wallet",
-            "threshold": 1.0
+            "threshold": 1.0,
+            "min_delta": 100
         }
     ],
     "Ethereum": [
         {
             "address": "0xde0b295669a9fd93d5f28d9ec85e40f4cb697bae",
             "label": "Vitalik’s Wallet",
-            "threshold": 10
+            "threshold": 10,
+            "min_delta": 100
         },
         {
             "address": "0x742d35Cc6634C0532925a3b844Bc454e4438f44e",
             "label": "Binance ETH Reserve",
-            "threshold": 50
+            "threshold": 50,
+            "min_delta": 1000
         }
     ],
     "Solana": [
         {
             "address": "4eD1xXy8ry9fwjyzSRRDCvQ9hBqD4doK6sWWCxt1TxGv",
             "label": "Example SOL Wallet",
-            "threshold": 100
+            "threshold": 100,
+            "min_delta": 5000
         }
     ],
     "Dogecoin": [
         {
             "address": "DBXu2kgc3xtvCUWFcxFE3r9hEYgmuaaCyD",
             "label": "Dogecoin Whale #1",
-            "threshold": 50000
+            "threshold": 50000,
+            "min_delta": 5000000
         }
     ]
 }
@@ -82,34 +105,123 @@ def get_dogecoin_balance(address):
     return float(data["balance"])
 
 
-def check_wallets():
+def get_balance(coin, address):
+    if coin == "Bitcoin":
+        return get_bitcoin_balance(address)
+    if coin == "Ethereum":
+        return get_ethereum_balance(address)
+    if coin == "Solana":
+        return get_solana_balance(address)
+    if coin == "Dogecoin":
+        return get_dogecoin_balance(address)
+    raise ValueError(f"Unsupported coin: {coin}")
+
+
+def wallet_key(coin, address):
+    return f"{coin}:{address}"
+
+
+def observe(entry, balance, now, min_delta, threshold=None):
+    """
+    Fold one balance reading into a wallet's state and reschedule its next
+    poll. Returns alert texts (empty for the first reading – it is only the
+    baseline). `min_delta` is the movement size, in coins, worth an alert;
+    `threshold`, if given, is a balance level whose crossing alerts.
+    """
+    alerts   = []
+    last     = entry.get("last")
+    history  = entry.setdefault("history", [])   # [[ts, balance], ...] only when it changed
+    interval = entry.get("interval", MIN_INTERVAL_S)
+
+    if last is None or balance != last:
+        history.append([round(now), balance])
+        del history[:-HISTORY_MAX]
+        interval = MIN_INTERVAL_S
+    else:
+        interval = min(interval * BACKOFF, MAX_INTERVAL_S)
+
+    if last is not None:
+        delta = balance - last
+        if abs(delta) >= min_delta:
+            verb = "received" if delta > 0 else "sent"
+            alerts.append(f"{verb} {abs(delta):,.4f} (balance {last:,.4f} → {balance:,.4f})")
+        if threshold is not None and (last >= threshold) != (balance >= threshold):
+            verb = "rose above" if balance >= threshold else "fell below"
+            alerts.append(f"balance {verb} {threshold:,} ({last:,.4f} → {balance:,.4f})")
+
+        # velocity: total movement over the window, from the change-only history
+        recent = [b for t, b in history if t >= now - VELOCITY_WINDOW_S]
+        before = [b for t, b in history if t < now - VELOCITY_WINDOW_S][-1:]
+        seq    = before + recent
+        moved  = sum(abs(b - a) for a, b in zip(seq, seq[1:]))
+        if moved >= VELOCITY_MULT * min_delta and now - entry.get("velocity_alert", 0) >= VELOCITY_WINDOW_S:
+            alerts.append(f"{moved:,.4f} moved in the last {VELOCITY_WINDOW_S // 3600}h")
+            entry["velocity_alert"] = round(now)
+
+    entry.update(last=balance, last_seen=round(now), interval=interval, next_poll=round(now + interval))
+    return alerts
+
+
+def check_wallets(now=None, force=False, path=STATE_JSON):
+    """
+    Poll the wallets that are due (all of them with force=True), alert on
+    balance movements and return {"polled", "skipped", "alerts"}.
+    """
     print("\n\U0001F50D Checking wallet balances...")
+    now   = now or time.time()
+    state = storage.read_json(path, default={})
+    stats = {"polled": 0, "skipped": 0, "alerts": 0}
+    readings = {}
 
     for coin, wallet_list in wallets.items():
         for info in wallet_list:
             label = info.get("label", "Unlabeled")
+            key   = wallet_key(coin, info["address"])
+            if key in readings or (not force and now < state.get(key, {}).get("next_poll", 0)):
+                stats["skipped"] += 1
+                continue
             try:
-                if coin == "Bitcoin":
-                    balance = get_bitcoin_balance(info["address"])
-                elif coin == "Ethereum":
-                    balance = get_ethereum_balance(info["address"])
-                elif coin == "Solana":
-                    balance = get_solana_balance(info["address"])
-                elif coin == "Dogecoin":
-                    balance = get_dogecoin_balance(info["address"])
-                else:
-                    print(f"❌ Unsupported coin: {coin}")
-                    continue
-
-                print(f"{coin} | {label}: {balance:.4f}")
-
-                if balance >= info["threshold"]:
-                    alert = f"🚨 {coin} wallet '{label}' balance crossed threshold!\nBalance: {balance:.4f} >= {info['threshold']}"
-                    send_telegram_message(alert)
-
+                readings[key] = (coin, label, info, get_balance(coin, info["address"]))
+                stats["polled"] += 1
+                print(f"{coin} | {label}: {readings[key][3]:.4f}")
             except Exception as e:
                 print(f"⚠️ Could not retrieve {coin} ({label}) balance: {e}")
 
+    # apply under the lock; fetches and Telegram sends stay outside it
+    messages = []
+    with storage.update_json(path, default={}, backup=False) as state:
+        for key, (coin, label, info, balance) in readings.items():
+            entry = state.setdefault(key, {"coin": coin, "label": label})
+            for text in observe(entry, balance, now, info["min_delta"], info.get("threshold")):
+                messages.append(f"🐋 {coin} wallet '{label}' {text}")
+    for msg in messages:
+        send_telegram_message(msg)
+    stats["alerts"] = len(messages)
+    return stats
+
+
+def next_due(path=STATE_JSON):
+    """Earliest next_poll over the configured wallets (now if one was never polled)."""
+    state = storage.read_json(path, default={})
+    due   = [state.get(wallet_key(coin, info["address"]), {}).get("next_poll", 0)
+             for coin, wallet_list in wallets.items() for info in wallet_list]
+    return min(due, default=0)
+
+
+def run_forever():
+    while True:
+        stats = check_wallets()
+        wait  = max(next_due() - time.time(), MIN_INTERVAL_S / 5)
+        print(f"🐋 polled {stats['polled']}, skipped {stats['skipped']}, {stats['alerts']} alerts; next poll in {wait / 60:.0f} min")
+        time.sleep(wait)
+
 
 if __name__ == "__main__":
-    check_wallets()
+    ap = argparse.ArgumentParser(description="Whale wallet movement monitor")
+    ap.add_argument("--loop", action="store_true", help="keep polling on the adaptive schedule")
+    ap.add_argument("--force", action="store_true", help="poll every wallet now, due or not")
+    args = ap.parse_args(sys.argv[1:])
+    if args.loop:
+        run_forever()
+    else:
+        check_wallets(force=args.force)